@@ -1,3 +1,8 @@
-from econuy.load import load_dataset, load_datasets_parallel
+from econuy.load import (
+    load_dataset,
+    load_datasets_parallel,
+    aload_dataset,
+    aload_datasets,
+)
 
-__all__ = ["load_dataset", "load_datasets_parallel"]
+__all__ = ["load_dataset", "load_datasets_parallel", "aload_dataset", "aload_datasets"]
@@ -12,8 +12,11 @@ from econuy.transform.change import _chg_diff
 from econuy.transform.resample import _resample
 from econuy.transform.rolling import _rolling
 from econuy.transform.rebase import _rebase
+from econuy.transform.splice import _splice_dataset
+from econuy.transform.growth import _extend_yoy_dataset
 from econuy.transform.convert import _convert_usd, _convert_gdp, _convert_real
 from econuy.transform.decompose import _decompose
+from econuy.utils.transform import infer_freq
 
 
 class DatasetConfig:
@@ -39,11 +42,17 @@ class DatasetMetadata:
         indicator_metadata: dict,
         created_at: Optional[datetime] = None,
         config: Optional[DatasetConfig] = None,
+        stale: bool = False,
+        checked_at: Optional[datetime] = None,
     ) -> None:
         self.name = name
         self.indicator_metadata = indicator_metadata
         self.created_at = created_at or datetime.now()
+        # Last time the sources were checked without changes, if after creation
+        self.checked_at = checked_at
         self.config = config or DatasetConfig(name)
+        # Set on outdated datasets returned while a refresh runs, never saved
+        self.stale = stale
 
     def __getitem__(self, indicator) -> "DatasetMetadata":
         return self.__class__(
@@ -230,19 +239,24 @@ class DatasetMetadata:
 
     def to_dict(self) -> Dict:
         d = self.__dict__.copy()
+        d.pop("stale")
         d["created_at"] = d["created_at"].isoformat()
+        if d["checked_at"] is not None:
+            d["checked_at"] = d["checked_at"].isoformat()
         d["config"] = self.config.__dict__
         return d
 
     def save(self, name: str, data_dir: Union[str, Path, None] = None) -> None:
         from econuy.utils.operations import get_data_dir
+        from econuy.utils.locking import atomic_path
 
         data_dir = data_dir or get_data_dir()
         data_dir = Path(data_dir)
         data_dir.mkdir(parents=True, exist_ok=True)
         for_json = self.to_dict()
-        with open(data_dir / f"{name}_metadata.json", "w") as f:
-            json.dump(for_json, f, indent=4)
+        with atomic_path(data_dir / f"{name}_metadata.json") as tmp_path:
+            with open(tmp_path, "w") as f:
+                json.dump(for_json, f, indent=4)
         return
 
     @staticmethod
@@ -320,9 +334,31 @@ class DatasetMetadata:
         """
         with open(path, "r") as f:
             metadata_dict = json.load(f)
+        return cls.from_dict(metadata_dict)
+
+    @classmethod
+    def from_dict(cls, metadata_dict: Dict) -> "DatasetMetadata":
+        """
+        Create a metadata instance from a dictionary as returned by ``to_dict``.
+
+        Parameters
+        ----------
+        metadata_dict : dict
+            The metadata dictionary.
+
+        Returns
+        -------
+        Metadata
+            The created metadata instance.
+        """
+        metadata_dict = metadata_dict.copy()
         metadata_dict["created_at"] = datetime.fromisoformat(
             metadata_dict["created_at"]
         )
+        if metadata_dict.get("checked_at") is not None:
+            metadata_dict["checked_at"] = datetime.fromisoformat(
+                metadata_dict["checked_at"]
+            )
         metadata_dict["config"] = DatasetConfig(metadata_dict["name"])
         return cls(**metadata_dict)
 
@@ -496,7 +532,10 @@ class Dataset:
         }
 
     def save(
-        self, data_dir: Union[str, Path, None] = None, name: Optional[str] = None
+        self,
+        data_dir: Union[str, Path, None] = None,
+        name: Optional[str] = None,
+        cache_format: Optional[Literal["parquet", "arrow", "csv"]] = None,
     ) -> None:
         """
         Save the dataset to a directory.
@@ -507,6 +546,9 @@ class Dataset:
             The directory to save the dataset to.
         name : str, default None
             The name to save the dataset as without suffixes.
+        cache_format : {'parquet', 'arrow', 'csv'}, default None
+            File format for the data. If None, use ``ECONUY_CACHE_FORMAT``,
+            the data directory's ``.econuy_format`` file or Parquet, in that order.
 
         Returns
         -------
@@ -514,13 +556,25 @@ class Dataset:
 
         """
         from econuy.utils.operations import get_data_dir
+        from econuy.utils.cache import (
+            MEMORY_CACHE,
+            get_memory_cache_key,
+            get_cache_format,
+            write_cached_data,
+            remove_other_formats,
+        )
+        from econuy.utils.locking import dataset_lock
 
         data_dir = data_dir or get_data_dir()
         data_dir = Path(data_dir)
         data_dir.mkdir(parents=True, exist_ok=True)
         name = name or (f"{self.name}_transformed" if self.transformed else self.name)
-        self.data.to_csv(data_dir / f"{name}.csv")
-        self.metadata.save(name, data_dir)
+        cache_format = get_cache_format(data_dir, cache_format)
+        with dataset_lock(name, data_dir):
+            write_cached_data(self.data, name, data_dir, cache_format)
+            remove_other_formats(name, data_dir, cache_format)
+            self.metadata.save(name, data_dir)
+        MEMORY_CACHE.invalidate(get_memory_cache_key(name, data_dir))
         return
 
     def infer_frequency(self) -> Optional[pd.Timedelta]:
@@ -614,6 +668,23 @@ class Dataset:
             ]
         )
 
+    def lazy(self) -> "LazyDataset":  # type: ignore # noqa: F821
+        """Start a lazy plan of transformations on the dataset.
+
+        Transformation methods on the returned ``LazyDataset`` record steps
+        instead of running them, and ``collect`` runs the whole plan at once,
+        copying the metadata and inferring the frequency once instead of at
+        every step.
+
+        Returns
+        -------
+        ``LazyDataset``
+
+        """
+        from econuy.lazy import LazyDataset
+
+        return LazyDataset(self)
+
     def resample(
         self,
         rule: Union[pd.DateOffset, pd.Timedelta, str],
@@ -689,7 +760,7 @@ class Dataset:
             transformed = pd.concat(transformed, axis=1)
             new_metadata = DatasetMetadata.from_metadatas(self.name, new_metadatas)
 
-        inferred_frequency = pd.infer_freq(transformed.index)
+        inferred_frequency = infer_freq(transformed.index)
         new_metadata.update_dataset_metadata({"frequency": inferred_frequency})
         output = self.__class__(
             data=transformed, metadata=new_metadata, name=self.name, transformed=True
@@ -904,6 +975,88 @@ class Dataset:
         )
         return output
 
+    def splice(self, older: "Dataset") -> "Dataset":
+        """Extend the dataset backwards with the growth rates of an older dataset.
+
+        Periods before the start of the dataset, or where all of its indicators
+        are missing, are chained to the next period with data using the
+        period-on-period changes of ``older``, as when splicing series with
+        different base years.
+
+        Parameters
+        ----------
+        older : ``Dataset``
+            Dataset with the older series, with the same frequency and number
+            of indicators. Indicators are matched by position.
+
+        Returns
+        -------
+        ``Dataset``
+
+        """
+        assert (
+            self.data.shape[1] == older.data.shape[1]
+        ), "Datasets must have the same number of indicators."
+
+        transformed, new_metadata = _splice_dataset(
+            data=self.data,
+            metadata=self.metadata,
+            older=older.data,
+            older_name=older.name,
+        )
+        output = self.__class__(
+            data=transformed,
+            metadata=new_metadata,
+            name=self.name,
+            transformed=True,
+        )
+        return output
+
+    def extend_yoy(
+        self, growth: Union[pd.DataFrame, "Dataset"], periods: Optional[int] = None
+    ) -> "Dataset":
+        """Extend the dataset forward with year-over-year growth rates.
+
+        Each period of ``growth`` after the end of the dataset is filled with
+        the value one year earlier times ``1 + growth / 100``, as when recent
+        releases only publish percent changes. Growth rates spanning more
+        than a year are chained.
+
+        Parameters
+        ----------
+        growth : pd.DataFrame or ``Dataset``
+            Year-over-year percent changes. Indicators are matched by column
+            name and must be in the dataset.
+        periods : int, default None
+            Number of periods in a year. If None, it is inferred from the
+            dataset's frequency. Datasets without a regular frequency are
+            matched with the dates one year earlier.
+
+        Returns
+        -------
+        ``Dataset``
+
+        """
+        if isinstance(growth, Dataset):
+            growth = growth.data
+        assert set(growth.columns).issubset(
+            self.data.columns
+        ), "Growth rates must be for indicators in the dataset."
+
+        transformed, new_metadata = _extend_yoy_dataset(
+            data=self.data,
+            metadata=self.metadata,
+            growth=growth,
+            periods=periods,
+        )
+        output = self.__class__(
+            data=transformed,
+            metadata=new_metadata,
+            name=self.name,
+            transformed=True,
+        )
+        return output
+
     def convert(
         self,
         flavor: Literal["usd", "real", "gdp"],
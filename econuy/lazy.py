@@ -0,0 +1,320 @@
+import copy
+from datetime import datetime
+from typing import Callable, Dict, List, Literal, Optional, Sequence, Tuple, Union
+
+import pandas as pd
+
+from econuy.base import Dataset, DatasetMetadata
+from econuy.transform.change import _chg_diff
+from econuy.transform.convert import _convert_gdp, _convert_real, _convert_usd
+from econuy.transform.decompose import _decompose
+from econuy.transform.rebase import _rebase
+from econuy.transform.resample import _resample
+from econuy.transform.rolling import _rolling
+from econuy.utils.transform import infer_freq, sharing_transform_inputs
+
+
+TRANSFORMS: Dict[str, Union[Callable, Dict[str, Callable]]] = {
+    "resample": _resample,
+    "rolling": _rolling,
+    "chg_diff": _chg_diff,
+    "rebase": _rebase,
+    "convert": {"usd": _convert_usd, "real": _convert_real, "gdp": _convert_gdp},
+    "decompose": _decompose,
+}
+
+
+class _PlanMetadata(DatasetMetadata):
+    """
+    Metadata owned by a single plan execution.
+
+    Transformations copy their input metadata so that datasets are never
+    modified in place. While a plan runs no one else holds its metadata, so
+    steps update it in place instead.
+    """
+
+    def copy(self) -> "_PlanMetadata":
+        return self
+
+    @classmethod
+    def own(
+        cls, metadata: DatasetMetadata, indicators: Optional[List[str]] = None
+    ) -> "_PlanMetadata":
+        indicators = indicators or metadata.indicator_ids
+        owned = cls.__new__(cls)
+        owned.__dict__.update(metadata.__dict__)
+        owned.indicator_metadata = copy.deepcopy(
+            {i: metadata.indicator_metadata[i] for i in indicators}
+        )
+        return owned
+
+    @classmethod
+    def merge(cls, metadatas: List["_PlanMetadata"]) -> "_PlanMetadata":
+        merged = cls.__new__(cls)
+        merged.__dict__.update(metadatas[0].__dict__)
+        merged.indicator_metadata = {
+            k: v for m in metadatas for k, v in m.indicator_metadata.items()
+        }
+        return merged
+
+
+class LazyDataset:
+    """
+    A dataset with a plan of transformations that runs on ``collect``.
+
+    Created with ``Dataset.lazy``. Each transformation method records a step
+    and returns a new ``LazyDataset``, validating its arguments but not
+    touching the data. ``collect`` then runs the whole plan at once, with the
+    same results as calling the ``Dataset`` methods one after the other, but:
+
+    * The metadata is copied once per plan instead of once per step.
+    * Datasets whose indicators have different metadata are split into single
+      indicators once, and only merged back when their metadata converges or
+      the plan ends, instead of at every step.
+    * The frequency of the data is inferred once per index instead of at
+      every step.
+    * The exchange rates, prices and GDP used by ``convert`` are computed once
+      per frequency and shared by every step and dataset collected together,
+      see ``collect_all``.
+
+    Parameters
+    ----------
+    dataset : Dataset
+        The dataset to transform.
+    plan : Sequence[Dict], optional
+        The steps, keyed by method name with their arguments.
+    """
+
+    def __init__(self, dataset: Dataset, plan: Sequence[Dict] = ()) -> None:
+        self.dataset = dataset
+        self.plan = tuple(plan)
+
+    def __repr__(self) -> str:
+        steps = [
+            f"  {method}({kwargs})"
+            for step in self.plan
+            for method, kwargs in step.items()
+        ]
+        return "\n".join([f"Lazy: {self.dataset.name}", "Plan:"] + (steps or ["  -"]))
+
+    def _add_step(self, method: str, **kwargs) -> "LazyDataset":
+        return self.__class__(self.dataset, self.plan + ({method: kwargs},))
+
+    def resample(
+        self,
+        rule: Union[pd.DateOffset, pd.Timedelta, str],
+        operation: Literal["sum", "mean", "last", "upsample"] = "sum",
+        interpolation: str = "linear",
+    ) -> "LazyDataset":
+        """Add a ``Dataset.resample`` step."""
+        if operation not in ["sum", "mean", "upsample", "last"]:
+            raise ValueError("Invalid 'operation' option.")
+        return self._add_step(
+            "resample", rule=rule, operation=operation, interpolation=interpolation
+        )
+
+    def rolling(
+        self, window: int, operation: Literal["sum", "mean"] = "sum"
+    ) -> "LazyDataset":
+        """Add a ``Dataset.rolling`` step."""
+        if operation not in ["sum", "mean"]:
+            raise ValueError("Invalid 'operation' option.")
+        return self._add_step("rolling", window=window, operation=operation)
+
+    def chg_diff(
+        self,
+        operation: Literal["chg", "diff"] = "chg",
+        period: Literal["last", "inter", "annual"] = "last",
+    ) -> "LazyDataset":
+        """Add a ``Dataset.chg_diff`` step."""
+        if operation not in ["chg", "diff"]:
+            raise ValueError("Invalid 'operation' option.")
+        if period not in ["last", "inter", "annual"]:
+            raise ValueError("Invalid 'period' option.")
+        return self._add_step("chg_diff", operation=operation, period=period)
+
+    def rebase(
+        self,
+        start_date: Union[str, datetime],
+        end_date: Union[str, datetime, None] = None,
+        base: float = 100.0,
+    ) -> "LazyDataset":
+        """Add a ``Dataset.rebase`` step."""
+        return self._add_step(
+            "rebase", start_date=start_date, end_date=end_date, base=base
+        )
+
+    def convert(
+        self,
+        flavor: Literal["usd", "real", "gdp"],
+        start_date: Union[str, datetime, None] = None,
+        end_date: Union[str, datetime, None] = None,
+        error_handling: Literal["raise", "coerce", "ignore"] = "raise",
+    ) -> "LazyDataset":
+        """Add a ``Dataset.convert`` step."""
+        assert flavor in ["usd", "real", "gdp"], "Invalid 'flavor' option."
+        kwargs = (
+            {"start_date": start_date, "end_date": end_date} if flavor == "real" else {}
+        )
+        return self._add_step(
+            "convert", flavor=flavor, error_handling=error_handling, **kwargs
+        )
+
+    def decompose(
+        self,
+        method: Literal["x13", "loess", "mloess", "moving_averages"] = "x13",
+        fallback: Literal["loess", "mloess", "moving_averages"] = "loess",
+        component: Literal["t-c", "sa"] = "sa",
+        fn_kwargs: Optional[dict] = None,
+        ignore_warnings: bool = True,
+        error_handling: Literal["raise", "coerce", "ignore"] = "raise",
+    ) -> "LazyDataset":
+        """Add a ``Dataset.decompose`` step."""
+        assert method in [
+            "x13",
+            "loess",
+            "mloess",
+            "moving_averages",
+        ], "Invalid 'method' option."
+        assert component in ["t-c", "sa"], "Invalid 'component' option."
+        return self._add_step(
+            "decompose",
+            method=method,
+            fallback=fallback,
+            component=component,
+            fn_kwargs=fn_kwargs or {},
+            ignore_warnings=ignore_warnings,
+            error_handling=error_handling,
+        )
+
+    def filter(
+        self,
+        start_date: Union[str, datetime, None] = None,
+        end_date: Union[str, datetime, None] = None,
+    ) -> "LazyDataset":
+        """Add a ``Dataset.filter`` step."""
+        return self._add_step("filter", start_date=start_date, end_date=end_date)
+
+    def collect(self) -> Dataset:
+        """
+        Run the plan.
+
+        Returns
+        -------
+        ``Dataset``
+            The transformed dataset, or the original dataset if the plan is
+            empty.
+
+        """
+        if not self.plan:
+            return self.dataset
+        with sharing_transform_inputs():
+            return _execute(self.dataset, self.plan)
+
+
+def collect_all(lazy_datasets: Sequence[LazyDataset]) -> List[Dataset]:
+    """
+    Run the plans of several lazy datasets, sharing frequencies and converter
+    inputs between them.
+
+    Parameters
+    ----------
+    lazy_datasets : Sequence[LazyDataset]
+        The lazy datasets.
+
+    Returns
+    -------
+    List[Dataset]
+        The transformed datasets, in the same order.
+    """
+    with sharing_transform_inputs():
+        return [lazy_dataset.collect() for lazy_dataset in lazy_datasets]
+
+
+def _execute(dataset: Dataset, plan: Sequence[Dict]) -> Dataset:
+    # Each part is a frame with its metadata, with a single part unless the
+    # indicators' metadata differ, in which case there is one part per indicator
+    parts: List[Tuple[pd.DataFrame, _PlanMetadata]] = [
+        (dataset.data, _PlanMetadata.own(dataset.metadata))
+    ]
+    split = False
+    for step in plan:
+        ((method, kwargs),) = step.items()
+        if method == "filter":
+            parts = [
+                (data.loc[kwargs["start_date"] : kwargs["end_date"]], metadata)
+                for data, metadata in parts
+            ]
+            continue
+
+        kwargs = kwargs.copy()
+        func = TRANSFORMS[method]
+        if method == "convert":
+            func = func[kwargs.pop("flavor")]
+
+        if len(parts) > 1:
+            merged = _PlanMetadata.merge([metadata for _, metadata in parts])
+            if merged.has_common_metadata:
+                parts = [(pd.concat([data for data, _ in parts], axis=1), merged)]
+        if len(parts) == 1 and parts[0][1].has_common_metadata:
+            parts = [func(data=parts[0][0], metadata=parts[0][1], **kwargs)]
+        else:
+            parts = [
+                func(data=data, metadata=metadata, **kwargs)
+                for data, metadata in _split(parts)
+            ]
+            parts = _align(parts)
+            split = True
+
+        if method == "resample":
+            inferred_frequency = infer_freq(parts[0][0].index)
+            for _, metadata in parts:
+                metadata.update_dataset_metadata({"frequency": inferred_frequency})
+
+    if len(parts) == 1:
+        data = parts[0][0]
+    else:
+        data = pd.concat([data for data, _ in parts], axis=1)
+    metadata = _PlanMetadata.merge([metadata for _, metadata in parts])
+    output_metadata = DatasetMetadata(
+        name=dataset.name,
+        indicator_metadata=metadata.indicator_metadata,
+        # As when Dataset methods rebuild the metadata of split datasets
+        created_at=None if split else metadata.created_at,
+        config=copy.deepcopy(metadata.config),
+        stale=False if split else metadata.stale,
+    )
+    transformed = dataset.transformed or any("filter" not in step for step in plan)
+    return Dataset(
+        name=dataset.name,
+        data=data,
+        metadata=output_metadata,
+        transformed=transformed,
+    )
+
+
+def _split(
+    parts: List[Tuple[pd.DataFrame, _PlanMetadata]],
+) -> List[Tuple[pd.DataFrame, _PlanMetadata]]:
+    """Split parts with several indicators into one part per indicator."""
+    output = []
+    for data, metadata in parts:
+        if len(data.columns) == 1:
+            output.append((data, metadata))
+        else:
+            output.extend(
+                (data[[column]], _PlanMetadata.own(metadata, [column]))
+                for column in data.columns
+            )
+    return output
+
+
+def _align(
+    parts: List[Tuple[pd.DataFrame, _PlanMetadata]],
+) -> List[Tuple[pd.DataFrame, _PlanMetadata]]:
+    """Reindex parts to a common index, as when concatenating them."""
+    index = parts[0][0].index
+    if all(data.index.equals(index) for data, _ in parts[1:]):
+        return parts
+    index = pd.concat([data for data, _ in parts], axis=1).index
+    return [(data.reindex(index), metadata) for data, metadata in parts]
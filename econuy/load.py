@@ -1,36 +1,202 @@
+import asyncio
+import calendar
+import contextlib
+import contextvars
+import graphlib
 import importlib
 import datetime as dt
+import functools
 import inspect
 import os
-from typing import Union, List, Optional, Dict, Literal
+import tempfile
+import threading
+import time
+from typing import Union, List, Optional, Dict, Iterator, Literal, Tuple
 from pathlib import Path
-from urllib.error import URLError
-from json.decoder import JSONDecodeError
 from concurrent import futures
 
+import httpx
 import pandas as pd
-from httpx import ReadTimeout
-from opnieuw import retry
 from tqdm.auto import tqdm
 
-from econuy.utils.operations import REGISTRY, read_dataset, get_data_dir
+from econuy.utils.operations import (
+    REGISTRY,
+    read_dataset,
+    read_checked_at,
+    read_created_at,
+    get_data_dir,
+    get_refresh_policy,
+    get_prefetchable_sources,
+    PREFETCHED_SOURCES,
+)
+from econuy.utils.cache import DatasetHandle, get_metadata_path
+from econuy.utils.frozen import caching_frozen
+from econuy.utils.locking import fetch_lock
+from econuy.utils.throttling import asend_with_retries, share_limits
+from econuy.utils.vintages import read_vintage, save_vintage, vintages_enabled
+from econuy.utils.raw_cache import (
+    offline_enabled,
+    offline_mode,
+    raw_cache_enabled,
+    read_source_validators,
+    recording_downloads,
+    save_source_validators,
+)
+from econuy.utils.retrieval import (
+    ALL_PROVIDERS,
+    WORKBOOKS,
+    WorkbookCache,
+    get_client_kwargs,
+    sharing_workbooks,
+    sources_unchanged,
+)
 from econuy.base import Dataset
 
 
+# Start of the scheduled run the current load belongs to, if any
+_REFRESHED_AFTER: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar(
+    "refreshed_after", default=None
+)
+# Freshness stamps of the datasets retrieved in the current context, read under
+# their fetch lock before and after retrieval, if requested
+_RETRIEVED_STAMPS: contextvars.ContextVar[
+    Optional[Dict[str, Tuple[Optional[dt.datetime], Optional[dt.datetime]]]]
+] = contextvars.ContextVar("retrieved_stamps", default=None)
+_ASYNC_EXECUTOR: Optional[futures.ThreadPoolExecutor] = None
+_REFRESH_EXECUTOR: Optional[futures.ThreadPoolExecutor] = None
+_REFRESHES: Dict[Tuple[str, str], futures.Future] = {}
+_REFRESHES_LOCK = threading.Lock()
 OUTDATED_DELTA_THRESHOLD = dt.timedelta(days=1)  # TODO: Use an env var or config file
+# Time after a publication date during which unchanged sources are checked again
+CADENCE_GRACE = "14D"
+CADENCE_MONTHS = {
+    "monthly": tuple(range(1, 13)),
+    "quarterly": (3, 6, 9, 12),
+    "annual": (1,),
+}
+
+
+def is_outdated(
+    name: str,
+    created_at: dt.datetime,
+    now: Optional[dt.datetime] = None,
+    checked_at: Optional[dt.datetime] = None,
+) -> bool:
+    """
+    Check whether a cached dataset should be refreshed according to its refresh
+    policy in the registry.
+
+    Policies are set in the ``refresh`` key of each registry entry, either as a
+    time to live, e.g. ``{"ttl": "7D"}``, or as an expected publication cadence,
+    e.g. ``{"cadence": "monthly", "day": 15}``, ``{"cadence": "quarterly",
+    "day": 20, "months": [3, 6, 9, 12]}`` or ``{"cadence": "annual", "day": 1,
+    "months": [4]}``. With a cadence, the dataset is outdated once a publication
+    date has passed since it was created. Sources often publish later than
+    expected, so if a refresh after the publication date found the same data,
+    the dataset is checked again every ``OUTDATED_DELTA_THRESHOLD`` during a
+    grace window after the publication date (the policy's ``grace``,
+    ``CADENCE_GRACE`` by default), and then waits for the next publication.
+    Entries without a policy use ``OUTDATED_DELTA_THRESHOLD``.
+
+    Parameters
+    ----------
+    name : str
+        The name of the dataset.
+    created_at : dt.datetime
+        The time at which the cached dataset was created.
+    now : dt.datetime, optional
+        The reference time. Default is the current time.
+    checked_at : dt.datetime, optional
+        The last time the dataset's sources were checked without changes, see
+        ``read_checked_at``. Default is ``created_at``.
+
+    Returns
+    -------
+    bool
+        True if the dataset should be refreshed.
+
+    Raises
+    ------
+    ValueError
+        If the policy's cadence is not one of the available options.
+    """
+    now = now or dt.datetime.now()
+    return now >= get_next_refresh(name, created_at, checked_at)
+
+
+def get_next_refresh(
+    name: str, created_at: dt.datetime, checked_at: Optional[dt.datetime] = None
+) -> dt.datetime:
+    """
+    Get the time at which a cached dataset becomes outdated according to its
+    refresh policy in the registry (see ``is_outdated``).
+
+    Parameters
+    ----------
+    name : str
+        The name of the dataset.
+    created_at : dt.datetime
+        The time at which the cached dataset was created.
+    checked_at : dt.datetime, optional
+        The last time the dataset's sources were checked without changes.
+        Default is ``created_at``.
+
+    Returns
+    -------
+    dt.datetime
+        The time from which the dataset should be refreshed.
+
+    Raises
+    ------
+    ValueError
+        If the policy's cadence is not one of the available options.
+    """
+    policy = get_refresh_policy(name)
+    checked_at = max(checked_at or created_at, created_at)
+    if "cadence" in policy:
+        publication = _next_publication(created_at, policy)
+        if checked_at < publication:
+            return publication
+        grace = pd.Timedelta(policy.get("grace", CADENCE_GRACE)).to_pytimedelta()
+        if checked_at < publication + grace:
+            # Not published yet when last checked
+            return checked_at + OUTDATED_DELTA_THRESHOLD
+        return _next_publication(checked_at, policy)
+    if "ttl" in policy:
+        return checked_at + pd.Timedelta(policy["ttl"]).to_pytimedelta()
+    return checked_at + OUTDATED_DELTA_THRESHOLD
+
+
+def _next_publication(created_at: dt.datetime, policy: Dict) -> dt.datetime:
+    cadence = policy["cadence"]
+    if cadence not in CADENCE_MONTHS:
+        raise ValueError(
+            f"Invalid cadence '{cadence}'. "
+            f"Must be one of {list(CADENCE_MONTHS.keys())}."
+        )
+    months = policy.get("months") or CADENCE_MONTHS[cadence]
+    day = policy.get("day", 1)
+    for offset in range(25):
+        years, month = divmod(created_at.month - 1 + offset, 12)
+        year, month = created_at.year + years, month + 1
+        if month not in months:
+            continue
+        last_day = calendar.monthrange(year, month)[1]
+        candidate = dt.datetime(year, month, min(day, last_day))
+        if candidate > created_at:
+            return candidate
+    raise ValueError(f"Invalid refresh policy {policy}.")
 
 
-@retry(
-    retry_on_exceptions=(ConnectionError, URLError, JSONDecodeError, ReadTimeout),
-    max_calls_total=4,
-    retry_window_after_first_call_in_seconds=30,
-)
 def load_dataset(
     name: str,
     data_dir: Union[str, Path, None] = None,
     skip_cache: bool = False,
     force_overwrite: bool = False,
     skip_update: bool = False,
+    as_of: Union[str, dt.date, dt.datetime, None] = None,
+    offline: Optional[bool] = None,
+    stale_while_revalidate: bool = False,
 ) -> Dataset:
     """
     Load a dataset by name, optionally skipping cache and forcing overwrite.
@@ -49,6 +215,21 @@ def load_dataset(
         If True, the existing dataset will be overwritten. Default is False.
     skip_update : bool, optional
         If True, the dataset will not be updated if it already exists. Default is False.
+    as_of : Union[str, dt.date, dt.datetime, None], optional
+        If set, load the dataset as it was retrieved at this time from the
+        vintage archive instead of the cache or the sources. Dates without a time
+        component include vintages retrieved during that day. Retrievals are
+        only archived if the ``ECONUY_VINTAGES`` environment variable is set to
+        1. Default is None.
+    offline : Optional[bool], optional
+        If True, retrievers read their sources from the raw download cache in
+        ``data_dir/raw`` instead of the network, so datasets can be rebuilt
+        from the last downloads. Also applies to the dataset's dependencies. If
+        None, use the ``ECONUY_OFFLINE`` environment variable. Default is None.
+    stale_while_revalidate : bool, optional
+        If True and the cached dataset is outdated, return it immediately with
+        ``metadata.stale`` set to True and retrieve the new dataset in a
+        background thread (see ``refresh_in_background``). Default is False.
 
     Returns
     -------
@@ -58,63 +239,224 @@ def load_dataset(
     Raises
     ------
     ValueError
-        If the dataset name is not available in the registry.
+        If the dataset name is not available in the registry, or if there is no
+        vintage at or before ``as_of``.
     AssertionError
         If the existing dataset has changed and force_overwrite is False.
+    FileNotFoundError
+        If offline and a source needed by the retriever was never downloaded.
     """
     data_dir = data_dir or get_data_dir()
     data_dir = Path(data_dir)
     data_dir.mkdir(parents=True, exist_ok=True, mode=0o755)
 
+    if as_of is not None:
+        dataset = read_vintage(name, data_dir, as_of)
+        if dataset is None:
+            raise ValueError(f"No vintage of dataset {name} available as of {as_of}.")
+        return dataset
+
     if not skip_cache:
-        existing_dataset = read_dataset(name, data_dir)
-        if existing_dataset is not None:
-            created_at = existing_dataset.metadata.created_at
-            if (
-                dt.datetime.now() - created_at
-            ) < OUTDATED_DELTA_THRESHOLD or skip_update:
-                return existing_dataset
+        # Only check the creation time first, so stale datasets are not parsed
+        created_at = read_created_at(name, data_dir)
+        if created_at is not None:
+            checked_at = read_checked_at(name, data_dir)
+            if skip_update or not is_outdated(name, created_at, checked_at=checked_at):
+                # The files may have been removed or replaced since, in which
+                # case the dataset is retrieved
+                dataset = read_dataset(name, data_dir)
+                if dataset is not None:
+                    return dataset
             else:
+                if stale_while_revalidate:
+                    dataset = read_dataset(name, data_dir)
+                    if dataset is not None:
+                        dataset.metadata.stale = True
+                        refresh_in_background(name, data_dir, force_overwrite)
+                        return dataset
                 print(
                     f"Dataset {name} exists in cache but is outdated "
                     f"(created at {created_at.strftime('%Y-%m-%d %H:%M:%S')}). "
                     "Retrieving new data."
                 )
+    elif _saved_since(name, data_dir, _REFRESHED_AFTER.get()):
+        # Already retrieved earlier in the same scheduled run
+        dataset = read_dataset(name, data_dir)
+        if dataset is not None:
+            return dataset
 
     try:
         dataset_metadata = REGISTRY[name]
     except KeyError:
         raise ValueError(f"Dataset {name} not available.")
 
+    requested_at = time.time_ns()
+    with fetch_lock(name, data_dir), offline_mode(offline):
+        # Requesters that waited for an in-flight retrieval reuse its result
+        if _saved_since(name, data_dir, requested_at):
+            dataset = read_dataset(name, data_dir)
+            if dataset is not None:
+                return dataset
+        stamps = _RETRIEVED_STAMPS.get()
+        checked_at = read_checked_at(name, data_dir) if stamps is not None else None
+        dataset = _retrieve_dataset(
+            name, dataset_metadata, data_dir, skip_cache, force_overwrite, skip_update
+        )
+        if stamps is not None:
+            stamps[name] = (checked_at, read_checked_at(name, data_dir))
+        return dataset
+
+
+@contextlib.contextmanager
+def recording_retrievals() -> Iterator[
+    Dict[str, Tuple[Optional[dt.datetime], Optional[dt.datetime]]]
+]:
+    """
+    Record the freshness stamps of the datasets retrieved in this context.
+
+    Yields
+    ------
+    Dict[str, Tuple[Optional[dt.datetime], Optional[dt.datetime]]]
+        Filled with the stamps of each dataset whose retriever ran, read under
+        its fetch lock before and after the retrieval. They are equal if the
+        retrieval was not saved. Datasets served from the cache, or retrieved
+        by another requester first, are left out.
+    """
+    stamps = {}
+    token = _RETRIEVED_STAMPS.set(stamps)
+    try:
+        yield stamps
+    finally:
+        _RETRIEVED_STAMPS.reset(token)
+
+
+def _saved_since(name: str, data_dir: Path, timestamp_ns: Optional[int]) -> bool:
+    """Check whether a dataset's metadata was written after a given time."""
+    if timestamp_ns is None:
+        return False
+    try:
+        return get_metadata_path(name, data_dir).stat().st_mtime_ns >= timestamp_ns
+    except FileNotFoundError:
+        return False
+
+
+def _retrieve_dataset(
+    name: str,
+    dataset_metadata: Dict,
+    data_dir: Path,
+    skip_cache: bool,
+    force_overwrite: bool,
+    skip_update: bool,
+) -> Dataset:
+    """Run a dataset's retriever and save the result to the cache."""
     function_string = dataset_metadata["function"]
     module, function = function_string.split(".")
     path_prefix = "econuy.retrieval."
     module = importlib.import_module(path_prefix + module)
     dataset_retriever = getattr(module, function)
 
+    offline = offline_enabled()
+    use_raw_cache = raw_cache_enabled() or offline
+    if use_raw_cache and not (skip_cache or force_overwrite or offline):
+        dataset = _reuse_unchanged_dataset(name, data_dir)
+        if dataset is not None:
+            return dataset
+
     signature = inspect.signature(dataset_retriever)
     parameters = signature.parameters
-    if parameters:
-        dataset = dataset_retriever(data_dir, skip_cache, force_overwrite, skip_update)
-    else:
-        dataset = dataset_retriever()
+    with (
+        (
+            recording_downloads(data_dir)
+            if use_raw_cache
+            else contextlib.nullcontext({})
+        ) as downloaded,
+        caching_frozen(data_dir),
+    ):
+        if parameters:
+            dataset = dataset_retriever(
+                data_dir, skip_cache, force_overwrite, skip_update
+            )
+        else:
+            dataset = dataset_retriever()
+
+    if vintages_enabled():
+        # Archive retrievals, including those that are not saved to the cache
+        save_vintage(dataset, data_dir)
 
+    saved = True
     if not force_overwrite:
         existing_dataset = read_dataset(name, data_dir)
         if existing_dataset is not None:
             try:
                 check_updated_dataset(existing_dataset, dataset)
+                if _is_unchanged(existing_dataset, dataset):
+                    # Only new data makes the dataset fresh, so a source that
+                    # has not published yet is checked again
+                    dataset.metadata.created_at = existing_dataset.metadata.created_at
+                    dataset.metadata.checked_at = dt.datetime.now()
                 dataset.save(data_dir)
             except AssertionError as exc:
+                saved = False
                 print(f"Dataset {name} has changed. Will not overwrite. Error: {exc}")
         else:
             dataset.save(data_dir)
     else:
         dataset.save(data_dir)
 
+    if use_raw_cache and saved:
+        save_source_validators(
+            name, data_dir, _get_revalidatable_sources(name, downloaded)
+        )
+
+    return dataset
+
+
+def _reuse_unchanged_dataset(name: str, data_dir: Path) -> Optional[Dataset]:
+    """Return the cached dataset, marked as checked, if none of its sources changed."""
+    validators = read_source_validators(name, data_dir)
+    if not validators:
+        return None
+    dataset = read_dataset(name, data_dir)
+    if dataset is None or not sources_unchanged(validators, data_dir):
+        return None
+    print(f"Sources of dataset {name} have not changed. Reusing cached dataset.")
+    dataset.metadata.checked_at = dt.datetime.now()
+    dataset.save(data_dir)
     return dataset
 
 
+def _is_unchanged(existing: Dataset, dataset: Dataset) -> bool:
+    """Check whether a retrieved dataset has the same data as the cached one."""
+    return (
+        existing.data.equals(dataset.data)
+        and existing.metadata.indicator_metadata == dataset.metadata.indicator_metadata
+    )
+
+
+def _get_revalidatable_sources(
+    name: str, downloaded: Dict[str, Optional[Dict[str, str]]]
+) -> Optional[Dict[str, Dict[str, str]]]:
+    """
+    Get the validators that tell whether a dataset's retriever would return the
+    same dataset, or None if its sources cannot be revalidated.
+
+    This requires the retriever to only read its registry sources with
+    ``download``, to have downloaded exactly those and to have no dependencies,
+    and every response to have had an ``ETag`` or ``Last-Modified`` header.
+    """
+    entry = REGISTRY[name]
+    keys = get_prefetchable_sources(entry["function"])
+    urls = {entry["sources"]["downloads"][key] for key in keys}
+    if (
+        not urls
+        or set(downloaded) != urls
+        or any(x is None for x in downloaded.values())
+        or REGISTRY.get_dependencies(name)
+    ):
+        return None
+    return downloaded
+
+
 def load_datasets_parallel(
     names: List[str],
     data_dir: Union[str, Path, None] = None,
@@ -123,10 +465,15 @@ def load_datasets_parallel(
     skip_update: bool = False,
     max_workers: Optional[int] = None,
     executor_type: Literal["thread", "process"] = "thread",
+    stale_while_revalidate: bool = False,
 ) -> Dict[str, Dataset]:
     """
     Load multiple datasets in parallel using either threading or multiprocessing.
 
+    Datasets are scheduled according to their dependencies in the registry (see
+    ``DatasetRegistry.get_dependencies``). Each dependency is loaded once, before
+    the datasets that need it, and independent datasets are loaded concurrently.
+
     Parameters
     ----------
     names : List[str]
@@ -143,18 +490,49 @@ def load_datasets_parallel(
         Maximum number of workers to use for parallel loading. If None, it will use the default number of workers.
     executor_type : Literal["thread", "process"], optional
         Type of executor to use for parallel loading. Can be "thread" for ThreadPoolExecutor or "process" for ProcessPoolExecutor. Default is "thread".
+    stale_while_revalidate : bool, optional
+        If True, outdated cached datasets are returned immediately as stale and
+        refreshed in background threads, as in ``load_dataset``. Only the
+        datasets that are not cached are loaded before returning. Default is
+        False.
 
     Returns
     -------
     Dict[str, Dataset]
         A dictionary where keys are dataset names and values are the loaded datasets.
+        When using processes, workers write each dataset to an Arrow IPC file and
+        the returned datasets are backed by read-only memory maps of those files,
+        which avoids pickling the data back to the parent process.
 
     Raises
     ------
     Exception
         If there is an error loading any of the datasets, it will be printed and the dataset will be skipped.
+    graphlib.CycleError
+        If the dependencies of the datasets are circular.
     """
     datasets = {}
+    if stale_while_revalidate and not (skip_cache or skip_update):
+        # Stale datasets are read in this process, which also owns their refreshes
+        cache_dir = Path(data_dir or get_data_dir())
+        for name in names:
+            created_at = read_created_at(name, cache_dir)
+            if created_at is not None and is_outdated(
+                name, created_at, checked_at=read_checked_at(name, cache_dir)
+            ):
+                datasets[name] = load_dataset(
+                    name,
+                    cache_dir,
+                    force_overwrite=force_overwrite,
+                    stale_while_revalidate=True,
+                )
+        names = [x for x in names if x not in datasets]
+        if not names:
+            return datasets
+
+    graph = get_dependency_graph(names, data_dir, skip_cache, skip_update)
+    sorter = graphlib.TopologicalSorter(graph)
+    sorter.prepare()
 
     # We first pick an executor, then get the default workers used in the stdlib code.
     # If max_workers is not set, we use the default number of workers.
@@ -167,28 +545,439 @@ def load_datasets_parallel(
         default_workers = os.cpu_count() or 1
 
     workers = max_workers or default_workers
-    workers = min(workers, len(names))
-
-    with executor_class(workers) as executor:
-        future_to_name = {
-            executor.submit(
-                load_dataset, name, data_dir, skip_cache, force_overwrite, skip_update
-            ): name
-            for name in names
+    workers = min(workers, len(graph))
+
+    if executor_type == "process":
+        # Workers return handles to Arrow IPC files instead of pickled datasets.
+        # Mapped files remain readable after the directory is removed on POSIX.
+        handles_dir = tempfile.TemporaryDirectory(
+            prefix="econuy_", ignore_cleanup_errors=True
+        )
+        handles_path = handles_dir.name
+    else:
+        handles_dir = contextlib.nullcontext()
+        handles_path = None
+
+    # Dependents read datasets retrieved earlier in the run from the cache
+    # instead of retrieving them again when skip_cache is set.
+    refreshed_after = time.time_ns()
+    if executor_type == "process":
+        # Worker processes take request slots from a shared directory, get an
+        # equal share of each host's rate and have their own workbook cache
+        slots_dir = Path(handles_path, "slots")
+        executor_kwargs = {
+            "initializer": _init_worker,
+            "initargs": (slots_dir, 1 / workers),
         }
-        with tqdm(total=len(names), desc="Loading datasets") as pbar:
-            for future in futures.as_completed(future_to_name):
-                name = future_to_name[future]
-                pbar.set_postfix_str(name)
-                try:
-                    dataset = future.result()
-                    datasets[name] = dataset
-                except Exception as exc:
-                    print(f"Error loading dataset {name} | {exc}")
-                pbar.update(1)
+        workbooks = contextlib.nullcontext()
+    else:
+        executor_kwargs = {}
+        workbooks = sharing_workbooks()
+
+    with (
+        handles_dir,
+        workbooks as shared_workbooks,
+        executor_class(workers, **executor_kwargs) as executor,
+    ):
+        future_to_name = {}
+        with tqdm(total=len(graph), desc="Loading datasets") as pbar:
+            while sorter.is_active():
+                for name in sorter.get_ready():
+                    future = executor.submit(
+                        _load_scheduled,
+                        name,
+                        data_dir,
+                        skip_cache,
+                        force_overwrite,
+                        skip_update,
+                        refreshed_after=refreshed_after,
+                        workbooks=shared_workbooks,
+                        handles_dir=handles_path,
+                        keep=name in names,
+                    )
+                    future_to_name[future] = name
+                done, _ = futures.wait(
+                    future_to_name, return_when=futures.FIRST_COMPLETED
+                )
+                for future in done:
+                    name = future_to_name.pop(future)
+                    pbar.set_postfix_str(name)
+                    try:
+                        dataset = future.result()
+                        if isinstance(dataset, DatasetHandle):
+                            dataset = dataset.load()
+                        if name in names:
+                            datasets[name] = dataset
+                    except Exception as exc:
+                        print(f"Error loading dataset {name} | {exc}")
+                    # Dependents still run if a dependency failed, and retry it
+                    sorter.done(name)
+                    pbar.update(1)
     return datasets
 
 
+def get_dependency_graph(
+    names: List[str],
+    data_dir: Union[str, Path, None] = None,
+    skip_cache: bool = False,
+    skip_update: bool = False,
+) -> Dict[str, List[str]]:
+    """
+    Get the datasets needed to load ``names`` and their dependencies.
+
+    Dependencies of datasets that will be read from the cache are not needed and
+    are left out.
+
+    Parameters
+    ----------
+    names : List[str]
+        The names of the datasets to load.
+    data_dir : Union[str, Path, None], optional
+        Directory where datasets are stored. If None, a default directory is used.
+    skip_cache : bool, optional
+        If True, all datasets will be retrieved. Default is False.
+    skip_update : bool, optional
+        If True, outdated datasets will be read from the cache. Default is False.
+
+    Returns
+    -------
+    Dict[str, List[str]]
+        A mapping of every dataset in ``names`` or in their transitive
+        dependencies to the datasets it depends on.
+    """
+    data_dir = Path(data_dir or get_data_dir())
+    graph = {}
+    pending = list(names)
+    while pending:
+        name = pending.pop()
+        if name in graph:
+            continue
+        graph[name] = []
+        if _is_served_from_cache(name, data_dir, skip_cache, skip_update):
+            continue
+        try:
+            graph[name] = REGISTRY.get_dependencies(name)
+        except KeyError:
+            # Unknown names fail when loaded, as with load_dataset
+            pass
+        pending.extend(graph[name])
+    return graph
+
+
+def _load_scheduled(
+    name: str,
+    *args,
+    refreshed_after: int,
+    workbooks: Optional[WorkbookCache] = None,
+    handles_dir: Union[str, Path, None] = None,
+    keep: bool = True,
+    **kwargs,
+) -> Union[Dataset, DatasetHandle, None]:
+    """
+    Load a dataset in a worker.
+
+    Workbooks are shared through ``workbooks`` if it is set. Returns a handle to
+    a shared copy if ``handles_dir`` is set, and nothing if the dataset is only
+    loaded as a dependency and ``keep`` is False.
+    """
+    token = _REFRESHED_AFTER.set(refreshed_after)
+    try:
+        with (
+            sharing_workbooks(workbooks)
+            if workbooks is not None
+            else contextlib.nullcontext()
+        ):
+            dataset = load_dataset(name, *args, **kwargs)
+    finally:
+        _REFRESHED_AFTER.reset(token)
+    if not keep:
+        return None
+    if handles_dir is not None:
+        return DatasetHandle.from_dataset(dataset, handles_dir)
+    return dataset
+
+
+def _init_worker(slots_dir: Path, rate_share: float) -> None:
+    """Set up a worker process of ``load_datasets_parallel``."""
+    share_limits(slots_dir, rate_share)
+    WORKBOOKS.set(WorkbookCache())
+    return
+
+
+def _is_served_from_cache(
+    name: str, data_dir: Path, skip_cache: bool, skip_update: bool
+) -> bool:
+    """Check whether ``load_dataset`` would return a dataset from the cache."""
+    if skip_cache:
+        return False
+    created_at = read_created_at(name, data_dir)
+    if created_at is None:
+        return False
+    checked_at = read_checked_at(name, data_dir)
+    return skip_update or not is_outdated(name, created_at, checked_at=checked_at)
+
+
+async def aload_dataset(
+    name: str,
+    data_dir: Union[str, Path, None] = None,
+    skip_cache: bool = False,
+    force_overwrite: bool = False,
+    skip_update: bool = False,
+    client: Optional[httpx.AsyncClient] = None,
+    executor: Optional[futures.Executor] = None,
+) -> Dataset:
+    """
+    Load a dataset by name without blocking the event loop.
+
+    Sources of async-capable retrievers, those that only read their downloads
+    with pandas (see ``get_prefetchable_sources``), are downloaded concurrently
+    on the event loop. The retriever then parses them in an executor. Other
+    retrievers run entirely in the executor, as with ``load_dataset``.
+
+    Parameters
+    ----------
+    name : str
+        The name of the dataset to load.
+    data_dir : Union[str, Path, None], optional
+        The directory where the dataset is stored or will be stored. If None,
+        the default data directory is used. Default is None.
+    skip_cache : bool, optional
+        If True, the cache will be skipped and a new dataset will be retrieved.
+        Default is False.
+    force_overwrite : bool, optional
+        If True, the existing dataset will be overwritten. Default is False.
+    skip_update : bool, optional
+        If True, the dataset will not be updated if it already exists. Default is False.
+    client : Optional[httpx.AsyncClient], optional
+        Client used to download sources. If None, a new client is used.
+    executor : Optional[futures.Executor], optional
+        Executor for cache reads, parsing and sync retrievers. If None, a shared
+        thread pool with ``ECONUY_ASYNC_WORKERS`` workers is used.
+
+    Returns
+    -------
+    Dataset
+        The loaded dataset.
+    """
+    data_dir = Path(data_dir or get_data_dir())
+    loop = asyncio.get_running_loop()
+    executor = executor or _get_async_executor()
+
+    prefetched = {}
+    served = await loop.run_in_executor(
+        executor, _is_served_from_cache, name, data_dir, skip_cache, skip_update
+    )
+    # Datasets with revalidatable sources are checked with conditional requests
+    # before their retriever runs, which makes prefetching them wasteful
+    revalidated = (
+        raw_cache_enabled()
+        and not (skip_cache or force_overwrite)
+        and read_source_validators(name, data_dir) is not None
+    )
+    if not (served or revalidated or offline_enabled()) and name in REGISTRY.registry:
+        function_string = REGISTRY[name]["function"]
+        keys = get_prefetchable_sources(function_string)
+        urls = [REGISTRY[name]["sources"]["downloads"][key] for key in keys]
+        if urls:
+            try:
+                prefetched = await _prefetch(urls, client)
+            except httpx.HTTPError:
+                # Let the retriever download its sources itself
+                prefetched = {}
+
+    context = contextvars.copy_context()
+    context.run(PREFETCHED_SOURCES.set, prefetched)
+    return await loop.run_in_executor(
+        executor,
+        functools.partial(
+            context.run,
+            load_dataset,
+            name,
+            data_dir,
+            skip_cache,
+            force_overwrite,
+            skip_update,
+        ),
+    )
+
+
+async def aload_datasets(
+    names: List[str],
+    data_dir: Union[str, Path, None] = None,
+    skip_cache: bool = False,
+    force_overwrite: bool = False,
+    skip_update: bool = False,
+    max_workers: Optional[int] = None,
+) -> Dict[str, Dataset]:
+    """
+    Load multiple datasets concurrently on the running event loop.
+
+    Datasets are scheduled according to their dependencies, as in
+    ``load_datasets_parallel``, and all downloads share one ``httpx.AsyncClient``.
+
+    Parameters
+    ----------
+    names : List[str]
+        List of dataset names to load.
+    data_dir : Union[str, Path, None], optional
+        Directory where datasets are stored. If None, a default directory is used.
+    skip_cache : bool, optional
+        If True, skip loading from cache. Default is False.
+    force_overwrite : bool, optional
+        If True, force overwrite existing datasets. Default is False.
+    skip_update : bool, optional
+        If True, skip updating datasets that already exist. Default is False.
+    max_workers : Optional[int], optional
+        Maximum number of threads used for parsing and sync retrievers. If None,
+        the shared executor of ``aload_dataset`` is used.
+
+    Returns
+    -------
+    Dict[str, Dataset]
+        A dictionary where keys are dataset names and values are the loaded datasets.
+
+    Raises
+    ------
+    Exception
+        If there is an error loading any of the datasets, it will be printed and the dataset will be skipped.
+    graphlib.CycleError
+        If the dependencies of the datasets are circular.
+    """
+    data_dir = Path(data_dir or get_data_dir())
+    graph = get_dependency_graph(names, data_dir, skip_cache, skip_update)
+    graphlib.TopologicalSorter(graph).prepare()
+
+    if max_workers is not None:
+        executor = futures.ThreadPoolExecutor(max_workers)
+    else:
+        executor = contextlib.nullcontext(_get_async_executor())
+    refreshed_after = time.time_ns()
+    tasks = {}
+    datasets = {}
+
+    async def load(name: str) -> None:
+        # Dependents still run if a dependency failed, and retry it
+        await asyncio.gather(*(tasks[x] for x in graph[name]), return_exceptions=True)
+        try:
+            datasets[name] = await aload_dataset(
+                name,
+                data_dir,
+                skip_cache,
+                force_overwrite,
+                skip_update,
+                client=client,
+                executor=pool,
+            )
+        except Exception as exc:
+            print(f"Error loading dataset {name} | {exc}")
+
+    token = _REFRESHED_AFTER.set(refreshed_after)
+    try:
+        with sharing_workbooks():
+            async with httpx.AsyncClient(**get_client_kwargs(ALL_PROVIDERS)) as client:
+                with executor as pool:
+                    for name in graph:
+                        tasks[name] = asyncio.ensure_future(load(name))
+                    with tqdm(total=len(graph), desc="Loading datasets") as pbar:
+                        for task in asyncio.as_completed(list(tasks.values())):
+                            await task
+                            pbar.update(1)
+    finally:
+        _REFRESHED_AFTER.reset(token)
+    return {name: datasets[name] for name in names if name in datasets}
+
+
+async def _prefetch(
+    urls: List[str], client: Optional[httpx.AsyncClient] = None
+) -> Dict[str, httpx.Response]:
+    """Download several URLs concurrently and return their responses by URL."""
+    async with contextlib.AsyncExitStack() as stack:
+        if client is None:
+            client = await stack.enter_async_context(
+                httpx.AsyncClient(**get_client_kwargs(ALL_PROVIDERS))
+            )
+        responses = await asyncio.gather(
+            *(
+                asend_with_retries(url, functools.partial(client.get, url))
+                for url in urls
+            )
+        )
+    for response in responses:
+        response.raise_for_status()
+    return dict(zip(urls, responses))
+
+
+def refresh_in_background(
+    name: str,
+    data_dir: Union[str, Path, None] = None,
+    force_overwrite: bool = False,
+) -> futures.Future:
+    """
+    Retrieve an outdated dataset in a background thread.
+
+    The retrieval goes through ``load_dataset``, so the cache is swapped
+    atomically once it finishes and readers see either the stale or the new
+    dataset. Only one background refresh per dataset and cache directory runs at
+    a time. Refreshes use ``ECONUY_REFRESH_WORKERS`` threads (4 by default), and
+    the interpreter waits for running refreshes before exiting.
+
+    Parameters
+    ----------
+    name : str
+        The name of the dataset.
+    data_dir : Union[str, Path, None], optional
+        The cache directory. If None, the default data directory is used.
+    force_overwrite : bool, optional
+        If True, the existing dataset will be overwritten. Default is False.
+
+    Returns
+    -------
+    futures.Future
+        The refresh, whose result is the new dataset.
+    """
+    data_dir = Path(data_dir or get_data_dir())
+    key = (name, data_dir.resolve().as_posix())
+    with _REFRESHES_LOCK:
+        future = _REFRESHES.get(key)
+        if future is not None and not future.done():
+            return future
+        context = contextvars.copy_context()
+        future = _get_refresh_executor().submit(
+            context.run, load_dataset, name, data_dir, False, force_overwrite
+        )
+        _REFRESHES[key] = future
+    future.add_done_callback(functools.partial(_report_refresh, name))
+    return future
+
+
+def _report_refresh(name: str, future: futures.Future) -> None:
+    exc = future.exception()
+    if exc is not None:
+        print(f"Error refreshing dataset {name} in the background | {exc}")
+
+
+def _get_refresh_executor() -> futures.ThreadPoolExecutor:
+    global _REFRESH_EXECUTOR
+    if _REFRESH_EXECUTOR is None:
+        workers = int(os.getenv("ECONUY_REFRESH_WORKERS", 4))
+        _REFRESH_EXECUTOR = futures.ThreadPoolExecutor(
+            workers, thread_name_prefix="econuy_refresh"
+        )
+    return _REFRESH_EXECUTOR
+
+
+def _get_async_executor() -> futures.ThreadPoolExecutor:
+    global _ASYNC_EXECUTOR
+    if _ASYNC_EXECUTOR is None:
+        workers = int(
+            os.getenv("ECONUY_ASYNC_WORKERS", min(32, (os.cpu_count() or 1) + 4))
+        )
+        _ASYNC_EXECUTOR = futures.ThreadPoolExecutor(
+            workers, thread_name_prefix="econuy_async"
+        )
+    return _ASYNC_EXECUTOR
+
+
 def check_updated_dataset(original: Dataset, new: Dataset) -> None:  # noqa: F821
     assert original.metadata.name == new.metadata.name, "Datasets have different names"
     assert (
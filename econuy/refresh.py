@@ -0,0 +1,374 @@
+import argparse
+import contextvars
+import datetime as dt
+import json
+import signal
+import threading
+import time
+from concurrent import futures
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union
+
+from econuy.load import get_next_refresh, load_dataset, recording_retrievals
+from econuy.utils.locking import FileLock, atomic_path
+from econuy.utils.operations import (
+    REGISTRY,
+    get_data_dir,
+    read_checked_at,
+    read_created_at,
+)
+from econuy.utils.retrieval import sharing_workbooks
+
+
+REFRESH_DIRNAME = "refresh"
+JOURNAL_FILENAME = "journal.jsonl"
+STATUS_FILENAME = "status.json"
+POLL_INTERVAL = 300.0
+MAX_WORKERS = 4
+RETRY_DELAY = dt.timedelta(minutes=15)
+MAX_RETRY_DELAY = dt.timedelta(hours=6)
+# Statuses of runs after which the dataset is fresh
+SUCCESS_STATUSES = ("success", "fresh")
+
+
+def get_refresh_dir(data_dir: Path) -> Path:
+    return Path(data_dir) / REFRESH_DIRNAME
+
+
+def get_journal_path(data_dir: Path) -> Path:
+    return get_refresh_dir(data_dir) / JOURNAL_FILENAME
+
+
+def get_status_path(data_dir: Path) -> Path:
+    return get_refresh_dir(data_dir) / STATUS_FILENAME
+
+
+def _get_journal_lock(data_dir: Path) -> FileLock:
+    return FileLock(get_refresh_dir(data_dir) / ".lock")
+
+
+def read_status(data_dir: Union[str, Path, None] = None) -> Dict[str, Dict]:
+    """
+    Read the refresh status of each dataset refreshed by the refresh service.
+
+    Parameters
+    ----------
+    data_dir : Union[str, Path, None], optional
+        The cache directory. If None, the default data directory is used.
+
+    Returns
+    -------
+    Dict[str, Dict]
+        Keyed by dataset name, with the ``last_attempt`` and ``last_success``
+        timestamps, the ``last_duration`` in seconds, the ``last_status`` and
+        ``last_error`` of the latest run, and the number of consecutive
+        ``failures``.
+    """
+    path = get_status_path(Path(data_dir or get_data_dir()))
+    if not path.exists():
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def read_journal(
+    data_dir: Union[str, Path, None] = None, name: Optional[str] = None
+) -> List[Dict]:
+    """
+    Read the run journal of the refresh service.
+
+    Parameters
+    ----------
+    data_dir : Union[str, Path, None], optional
+        The cache directory. If None, the default data directory is used.
+    name : Optional[str], optional
+        If given, only return the runs of this dataset.
+
+    Returns
+    -------
+    List[Dict]
+        One entry per run, oldest first, with the dataset ``name``, its
+        ``started_at`` and ``finished_at`` timestamps, ``duration`` in seconds,
+        ``status`` and ``error``. The status is ``success`` if the dataset was
+        refreshed, ``fresh`` if it had already been refreshed by another
+        process or loader, ``rejected`` if the retrieval failed validation
+        and ``error`` if it raised.
+    """
+    path = get_journal_path(Path(data_dir or get_data_dir()))
+    if not path.exists():
+        return []
+    with open(path, "r") as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    if name is not None:
+        entries = [entry for entry in entries if entry["name"] == name]
+    return entries
+
+
+def get_next_run(
+    name: str, data_dir: Path, status: Optional[Dict[str, Dict]] = None
+) -> dt.datetime:
+    """
+    Get the time at which the refresh service should next refresh a dataset.
+
+    That is the time at which its cached version becomes outdated according to
+    its refresh policy, or immediately if it is not cached. After failed runs
+    the dataset is retried with exponential backoff, starting at 15 minutes and
+    capped at 6 hours, so a broken source is not requested on every poll.
+
+    Parameters
+    ----------
+    name : str
+        The name of the dataset.
+    data_dir : Path
+        The cache directory.
+    status : Optional[Dict[str, Dict]], optional
+        The refresh status, from ``read_status``. Read if None.
+
+    Returns
+    -------
+    dt.datetime
+        The time of the next run.
+    """
+    if status is None:
+        status = read_status(data_dir)
+    created_at = read_created_at(name, data_dir)
+    if created_at is None:
+        next_run = dt.datetime.min
+    else:
+        next_run = get_next_refresh(name, created_at, read_checked_at(name, data_dir))
+    entry = status.get(name)
+    if entry and entry["failures"]:
+        delay = min(RETRY_DELAY * 2 ** (entry["failures"] - 1), MAX_RETRY_DELAY)
+        retry_at = dt.datetime.fromisoformat(entry["last_attempt"]) + delay
+        next_run = max(next_run, retry_at)
+    return next_run
+
+
+def get_due_datasets(
+    names: Sequence[str], data_dir: Path, now: Optional[dt.datetime] = None
+) -> List[str]:
+    """Get the datasets whose next run is due."""
+    now = now or dt.datetime.now()
+    status = read_status(data_dir)
+    return [name for name in names if get_next_run(name, data_dir, status) <= now]
+
+
+def refresh_dataset(name: str, data_dir: Union[str, Path, None] = None) -> Dict:
+    """
+    Refresh a dataset through ``load_dataset`` and record the run.
+
+    The run is appended to the journal and the dataset's refresh status is
+    updated. Errors are recorded instead of raised. Datasets refreshed by
+    another process or loader before the run got hold of them are recorded as
+    ``fresh``.
+
+    Parameters
+    ----------
+    name : str
+        The name of the dataset.
+    data_dir : Union[str, Path, None], optional
+        The cache directory. If None, the default data directory is used.
+
+    Returns
+    -------
+    Dict
+        The journal entry of the run.
+    """
+    data_dir = Path(data_dir or get_data_dir())
+    started_at = dt.datetime.now()
+    start = time.perf_counter()
+    error = None
+    try:
+        with recording_retrievals() as stamps:
+            load_dataset(name, data_dir)
+        if name not in stamps:
+            status = "fresh"
+        elif stamps[name][0] == stamps[name][1]:
+            # The retrieval was not saved because it failed validation
+            status = "rejected"
+        else:
+            status = "success"
+    except Exception as exc:
+        status = "error"
+        error = f"{type(exc).__name__}: {exc}"
+    entry = {
+        "name": name,
+        "started_at": started_at.isoformat(),
+        "finished_at": dt.datetime.now().isoformat(),
+        "duration": round(time.perf_counter() - start, 3),
+        "status": status,
+        "error": error,
+    }
+    _record_run(entry, data_dir)
+    return entry
+
+
+def _record_run(entry: Dict, data_dir: Path) -> None:
+    with _get_journal_lock(data_dir):
+        with open(get_journal_path(data_dir), "a") as f:
+            f.write(json.dumps(entry) + "\n")
+
+        status = read_status(data_dir)
+        previous = status.get(entry["name"], {})
+        success = entry["status"] in SUCCESS_STATUSES
+        status[entry["name"]] = {
+            "last_attempt": entry["started_at"],
+            "last_success": (
+                entry["finished_at"] if success else previous.get("last_success")
+            ),
+            "last_duration": entry["duration"],
+            "last_status": entry["status"],
+            "last_error": entry["error"],
+            "failures": 0 if success else previous.get("failures", 0) + 1,
+        }
+        with atomic_path(get_status_path(data_dir)) as tmp_path:
+            with open(tmp_path, "w") as f:
+                json.dump(status, f, indent=4)
+    return
+
+
+def run_once(
+    names: Optional[Sequence[str]] = None,
+    data_dir: Union[str, Path, None] = None,
+    max_workers: int = MAX_WORKERS,
+    now: Optional[dt.datetime] = None,
+) -> List[Dict]:
+    """
+    Refresh the datasets that are due.
+
+    Downloads go through the shared HTTP clients, so they respect the per-host
+    limits in ``econuy.utils.throttling``, and workbooks read by several
+    datasets are downloaded once.
+
+    Parameters
+    ----------
+    names : Optional[Sequence[str]], optional
+        The datasets to consider. If None, all available datasets in the
+        registry.
+    data_dir : Union[str, Path, None], optional
+        The cache directory. If None, the default data directory is used.
+    max_workers : int, optional
+        The number of datasets refreshed at a time. Default is 4.
+    now : Optional[dt.datetime], optional
+        The time to check due datasets against. Default is the current time.
+
+    Returns
+    -------
+    List[Dict]
+        The journal entries of the runs.
+    """
+    data_dir = Path(data_dir or get_data_dir())
+    names = REGISTRY.list_available() if names is None else names
+    due = get_due_datasets(names, data_dir, now)
+    if not due:
+        return []
+    with (
+        sharing_workbooks(),
+        futures.ThreadPoolExecutor(
+            max_workers, thread_name_prefix="econuy_refresh_service"
+        ) as executor,
+    ):
+        return list(
+            executor.map(
+                lambda name: contextvars.copy_context().run(
+                    refresh_dataset, name, data_dir
+                ),
+                due,
+            )
+        )
+
+
+def serve(
+    names: Optional[Sequence[str]] = None,
+    data_dir: Union[str, Path, None] = None,
+    max_workers: int = MAX_WORKERS,
+    poll_interval: float = POLL_INTERVAL,
+    stop: Optional[threading.Event] = None,
+) -> None:
+    """
+    Keep the cache warm by refreshing each dataset when it is due, until
+    stopped.
+
+    Parameters
+    ----------
+    names : Optional[Sequence[str]], optional
+        The datasets to refresh. If None, all available datasets in the
+        registry.
+    data_dir : Union[str, Path, None], optional
+        The cache directory. If None, the default data directory is used.
+    max_workers : int, optional
+        The number of datasets refreshed at a time. Default is 4.
+    poll_interval : float, optional
+        Maximum number of seconds between checks for due datasets, so that
+        datasets loaded by other processes are picked up. Default is 300.
+    stop : Optional[threading.Event], optional
+        Stops the service when set.
+    """
+    data_dir = Path(data_dir or get_data_dir())
+    names = REGISTRY.list_available() if names is None else names
+    stop = stop or threading.Event()
+    while not stop.is_set():
+        for entry in run_once(names, data_dir, max_workers):
+            message = f"Refreshed {entry['name']} in {entry['duration']:.1f}s"
+            if entry["status"] == "fresh":
+                message = f"Dataset {entry['name']} was already fresh"
+            elif entry["status"] != "success":
+                message += f" | {entry['status']}: {entry['error']}"
+            print(message)
+        status = read_status(data_dir)
+        next_run = min(
+            (get_next_run(name, data_dir, status) for name in names),
+            default=dt.datetime.max,
+        )
+        wait = (next_run - dt.datetime.now()).total_seconds()
+        stop.wait(min(max(wait, 0), poll_interval))
+    return
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Entry point of the ``econuy-refresh`` command."""
+    parser = argparse.ArgumentParser(
+        prog="econuy-refresh",
+        description="Keep the econuy cache warm by refreshing datasets when due.",
+    )
+    parser.add_argument("names", nargs="*", help="Datasets to refresh. Default all.")
+    parser.add_argument("--data-dir", help="The cache directory.")
+    parser.add_argument(
+        "--workers", type=int, default=MAX_WORKERS, help="Datasets refreshed at a time."
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=POLL_INTERVAL,
+        help="Maximum seconds between checks for due datasets.",
+    )
+    parser.add_argument(
+        "--once", action="store_true", help="Refresh due datasets once and exit."
+    )
+    parser.add_argument(
+        "--status", action="store_true", help="Print the refresh status and exit."
+    )
+    args = parser.parse_args(argv)
+    names = args.names or None
+
+    if args.status:
+        status = read_status(args.data_dir)
+        if names is not None:
+            status = {name: status[name] for name in names if name in status}
+        print(json.dumps(status, indent=4))
+        return 0
+    if args.once:
+        entries = run_once(names, args.data_dir, args.workers)
+        return int(any(entry["status"] == "error" for entry in entries))
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    try:
+        serve(names, args.data_dir, args.workers, args.poll_interval, stop)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
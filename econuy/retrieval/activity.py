@@ -8,17 +8,28 @@ from os import listdir, path
 import pandas as pd
 import numpy as np
 import patoolib
-import httpx
-from pandas.tseries.offsets import MonthEnd
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 
+from econuy.utils.excel import open_excel, read_excel
+from econuy.utils.frozen import read_frozen_source
 from econuy.utils.operations import get_download_sources, get_name_from_function
-from econuy.utils.chromedriver import _build
+from econuy.utils.chromedriver import _build, _get_page
 from econuy.base import Dataset, DatasetMetadata
 from econuy import load_dataset
-from econuy.utils.retrieval import get_with_ssl_context
+from econuy.utils.retrieval import download, download_to_file, http_get
+
+
+def _splice_older(dataset: Dataset, *olders: pd.DataFrame) -> Dataset:
+    """
+    Extend a dataset backwards with older series of its indicators, newest
+    first, keeping its metadata, since the older series are part of its sources.
+    """
+    spliced = dataset
+    for older in olders:
+        spliced = spliced.splice(Dataset(dataset.name, older, dataset.metadata))
+    return Dataset(dataset.name, spliced.data, dataset.metadata)
 
 
 def monthly_gdp() -> Dataset:
@@ -34,7 +45,7 @@ def monthly_gdp() -> Dataset:
 
     with tempfile.TemporaryDirectory() as tmp_dir:
         driver = _build(tmp_dir)
-        driver.get(sources["main"])
+        _get_page(driver, sources["main"])
         button = WebDriverWait(driver, 3).until(
             EC.element_to_be_clickable(
                 (By.CSS_SELECTOR, "button.dt-button.buttons-excel.buttons-html5")
@@ -44,7 +55,7 @@ def monthly_gdp() -> Dataset:
         time.sleep(3)
         driver.quit()
         filepath = list(Path(tmp_dir).glob("*.xlsx"))[0]
-        output = pd.read_excel(filepath, index_col=0)
+        output = read_excel(filepath, index_col=0)
 
     output.index = pd.date_range(start="2016-01-31", freq="ME", periods=len(output))
     output = output.rename_axis(None)
@@ -94,8 +105,8 @@ def national_accounts_supply_constant_nsa() -> Dataset:
     name = get_name_from_function()
     sources = get_download_sources(name)
 
-    r_bytes = get_with_ssl_context("bcu", sources["main"])
-    raw = pd.read_excel(r_bytes, skiprows=7)
+    r_bytes = download(sources["main"])
+    raw = read_excel(r_bytes, skiprows=7)
     output = raw.dropna(how="all", axis=1).iloc[:, 2:].dropna(how="all").T
     output.index = pd.date_range(start="2016-03-31", freq="QE-DEC", periods=len(output))
     output = output.apply(pd.to_numeric, errors="coerce").rename_axis(None)
@@ -149,8 +160,8 @@ def national_accounts_demand_constant_nsa() -> Dataset:
     name = get_name_from_function()
     sources = get_download_sources(name)
 
-    r_bytes = get_with_ssl_context("bcu", sources["main"])
-    raw = pd.read_excel(r_bytes, skiprows=7)
+    r_bytes = download(sources["main"])
+    raw = read_excel(r_bytes, skiprows=7)
     output = raw.dropna(how="all", axis=1).iloc[:, 2:].dropna(how="all").T
     output.index = pd.date_range(start="2016-03-31", freq="QE-DEC", periods=len(output))
     output = output.apply(pd.to_numeric, errors="coerce").rename_axis(None)
@@ -201,8 +212,8 @@ def national_accounts_demand_current_nsa() -> Dataset:
     name = get_name_from_function()
     sources = get_download_sources(name)
 
-    r_bytes = get_with_ssl_context("bcu", sources["main"])
-    raw = pd.read_excel(r_bytes, skiprows=7)
+    r_bytes = download(sources["main"])
+    raw = read_excel(r_bytes, skiprows=7)
     output = raw.dropna(how="all", axis=1).iloc[:, 2:].dropna(how="all").T
     output.index = pd.date_range(start="2016-03-31", freq="QE-DEC", periods=len(output))
     output = output.apply(pd.to_numeric, errors="coerce").rename_axis(None)
@@ -253,8 +264,8 @@ def national_accounts_supply_current_nsa() -> Dataset:
     name = get_name_from_function()
     sources = get_download_sources(name)
 
-    r_bytes = get_with_ssl_context("bcu", sources["main"])
-    raw = pd.read_excel(r_bytes, skiprows=7)
+    r_bytes = download(sources["main"])
+    raw = read_excel(r_bytes, skiprows=7)
     output = raw.dropna(how="all", axis=1).iloc[:, 2:].dropna(how="all").T
     output.index = pd.date_range(start="2016-03-31", freq="QE-DEC", periods=len(output))
     output = output.apply(pd.to_numeric, errors="coerce").rename_axis(None)
@@ -308,8 +319,8 @@ def gdp_index_constant_sa() -> Dataset:
     name = get_name_from_function()
     sources = get_download_sources(name)
 
-    r_bytes = get_with_ssl_context("bcu", sources["main"])
-    raw = pd.read_excel(r_bytes, skiprows=7)
+    r_bytes = download(sources["main"])
+    raw = read_excel(r_bytes, skiprows=7)
     output = raw.dropna(how="all", axis=1).iloc[:, 2:].dropna(how="all").T
     output.index = pd.date_range(start="2016-03-31", freq="QE-DEC", periods=len(output))
     output = output.apply(pd.to_numeric, errors="coerce").rename_axis(None)
@@ -353,7 +364,6 @@ def national_accounts_supply_constant_nsa_extended(
 
     """
     name = get_name_from_function()
-    sources = get_download_sources(name)
 
     data_16 = load_dataset(
         "national_accounts_supply_constant_nsa", *args, **kwargs
@@ -390,8 +400,9 @@ def national_accounts_supply_constant_nsa_extended(
         "Impuestos menos subvenciones",
         "Producto bruto interno",
     ]
-    r_bytes = get_with_ssl_context("bcu", sources["2005"])
-    raw_05 = pd.read_excel(r_bytes, skiprows=9)
+    raw_05 = read_frozen_source(
+        name, "2005", lambda url: read_excel(download(url), skiprows=9)
+    )
     data_05 = (
         raw_05.dropna(how="all", axis=1)
         .iloc[:, 1:]
@@ -421,16 +432,6 @@ def national_accounts_supply_constant_nsa_extended(
         axis=1,
     )
     data_05.columns = data_16.columns
-    aux_index = list(dict.fromkeys(list(data_05.index) + list(data_16.index)))
-    aux = data_16.reindex(aux_index)
-    for quarter in reversed(aux_index):
-        if aux.loc[quarter, :].isna().all():
-            next_quarter = quarter + MonthEnd(3)
-            aux.loc[quarter, :] = (
-                aux.loc[next_quarter, :]
-                * data_05.loc[quarter, :]
-                / data_05.loc[next_quarter, :]
-            )
     spanish_names = [
         "Agropecuario, pesca y minería",
         "Industrias manufactureras",
@@ -442,18 +443,14 @@ def national_accounts_supply_constant_nsa_extended(
         "Impuestos menos subvenciones",
         "Producto bruto interno",
     ]
-    aux = aux[spanish_names]
-    r_bytes = get_with_ssl_context("bcu", sources["1983"])
-    data_83 = (
-        pd.read_excel(
-            r_bytes,
-            skiprows=10,
-            nrows=8,
-            index_col=1,
-        )
-        .iloc[:, 1:]
-        .T
+    data_16 = data_16[spanish_names]
+    data_05 = data_05[spanish_names]
+    raw_83 = read_frozen_source(
+        name,
+        "1983",
+        lambda url: read_excel(download(url), skiprows=10, nrows=8, index_col=1),
     )
+    data_83 = raw_83.iloc[:, 1:].T
     data_83.index = pd.date_range(
         start="1988-03-31", freq="QE-DEC", periods=len(data_83)
     )
@@ -471,19 +468,8 @@ def national_accounts_supply_constant_nsa_extended(
             "PRODUCTO INTERNO BRUTO",
         ]
     ]
-    data_83.columns = aux.columns
-
-    complete_index = list(dict.fromkeys(list(data_83.index) + list(aux.index)))
-    output = aux.reindex(complete_index)
-    for quarter in reversed(complete_index):
-        if output.loc[quarter, :].isna().all():
-            next_quarter = quarter + MonthEnd(3)
-            output.loc[quarter, :] = (
-                output.loc[next_quarter, :]
-                * data_83.loc[quarter, :]
-                / data_83.loc[next_quarter, :]
-            )
 
+    output = data_16
     ids = [f"{name}_{i}" for i in range(output.shape[1])]
     output.columns = ids
     spanish_names = [{"es": x} for x in spanish_names]
@@ -502,7 +488,7 @@ def national_accounts_supply_constant_nsa_extended(
     metadata = DatasetMetadata.from_cast(
         name, base_metadata, output.columns, spanish_names
     )
-    dataset = Dataset(name, output, metadata)
+    dataset = _splice_older(Dataset(name, output, metadata), data_05, data_83)
 
     return dataset
 
@@ -519,7 +505,6 @@ def national_accounts_demand_constant_nsa_extended(*args, **kwargs) -> Dataset:
 
     """
     name = get_name_from_function()
-    sources = get_download_sources(name)
 
     data_16 = load_dataset(
         "national_accounts_demand_constant_nsa", *args, **kwargs
@@ -539,8 +524,9 @@ def national_accounts_demand_constant_nsa_extended(*args, **kwargs) -> Dataset:
         "Importaciones",
         "Producto bruto interno",
     ]
-    r_bytes = get_with_ssl_context("bcu", sources["2005"])
-    raw_05 = pd.read_excel(r_bytes, skiprows=9)
+    raw_05 = read_frozen_source(
+        name, "2005", lambda url: read_excel(download(url), skiprows=9)
+    )
     data_05 = (
         raw_05.dropna(how="all", axis=1)
         .iloc[:, 1:]
@@ -558,28 +544,12 @@ def national_accounts_demand_constant_nsa_extended(*args, **kwargs) -> Dataset:
     data_05 = data_05.drop(["Sector público", "Sector privado"], axis=1)
     data_05.columns = data_16.columns
 
-    aux_index = list(dict.fromkeys(list(data_05.index) + list(data_16.index)))
-    aux = data_16.reindex(aux_index)
-    for quarter in reversed(aux_index):
-        if aux.loc[quarter, :].isna().all():
-            next_quarter = quarter + MonthEnd(3)
-            aux.loc[quarter, :] = (
-                aux.loc[next_quarter, :]
-                * data_05.loc[quarter, :]
-                / data_05.loc[next_quarter, :]
-            )
-
-    r_bytes = get_with_ssl_context("bcu", sources["1983"])
-    data_83 = (
-        pd.read_excel(
-            r_bytes,
-            skiprows=10,
-            nrows=11,
-            index_col=1,
-        )
-        .iloc[:, 1:]
-        .T
+    raw_83 = read_frozen_source(
+        name,
+        "1983",
+        lambda url: read_excel(download(url), skiprows=10, nrows=11, index_col=1),
     )
+    data_83 = raw_83.iloc[:, 1:].T
     data_83.index = pd.date_range(
         start="1988-03-31", freq="QE-DEC", periods=len(data_83)
     )
@@ -588,18 +558,8 @@ def national_accounts_demand_constant_nsa_extended(*args, **kwargs) -> Dataset:
         axis=1,
         inplace=True,
     )
-    data_83.columns = aux.columns
-
-    complete_index = list(dict.fromkeys(list(data_83.index) + list(aux.index)))
-    output = aux.reindex(complete_index)
-    for quarter in reversed(complete_index):
-        if output.loc[quarter, :].isna().all():
-            next_quarter = quarter + MonthEnd(3)
-            output.loc[quarter, :] = (
-                output.loc[next_quarter, :]
-                * data_83.loc[quarter, :]
-                / data_83.loc[next_quarter, :]
-            )
+
+    output = data_16
     spanish_names = [
         "Gasto de consumo final",
         "Gasto de consumo final de hogares",
@@ -628,7 +588,7 @@ def national_accounts_demand_constant_nsa_extended(*args, **kwargs) -> Dataset:
     metadata = DatasetMetadata.from_cast(
         name, base_metadata, output.columns, spanish_names
     )
-    dataset = Dataset(name, output, metadata)
+    dataset = _splice_older(Dataset(name, output, metadata), data_05, data_83)
 
     return dataset
 
@@ -645,7 +605,6 @@ def gdp_index_constant_sa_extended(*args, **kwargs) -> Dataset:
 
     """
     name = get_name_from_function()
-    sources = get_download_sources(name)
 
     data_16 = load_dataset("gdp_index_constant_sa", *args, **kwargs).to_detailed()
     data_16.columns = data_16.columns.get_level_values(0)
@@ -663,8 +622,9 @@ def gdp_index_constant_sa_extended(*args, **kwargs) -> Dataset:
         "Impuestos menos subvenciones",
         "Producto bruto interno",
     ]
-    r_bytes = get_with_ssl_context("bcu", sources["2005"])
-    raw_05 = pd.read_excel(r_bytes, skiprows=9)
+    raw_05 = read_frozen_source(
+        name, "2005", lambda url: read_excel(download(url), skiprows=9)
+    )
     data_05 = (
         raw_05.dropna(how="all", axis=1)
         .iloc[:, 1:]
@@ -679,45 +639,19 @@ def gdp_index_constant_sa_extended(*args, **kwargs) -> Dataset:
     data_05.columns = names
 
     data_05 = data_05[["Producto bruto interno"]]
-    aux_index = list(dict.fromkeys(list(data_05.index) + list(data_16.index)))
-    aux = data_16.reindex(aux_index)
-    for quarter in reversed(aux_index):
-        if aux.loc[quarter, :].isna().all():
-            next_quarter = quarter + MonthEnd(3)
-            aux.loc[quarter, :] = (
-                aux.loc[next_quarter, :]
-                * data_05.loc[quarter, :]
-                / data_05.loc[next_quarter, :]
-            )
 
-    r_bytes = get_with_ssl_context("bcu", sources["1983"])
-    data_83 = (
-        pd.read_excel(
-            r_bytes,
-            skiprows=10,
-            nrows=8,
-            index_col=1,
-        )
-        .iloc[:, 1:]
-        .T
+    raw_83 = read_frozen_source(
+        name,
+        "1983",
+        lambda url: read_excel(download(url), skiprows=10, nrows=8, index_col=1),
     )
+    data_83 = raw_83.iloc[:, 1:].T
     data_83.index = pd.date_range(
         start="1988-03-31", freq="QE-DEC", periods=len(data_83)
     )
     data_83 = data_83[["PRODUCTO INTERNO BRUTO"]]
-    data_83.columns = aux.columns
-
-    complete_index = list(dict.fromkeys(list(data_83.index) + list(aux.index)))
-    output = aux.reindex(complete_index)
-    for quarter in reversed(complete_index):
-        if output.loc[quarter, :].isna().all():
-            next_quarter = quarter + MonthEnd(3)
-            output.loc[quarter, :] = (
-                output.loc[next_quarter, :]
-                * data_83.loc[quarter, :]
-                / data_83.loc[next_quarter, :]
-            )
 
+    output = data_16
     spanish_names = ["Producto bruto interno"]
 
     ids = [f"{name}_{i}" for i in range(output.shape[1])]
@@ -738,7 +672,7 @@ def gdp_index_constant_sa_extended(*args, **kwargs) -> Dataset:
     metadata = DatasetMetadata.from_cast(
         name, base_metadata, output.columns, spanish_names
     )
-    dataset = Dataset(name, output, metadata)
+    dataset = _splice_older(Dataset(name, output, metadata), data_05, data_83)
 
     return dataset
 
@@ -756,7 +690,6 @@ def gdp_constant_nsa_extended(*args, **kwargs) -> Dataset:
 
     """
     name = get_name_from_function()
-    sources = get_download_sources(name)
 
     data_16 = load_dataset(
         "national_accounts_supply_constant_nsa", *args, **kwargs
@@ -766,8 +699,9 @@ def gdp_constant_nsa_extended(*args, **kwargs) -> Dataset:
 
     names = ["Producto bruto interno"]
 
-    r_bytes = get_with_ssl_context("bcu", sources["1997"])
-    raw_97 = pd.read_excel(r_bytes, skiprows=6)
+    raw_97 = read_frozen_source(
+        name, "1997", lambda url: read_excel(download(url), skiprows=6)
+    )
     data_97 = (
         raw_97.dropna(how="all", axis=1)
         .iloc[:, 1:]
@@ -781,35 +715,18 @@ def gdp_constant_nsa_extended(*args, **kwargs) -> Dataset:
     data_97 = data_97.apply(pd.to_numeric, errors="coerce").rename_axis(None)
     data_97.columns = names
 
-    aux = pd.concat([data_97, data_16], axis=0)
+    output = pd.concat([data_97, data_16], axis=0)
 
-    r_bytes = get_with_ssl_context("bcu", sources["1983"])
-    data_83 = (
-        pd.read_excel(
-            r_bytes,
-            skiprows=10,
-            nrows=8,
-            index_col=1,
-        )
-        .iloc[:, 1:]
-        .T
+    raw_83 = read_frozen_source(
+        name,
+        "1983",
+        lambda url: read_excel(download(url), skiprows=10, nrows=8, index_col=1),
     )
+    data_83 = raw_83.iloc[:, 1:].T
     data_83.index = pd.date_range(
         start="1988-03-31", freq="QE-DEC", periods=len(data_83)
     )
     data_83 = data_83[["PRODUCTO INTERNO BRUTO"]]
-    data_83.columns = ["Producto bruto interno"]
-
-    reaux_index = list(dict.fromkeys(list(data_83.index) + list(aux.index)))
-    output = aux.reindex(reaux_index)
-    for quarter in reversed(reaux_index):
-        if output.loc[quarter, :].isna().all():
-            next_quarter = quarter + MonthEnd(3)
-            output.loc[quarter, :] = (
-                output.loc[next_quarter, :]
-                * data_83.loc[quarter, :]
-                / data_83.loc[next_quarter, :]
-            )
 
     spanish_names = ["Producto bruto interno"]
 
@@ -831,7 +748,7 @@ def gdp_constant_nsa_extended(*args, **kwargs) -> Dataset:
     metadata = DatasetMetadata.from_cast(
         name, base_metadata, output.columns, spanish_names
     )
-    dataset = Dataset(name, output, metadata)
+    dataset = _splice_older(Dataset(name, output, metadata), data_83)
 
     return dataset
 
@@ -848,7 +765,6 @@ def gdp_current_nsa_extended(*args, **kwargs) -> Dataset:
 
     """
     name = get_name_from_function()
-    sources = get_download_sources(name)
 
     data_16 = load_dataset(
         "national_accounts_supply_current_nsa", *args, **kwargs
@@ -858,8 +774,9 @@ def gdp_current_nsa_extended(*args, **kwargs) -> Dataset:
 
     names = ["Producto bruto interno"]
 
-    r_bytes = get_with_ssl_context("bcu", sources["1997"])
-    raw_97 = pd.read_excel(r_bytes, skiprows=6)
+    raw_97 = read_frozen_source(
+        name, "1997", lambda url: read_excel(download(url), skiprows=6)
+    )
     data_97 = (
         raw_97.dropna(how="all", axis=1)
         .iloc[:, 1:]
@@ -934,7 +851,9 @@ def gdp_denominator(*args, **kwargs):
             f"{last_year - 1}&ey={last_year + 1}&ssm=0&scsm=1&scc=0&"
             f"ssd=1&ssc=0&sic=0&sort=country&ds=.&br=1"
         )
-        imf_data = pd.to_numeric(pd.read_html(table_url)[0].iloc[0, [5, 6, 7]])
+        imf_data = pd.to_numeric(
+            pd.read_html(download(table_url))[0].iloc[0, [5, 6, 7]]
+        )
         imf_data = imf_data.reset_index(drop=True)
         fcast = (
             gdp.loc[[dt.datetime(last_year - 1, 12, 31)]]
@@ -997,8 +916,10 @@ def industrial_production() -> Dataset:
     name = get_name_from_function()
     sources = get_download_sources(name)
 
-    raw = pd.read_excel(sources["main"], skiprows=4, usecols="D:DR", na_values="(s)")
-    weights = pd.read_csv(sources["weights"]).dropna(how="all")
+    raw = read_excel(
+        download(sources["main"]), skiprows=4, usecols="D:DR", na_values="(s)"
+    )
+    weights = pd.read_csv(download(sources["weights"])).dropna(how="all")
     weights[["División", "Grupo", "Agrupación / Clase"]] = weights[
         ["División", "Grupo", "Agrupación / Clase"]
     ].astype(str)
@@ -1068,7 +989,6 @@ def core_industrial_production(*args, **kwargs) -> Dataset:
 
     """
     name = get_name_from_function()
-    sources = get_download_sources(name)
 
     data_18 = load_dataset("industrial_production", *args, **kwargs).to_detailed()
     data_18 = data_18[
@@ -1088,8 +1008,12 @@ def core_industrial_production(*args, **kwargs) -> Dataset:
     )
     data_18 = data_18[["total", "ex-refinery", "core"]]
 
-    data_06 = pd.read_excel(
-        sources["2006"], skiprows=6, usecols="B,D,F,CF,CX", na_values="(s)"
+    data_06 = read_frozen_source(
+        name,
+        "2006",
+        lambda url: read_excel(
+            download(url), skiprows=6, usecols="B,D,F,CF,CX", na_values="(s)"
+        ),
     ).dropna(how="all")
     data_06 = data_06.loc[~data_06.iloc[:, 0].str.contains("Prom")].iloc[:, 1:]
     data_06.columns = ["total", "ex-refinery", "other foods", "pulp"]
@@ -1104,18 +1028,7 @@ def core_industrial_production(*args, **kwargs) -> Dataset:
     data_06 = data_06[["total", "ex-refinery", "core"]]
     data_06.index = pd.date_range(start="2002-01-31", freq="ME", periods=len(data_06))
 
-    aux_index = list(dict.fromkeys(list(data_06.index) + list(data_18.index)))
-    output = data_18.reindex(aux_index)
-    for month in reversed(aux_index):
-        if output.loc[month, :].isna().all():
-            next_month = month + MonthEnd(1)
-            output.loc[month, :] = (
-                output.loc[next_month, :]
-                * data_06.loc[month, :]
-                / data_06.loc[next_month, :]
-            )
-
-    output = output.rename_axis(None)
+    output = data_18.rename_axis(None)
 
     spanish_names = [
         "Industrias manufactureras",
@@ -1141,7 +1054,7 @@ def core_industrial_production(*args, **kwargs) -> Dataset:
     metadata = DatasetMetadata.from_cast(
         name, base_metadata, output.columns, spanish_names
     )
-    dataset = Dataset(name, output, metadata).rebase(
+    dataset = _splice_older(Dataset(name, output, metadata), data_06).rebase(
         start_date="2018-01-01", end_date="2018-12-31"
     )
     dataset.metadata.update_dataset_metadata({"unit": "2018=100"})
@@ -1161,9 +1074,9 @@ def livestock_slaughter() -> Dataset:
     name = get_name_from_function()
     sources = get_download_sources(name)
 
-    excel = pd.ExcelFile(sources["main"])
-    cattle = pd.read_excel(excel, sheet_name="BOVINOS", skiprows=8, usecols="C:H")
-    sheep = pd.read_excel(excel, sheet_name="OVINOS", skiprows=8, usecols="C:H")
+    excel = open_excel(download(sources["main"]))
+    cattle = read_excel(excel, sheet_name="BOVINOS", skiprows=8, usecols="C:H")
+    sheep = read_excel(excel, sheet_name="OVINOS", skiprows=8, usecols="C:H")
     output = pd.concat([cattle, sheep], axis=1).fillna(0).astype(int)
     output.index = pd.date_range(start="2005-01-02", freq="W", periods=len(output))
     output = output.rename_axis(None)
@@ -1217,10 +1130,10 @@ def milk_shipments() -> Dataset:
     name = get_name_from_function()
     sources = get_download_sources(name)
 
-    r = httpx.get(sources["main"])
+    r = http_get(sources["main"])
     url = re.findall(r'href="(.+\.xls)', r.text)[0]
-    raw = pd.read_excel(
-        url, sheet_name="Listado Datos", usecols="C:D", skiprows=4
+    raw = read_excel(
+        download(url), sheet_name="Listado Datos", usecols="C:D", skiprows=4
     ).dropna()
 
     output = (
@@ -1272,19 +1185,18 @@ def diesel_sales() -> Dataset:
     name = get_name_from_function()
     sources = get_download_sources(name)
 
-    temp_rar = tempfile.NamedTemporaryFile(suffix=".rar").name
-    with open(temp_rar, "wb") as f:
-        r = httpx.get(sources["main"])
-        rar_url = re.findall(
-            r'(https?://[^"]*?gas%20oil[^"]*?\.rar)',
-            r.text,
-        )[0]
-        f.write(httpx.get(rar_url).content)
+    r = http_get(sources["main"])
+    rar_url = re.findall(
+        r'(https?://[^"]*?gas%20oil[^"]*?\.rar)',
+        r.text,
+    )[0]
     with tempfile.TemporaryDirectory() as temp_dir:
+        temp_rar = path.join(temp_dir, "data.rar")
+        download_to_file(rar_url, temp_rar)
         patoolib.extract_archive(temp_rar, outdir=temp_dir, verbosity=-1)
         xls = [x for x in listdir(temp_dir) if x.endswith(".xls")][0]
         path_temp = path.join(temp_dir, xls)
-        raw = pd.read_excel(
+        raw = read_excel(
             path_temp, sheet_name="vta gas oil por depto", skiprows=2, usecols="C:W"
         )
         raw.index = pd.date_range(start="2004-01-31", freq="ME", periods=len(raw))
@@ -1332,19 +1244,18 @@ def gasoline_sales() -> Dataset:
     name = get_name_from_function()
     sources = get_download_sources(name)
 
-    temp_rar = tempfile.NamedTemporaryFile(suffix=".rar").name
-    with open(temp_rar, "wb") as f:
-        r = httpx.get(sources["main"])
-        rar_url = re.findall(
-            r'(https?://[^"]*?gasolinas[^"]*?\.rar)',
-            r.text,
-        )[0]
-        f.write(httpx.get(rar_url).content)
+    r = http_get(sources["main"])
+    rar_url = re.findall(
+        r'(https?://[^"]*?gasolinas[^"]*?\.rar)',
+        r.text,
+    )[0]
     with tempfile.TemporaryDirectory() as temp_dir:
+        temp_rar = path.join(temp_dir, "data.rar")
+        download_to_file(rar_url, temp_rar)
         patoolib.extract_archive(temp_rar, outdir=temp_dir, verbosity=-1)
         xls = [x for x in listdir(temp_dir) if x.endswith(".xls")][0]
         path_temp = path.join(temp_dir, xls)
-        raw = pd.read_excel(
+        raw = read_excel(
             path_temp, sheet_name="vta gasolinas por depto", skiprows=2, usecols="C:W"
         )
         raw.index = pd.date_range(start="2004-01-31", freq="ME", periods=len(raw))
@@ -1392,19 +1303,18 @@ def electricity_sales() -> Dataset:
     name = get_name_from_function()
     sources = get_download_sources(name)
 
-    temp_rar = tempfile.NamedTemporaryFile(suffix=".rar").name
-    with open(temp_rar, "wb") as f:
-        r = httpx.get(sources["main"])
-        rar_url = re.findall(
-            r"https://www.gub.uy/ministerio-industria-energia-mineria/sites/ministerio-industria-energia-mineria/files/[0-9\-]+/Facturaci%C3%B3n%20de%20energ%C3%ADa%20el%C3%A9ctrica%20por%20sector.rar",
-            r.text,
-        )[0]
-        f.write(httpx.get(rar_url).content)
+    r = http_get(sources["main"])
+    rar_url = re.findall(
+        r"https://www.gub.uy/ministerio-industria-energia-mineria/sites/ministerio-industria-energia-mineria/files/[0-9\-]+/Facturaci%C3%B3n%20de%20energ%C3%ADa%20el%C3%A9ctrica%20por%20sector.rar",
+        r.text,
+    )[0]
     with tempfile.TemporaryDirectory() as temp_dir:
+        temp_rar = path.join(temp_dir, "data.rar")
+        download_to_file(rar_url, temp_rar)
         patoolib.extract_archive(temp_rar, outdir=temp_dir, verbosity=-1)
         xls = [x for x in listdir(temp_dir) if x.endswith(".xls")][0]
         path_temp = path.join(temp_dir, xls)
-        raw = pd.read_excel(path_temp, sheet_name="fact ee", skiprows=2, usecols="C:J")
+        raw = read_excel(path_temp, sheet_name="fact ee", skiprows=2, usecols="C:J")
         raw.index = pd.date_range(start="2000-01-31", freq="ME", periods=len(raw))
         raw.columns = raw.columns.str.capitalize()
         output = raw
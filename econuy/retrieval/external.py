@@ -4,39 +4,32 @@ import tempfile
 import zipfile
 from io import BytesIO
 from os import path
-from urllib.error import URLError
 
 import pandas as pd
-import httpx
 from pandas.tseries.offsets import MonthEnd, YearEnd
 
 from econuy import load_dataset
 from econuy.base import Dataset, DatasetMetadata
 from econuy.retrieval import regional
+from econuy.utils.excel import read_excel, read_excel_sheets
+from econuy.utils.frozen import read_frozen_source
 from econuy.utils.operations import get_download_sources, get_name_from_function
 from econuy.utils.extras import TRADE_METADATA, BOP_COLUMNS
-from econuy.utils.retrieval import get_with_ssl_context
+from econuy.utils.retrieval import download, download_to_file, http_get
 
 
 def _get_trade(dataset_name: str) -> Dataset:
     """Helper function. See any of the `trade_...()` functions."""
     sources = get_download_sources(dataset_name)
     meta = TRADE_METADATA[dataset_name]
-    try:
-        xls = pd.ExcelFile(sources["main"])
-    except URLError as err:
-        if "SSL: CERTIFICATE_VERIFY_FAILED" in str(err):
-            r_bytes = get_with_ssl_context("bcu", sources["main"])
-            xls = pd.ExcelFile(r_bytes)
-    sheets = []
     start_col = meta["start_col"]
-    for sheet in xls.sheet_names:
-        raw = (
-            pd.read_excel(xls, sheet_name=sheet, index_col=start_col, skiprows=7)
-            .iloc[:, start_col:]
-            .dropna(thresh=5)
-            .T
-        )
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_xls = path.join(temp_dir, "trade.xlsx")
+        download_to_file(sources["main"], temp_xls)
+        raw_sheets = read_excel_sheets(temp_xls, index_col=start_col, skiprows=7)
+    sheets = []
+    for raw in raw_sheets.values():
+        raw = raw.iloc[:, start_col:].dropna(thresh=5).T
         raw.index = pd.to_datetime(raw.index, errors="coerce") + MonthEnd(0)
         proc = raw[raw.index.notnull()].dropna(thresh=5, axis=1)
         if dataset_name != "trade_imports_category_value":
@@ -327,7 +320,9 @@ def terms_of_trade(*args, **kwargs) -> Dataset:
 
 def _commodity_weights() -> pd.DataFrame:
     raw = pd.read_csv(
-        "https://raw.githubusercontent.com/rxavier/econuy-extras/main/econuy_extras/manual_data/comtrade.csv"
+        download(
+            "https://raw.githubusercontent.com/rxavier/econuy-extras/main/econuy_extras/manual_data/comtrade.csv"
+        )
     )
 
     table = raw.groupby(["RefYear", "CmdDesc"]).sum().reset_index()
@@ -379,8 +374,8 @@ def commodity_prices() -> Dataset:
     name = get_name_from_function()
     sources = get_download_sources(name)
 
-    raw_beef = pd.read_excel(
-        sources["beef"], header=4, index_col=0, thousands=".", usecols="A:D"
+    raw_beef = read_excel(
+        download(sources["beef"]), header=4, index_col=0, thousands=".", usecols="A:D"
     ).dropna(how="all")
 
     raw_beef.columns = raw_beef.columns.str.strip()
@@ -390,14 +385,14 @@ def commodity_prices() -> Dataset:
     )
     beef = proc_beef.resample("ME").mean()
 
-    milk_r = httpx.get(sources["milk1"])
+    milk_r = http_get(sources["milk1"])
     xls = re.findall(
         r"https://www.inale.org/wp-content/uploads/[0-9\/]+/Precios-exportacion-de-Europa.xls",
         milk_r.text,
         flags=re.IGNORECASE,
     )[0]
-    raw_milk = pd.read_excel(
-        xls,
+    raw_milk = read_excel(
+        download(xls),
         skiprows=13,
         nrows=dt.datetime.now().year - 2006,
     )
@@ -413,13 +408,17 @@ def commodity_prices() -> Dataset:
     )
     proc_milk = proc_milk.iloc[:, 2].to_frame().divide(10).dropna()
 
-    prev_milk = pd.read_excel(
-        sources["milk2"],
-        sheet_name="Raw Milk Prices",
-        index_col=0,
-        skiprows=6,
-        usecols="A:AB",
-        na_values=["c", 0],
+    prev_milk = read_frozen_source(
+        name,
+        "milk2",
+        lambda url: read_excel(
+            download(url),
+            sheet_name="Raw Milk Prices",
+            index_col=0,
+            skiprows=6,
+            usecols="A:AB",
+            na_values=["c", 0],
+        ),
     )
     prev_milk = (
         prev_milk[prev_milk.index.notna()]
@@ -430,7 +429,7 @@ def commodity_prices() -> Dataset:
     prev_milk = prev_milk.set_index(
         pd.date_range(start="1977-01-31", freq="ME", periods=len(prev_milk))
     )
-    eurusd_r = httpx.get(
+    eurusd_r = http_get(
         "https://fx.sauder.ubc.ca/cgi/fxdata",
         params=f"b=USD&c=EUR&rd=&fd=1&fm=1&fy=2001&ld=31&lm=12&ly="
         f"{dt.datetime.now().year}&y=monthly&q=volume&f=html&o=",
@@ -443,11 +442,12 @@ def commodity_prices() -> Dataset:
     prev_milk.columns, proc_milk.columns = ["Price"], ["Price"]
     milk = pd.concat([prev_milk, proc_milk])
 
-    raw_pulp_r = httpx.get(sources["pulp"].format(year=dt.date.today().year))
-    temp_dir = tempfile.TemporaryDirectory()
-    with zipfile.ZipFile(BytesIO(raw_pulp_r.content), "r") as f:
-        f.extractall(path=temp_dir.name)
-        path_temp = path.join(temp_dir.name, "monthly_values.csv")
+    with tempfile.TemporaryDirectory() as temp_dir:
+        temp_zip = path.join(temp_dir, "pulp.zip")
+        download_to_file(sources["pulp"].format(year=dt.date.today().year), temp_zip)
+        with zipfile.ZipFile(temp_zip, "r") as f:
+            f.extractall(path=temp_dir)
+        path_temp = path.join(temp_dir, "monthly_values.csv")
         raw_pulp = pd.read_csv(path_temp, sep=";").dropna(how="any")
     proc_pulp = raw_pulp.copy().sort_index(ascending=False)
     proc_pulp.index = pd.date_range(
@@ -457,10 +457,12 @@ def commodity_prices() -> Dataset:
     proc_pulp = proc_pulp.div(eurusd.reindex(proc_pulp.index).values)
     pulp = proc_pulp
 
-    r_imf = httpx.get(sources["imf"])
+    r_imf = http_get(sources["imf"])
     imf = re.findall("external-data.+ashx", r_imf.text)[0]
     imf = f"https://imf.org/-/media/Files/Research/CommodityPrices/Monthly/{imf}"
-    raw_imf = pd.read_excel(imf).dropna(how="all", axis=1).dropna(how="all", axis=0)
+    raw_imf = (
+        read_excel(download(imf)).dropna(how="all", axis=1).dropna(how="all", axis=0)
+    )
     raw_imf.columns = raw_imf.iloc[0, :]
     proc_imf = raw_imf.iloc[3:, 1:]
     proc_imf.index = pd.date_range(start="1990-01-31", periods=len(proc_imf), freq="ME")
@@ -593,12 +595,7 @@ def rxr() -> Dataset:
     """
     name = get_name_from_function()
     sources = get_download_sources(name)
-    try:
-        raw = pd.read_excel(sources["main"], skiprows=8, usecols="B:N", index_col=0)
-    except URLError as err:
-        if "SSL: CERTIFICATE_VERIFY_FAILED" in str(err):
-            r_bytes = get_with_ssl_context("bcu", sources["main"])
-            raw = pd.read_excel(r_bytes, skiprows=9, usecols="B:N", index_col=0)
+    raw = read_excel(download(sources["main"]), skiprows=8, usecols="B:N", index_col=0)
     output = raw.dropna(how="any")
     output.columns = [
         "Global",
@@ -713,27 +710,16 @@ def balance_of_payments() -> Dataset:
     """
     name = get_name_from_function()
     sources = get_download_sources(name)
-    try:
-        raw = (
-            pd.read_excel(
-                sources["main"], skiprows=7, index_col=0, sheet_name="Cuadro Nº 1"
-            )
-            .dropna(how="all")
-            .T
+    raw = (
+        read_excel(
+            download(sources["main"]),
+            skiprows=7,
+            index_col=0,
+            sheet_name="Cuadro Nº 1",
         )
-    except URLError as err:
-        if "SSL: CERTIFICATE_VERIFY_FAILED" in str(err):
-            r_bytes = get_with_ssl_context("bcu", sources["main"])
-            raw = (
-                pd.read_excel(
-                    r_bytes,
-                    skiprows=7,
-                    index_col=0,
-                    sheet_name="Cuadro Nº 1",
-                )
-                .dropna(how="all")
-                .T
-            )
+        .dropna(how="all")
+        .T
+    )
     output = raw.iloc[:, 2:]
     output.index = pd.date_range(start="2012-03-31", freq="QE-DEC", periods=len(output))
     pattern = r"\(1\)|\(2\)|\(3\)|\(4\)|\(5\)"
@@ -873,20 +859,13 @@ def international_reserves() -> Dataset:
     """
     name = get_name_from_function()
     sources = get_download_sources(name)
-    try:
-        raw = pd.read_excel(
-            sources["main"], usecols="D:J", index_col=0, skiprows=5, na_values="n/d"
-        )
-    except URLError as err:
-        if "SSL: CERTIFICATE_VERIFY_FAILED" in str(err):
-            r_bytes = get_with_ssl_context("bcu", sources["main"])
-            raw = pd.read_excel(
-                r_bytes,
-                usecols="D:J",
-                index_col=0,
-                skiprows=5,
-                na_values="n/d",
-            )
+    raw = read_excel(
+        download(sources["main"]),
+        usecols="D:J",
+        index_col=0,
+        skiprows=5,
+        na_values="n/d",
+    )
     proc = raw.dropna(thresh=1)
     output = proc[proc.index.notnull()]
     output.columns = [
@@ -1,4 +1,5 @@
 import datetime as dt
+import functools
 import time
 from io import BytesIO, StringIO
 from urllib.error import HTTPError, URLError
@@ -8,9 +9,11 @@ import pandas as pd
 import httpx
 from pandas.tseries.offsets import MonthEnd
 
-from econuy.utils.chromedriver import _build
+from econuy.utils.excel import open_excel, read_excel
+from econuy.utils.chromedriver import _build, _get_page
 from econuy.utils.operations import get_download_sources, get_name_from_function
-from econuy.utils.retrieval import get_with_ssl_context
+from econuy.utils.retrieval import download, get_client_kwargs
+from econuy.utils.throttling import send_with_retries
 from econuy.base import Dataset, DatasetMetadata
 
 
@@ -24,13 +27,8 @@ def bank_credit() -> pd.DataFrame:
     """
     name = get_name_from_function()
     sources = get_download_sources(name)
-    try:
-        xls = pd.ExcelFile(sources["main"])
-    except URLError as err:
-        if "SSL: CERTIFICATE_VERIFY_FAILED" in str(err):
-            r_bytes = get_with_ssl_context("bcu", sources["main"])
-            xls = pd.ExcelFile(r_bytes)
-    tc = pd.read_excel(
+    xls = open_excel(download(sources["main"]))
+    tc = read_excel(
         xls,
         sheet_name="TC",
         skiprows=1,
@@ -40,7 +38,7 @@ def bank_credit() -> pd.DataFrame:
         date_format="%Y%m",
     ).squeeze()
     tc.index = tc.index + MonthEnd(0)
-    raw = pd.read_excel(
+    raw = read_excel(
         xls,
         sheet_name="Total Sist. Banc.",
         skiprows=10,
@@ -124,13 +122,8 @@ def bank_deposits() -> pd.DataFrame:
     """
     name = get_name_from_function()
     sources = get_download_sources(name)
-    try:
-        xls = pd.ExcelFile(sources["main"])
-    except URLError as err:
-        if "SSL: CERTIFICATE_VERIFY_FAILED" in str(err):
-            r_bytes = get_with_ssl_context("bcu", sources["main"])
-            xls = pd.ExcelFile(r_bytes)
-    tc = pd.read_excel(
+    xls = open_excel(download(sources["main"]))
+    tc = read_excel(
         xls,
         sheet_name="TC",
         skiprows=1,
@@ -140,7 +133,7 @@ def bank_deposits() -> pd.DataFrame:
         date_format="%Y%m",
     ).squeeze()
     tc.index = tc.index + MonthEnd(0)
-    raw = pd.read_excel(
+    raw = read_excel(
         xls,
         sheet_name="Total Sist. Banc.",
         skiprows=8,
@@ -207,12 +200,7 @@ def bank_interest_rates() -> pd.DataFrame:
     """
     name = get_name_from_function()
     sources = get_download_sources(name)
-    try:
-        xls = pd.ExcelFile(sources["main"])
-    except URLError as err:
-        if "SSL: CERTIFICATE_VERIFY_FAILED" in str(err):
-            r_bytes = get_with_ssl_context("bcu", sources["main"])
-            xls = pd.ExcelFile(r_bytes)
+    xls = open_excel(download(sources["main"]))
 
     sheets = [
         "Activas $",
@@ -229,7 +217,7 @@ def bank_interest_rates() -> pd.DataFrame:
             skip = 11
         else:
             skip = 10
-        data = pd.read_excel(
+        data = read_excel(
             xls, sheet_name=sheet, skiprows=skip, usecols=columns, index_col=0
         )
         data.index = pd.to_datetime(data.index, errors="coerce")
@@ -347,16 +335,18 @@ def sovereign_risk_index() -> pd.DataFrame:
     sources = get_download_sources(name)
 
     try:
-        historical = pd.read_excel(
-            sources["historical"],
+        historical = read_excel(
+            download(sources["historical"]),
             usecols="B:C",
             skiprows=1,
             index_col=0,
             sheet_name="Valores de Cierre Diarios",
         )
     except (ConnectError, URLError, HTTPError):
-        r_historical = httpx.get(sources["historical"], verify=False)
-        historical = pd.read_excel(
+        url = sources["historical"]
+        with httpx.Client(**get_client_kwargs() | {"verify": False}) as client:
+            r_historical = send_with_retries(url, functools.partial(client.get, url))
+        historical = read_excel(
             BytesIO(r_historical.content),
             usecols="B:C",
             skiprows=1,
@@ -364,7 +354,7 @@ def sovereign_risk_index() -> pd.DataFrame:
             sheet_name="Valores de Cierre Diarios",
         )
     driver = _build()
-    driver.get(sources["current"])
+    _get_page(driver, sources["current"])
     text = driver.page_source
     current = (
         pd.read_html(StringIO(text))[0]
@@ -406,7 +396,7 @@ def sovereign_risk_index() -> pd.DataFrame:
 
 
 def _bypass_bevsa_disclaimer_maybe(driver, url: str):
-    driver.get(url)
+    _get_page(driver, url)
     if "Disclaimer.aspx" in driver.current_url:
         checkbox = driver.find_element(
             by="id", value="ContentPlaceHolder1_chkAcceptTerms"
@@ -420,7 +410,7 @@ def _bypass_bevsa_disclaimer_maybe(driver, url: str):
         accept_button.click()
         time.sleep(2)
 
-        driver.get(url)
+        _get_page(driver, url)
 
 
 def call_rate() -> pd.DataFrame:
@@ -505,7 +495,7 @@ def sovereign_bond_yields() -> pd.DataFrame:
     _bypass_bevsa_disclaimer_maybe(driver, sources["usd"])
     dfs = []
     for url in sources.values():
-        driver.get(url)
+        _get_page(driver, url)
         start = driver.find_element(
             by="name", value="ctl00$ContentPlaceHolder1$dateDesde$dateInput"
         )
@@ -1,29 +1,28 @@
 import datetime as dt
 import re
-from urllib.error import URLError
 
-import pandas as pd
 import httpx
+import pandas as pd
 from pandas.tseries.offsets import MonthEnd
 
 from econuy import load_dataset
 from econuy.base import Dataset, DatasetMetadata
+from econuy.utils.excel import read_excel
 from econuy.utils.extras import FISCAL_SHEETS, taxes_columns
 from econuy.utils.operations import get_name_from_function, get_download_sources
-from econuy.utils.retrieval import get_with_ssl_context
+from econuy.utils.retrieval import download, http_get, open_workbook
 
 
 def _get_fiscal_balances(dataset_name: str) -> Dataset:
     """Helper function. See any of the `fiscal_balance_...()` functions."""
     sources = get_download_sources("fiscal_balances")
-    response = httpx.get(sources["main"])
+    response = http_get(sources["main"])
     url = re.findall(r"(http\S+Resultados.+\.xlsx)'", response.text)[0]
-    xls = pd.ExcelFile(url)
-    output = {}
     dataset_details = FISCAL_SHEETS[dataset_name]
+    with open_workbook(url) as xls:
+        raw = read_excel(xls, sheet_name=dataset_details["sheet"])
     output = (
-        pd.read_excel(xls, sheet_name=dataset_details["sheet"])
-        .dropna(axis=0, thresh=4)
+        raw.dropna(axis=0, thresh=4)
         .dropna(axis=1, thresh=4)
         .transpose()
         .set_index(2, drop=True)
@@ -167,21 +166,20 @@ def tax_revenue() -> Dataset:
     """
     name = get_name_from_function()
     sources = get_download_sources(name)
-    r = httpx.get(sources["main"], timeout=20)
+    r = http_get(sources["main"], timeout=20)
     url = re.findall(
         "https://[A-z0-9-/\.]+Recaudaci%C3%B3n%20por%20impuesto%20-%20Series%20mensuales.csv",
         r.text,
     )[0]
     historical = pd.read_csv(
-        url, skiprows=2, encoding="Latin", sep=";", thousands="."
+        download(url), skiprows=2, encoding="Latin", sep=";", thousands="."
     ).iloc[:, 3:41]
     historical.index = pd.date_range("1982-01-31", periods=len(historical), freq="ME")
     historical.columns = taxes_columns
     historical = historical.div(1000000)
 
     try:
-        aux = historical.copy()
-        latest = pd.read_csv(sources["pdfs"], index_col=0, parse_dates=True)
+        latest = pd.read_csv(download(sources["pdfs"]), index_col=0, parse_dates=True)
         latest.columns = [
             "IVA - Valor Agregado",
             "IMESI - Específico Interno",
@@ -194,20 +192,11 @@ def tax_revenue() -> Dataset:
             "Impuesto de Educación Primaria",
             "Recaudación Total de la DGI",
         ]
-        latest = latest.loc[[x not in aux.index for x in latest.index]]
-        for col in latest.columns:
-            for date in latest.index:
-                prev_year = date + MonthEnd(-12)
-                aux.loc[date, col] = aux.loc[prev_year, col] * (
-                    1 + latest.loc[date, col] / 100
-                )
-        output = pd.concat([aux, latest], sort=False)
-        output = output.loc[~output.index.duplicated(keep="first")]
-    except Exception as e:
+    except (httpx.HTTPError, FileNotFoundError, ValueError) as e:
         print(f"Could not get PDF data | {e}")
-        output = historical.copy()
+        latest = None
 
-    output = output.apply(pd.to_numeric, errors="coerce")
+    output = historical.apply(pd.to_numeric, errors="coerce")
     output = output.rename_axis(None)
 
     spanish_names = output.columns
@@ -230,6 +219,11 @@ def tax_revenue() -> Dataset:
         name, base_metadata, output.columns, spanish_names
     )
     dataset = Dataset(name, output, metadata)
+    if latest is not None:
+        latest = latest.apply(pd.to_numeric, errors="coerce")
+        latest.columns = latest.columns.map(dict(zip(taxes_columns, ids)))
+        # The extension is part of the source data, not a transformation
+        dataset = Dataset(name, dataset.extend_yoy(latest).data, metadata)
 
     return dataset
 
@@ -254,89 +248,84 @@ def _get_public_debt(dataset_name: str) -> Dataset:
         "Residencia: no residentes",
         "Residencia: residentes",
     ]
-    try:
-        xls = pd.ExcelFile(sources["main"])
-    except URLError as err:
-        if "SSL: CERTIFICATE_VERIFY_FAILED" in str(err):
-            r_bytes = get_with_ssl_context("bcu", sources["main"])
-            xls = pd.ExcelFile(r_bytes)
-
-    if dataset_name == "public_debt_global_public_sector":
-        gps_raw = pd.read_excel(
-            xls,
-            sheet_name="SPG2",
-            usecols="B:Q",
-            index_col=0,
-            skiprows=10,
-            nrows=(dt.datetime.now().year - 1999) * 4,
-        )
-        output = gps_raw.dropna(thresh=2)
-        output.index = pd.date_range(
-            start="1999-12-31", periods=len(output), freq="QE-DEC"
-        )
-        output.columns = colnames
-
-    elif dataset_name == "public_debt_nonfinancial_public_sector":
-        nfps_raw = pd.read_excel(
-            xls, sheet_name="SPNM bruta", usecols="B:O", index_col=0
-        )
-        loc = nfps_raw.index.get_loc(
-            "9. Deuda Bruta del Sector Público no " "monetario por plazo y  moneda."
-        )
-        output = nfps_raw.iloc[loc + 5 :, :].dropna(how="any")
-        output.index = pd.date_range(
-            start="1999-12-31", periods=len(output), freq="QE-DEC"
-        )
-        nfps_extra_raw = pd.read_excel(
-            xls,
-            sheet_name="SPNM bruta",
-            usecols="O:P",
-            skiprows=11,
-            nrows=(dt.datetime.now().year - 1999) * 4,
-        )
-        nfps_extra = nfps_extra_raw.dropna(how="all")
-        nfps_extra.index = output.index
-        output = pd.concat([output, nfps_extra], axis=1)
-        output.columns = colnames
-
-    elif dataset_name == "public_debt_central_bank":
-        cb_raw = pd.read_excel(
-            xls,
-            sheet_name="BCU bruta",
-            usecols="B:O",
-            index_col=0,
-            skiprows=(dt.datetime.now().year - 1999) * 8 + 20,
-        )
-        output = cb_raw.dropna(how="any")
-        output.index = pd.date_range(
-            start="1999-12-31", periods=len(output), freq="QE-DEC"
-        )
-        cb_extra_raw = pd.read_excel(
-            xls,
-            sheet_name="BCU bruta",
-            usecols="O:P",
-            skiprows=11,
-            nrows=(dt.datetime.now().year - 1999) * 4,
-        )
-        bcu_extra = cb_extra_raw.dropna(how="all")
-        bcu_extra.index = output.index
-        output = pd.concat([output, bcu_extra], axis=1)
-        output.columns = colnames
-
-    else:
-        assets_raw = pd.read_excel(
-            xls,
-            sheet_name="Activos Neta",
-            usecols="B,C,D,K",
-            index_col=0,
-            skiprows=13,
-            nrows=(dt.datetime.now().year - 1999) * 4 - 1,
-        )
-        output = assets_raw.dropna(how="any")
-        output.index = pd.date_range(
-            start="1999-12-31", periods=len(output), freq="QE-DEC"
-        )
-        output.columns = ["Total activos", "Sector público no monetario", "BCU"]
+    with open_workbook(sources["main"]) as xls:
+        if dataset_name == "public_debt_global_public_sector":
+            gps_raw = read_excel(
+                xls,
+                sheet_name="SPG2",
+                usecols="B:Q",
+                index_col=0,
+                skiprows=10,
+                nrows=(dt.datetime.now().year - 1999) * 4,
+            )
+            output = gps_raw.dropna(thresh=2)
+            output.index = pd.date_range(
+                start="1999-12-31", periods=len(output), freq="QE-DEC"
+            )
+            output.columns = colnames
+
+        elif dataset_name == "public_debt_nonfinancial_public_sector":
+            nfps_raw = read_excel(
+                xls, sheet_name="SPNM bruta", usecols="B:O", index_col=0
+            )
+            loc = nfps_raw.index.get_loc(
+                "9. Deuda Bruta del Sector Público no "
+                "monetario por plazo y  moneda."
+            )
+            output = nfps_raw.iloc[loc + 5 :, :].dropna(how="any")
+            output.index = pd.date_range(
+                start="1999-12-31", periods=len(output), freq="QE-DEC"
+            )
+            nfps_extra_raw = read_excel(
+                xls,
+                sheet_name="SPNM bruta",
+                usecols="O:P",
+                skiprows=11,
+                nrows=(dt.datetime.now().year - 1999) * 4,
+            )
+            nfps_extra = nfps_extra_raw.dropna(how="all")
+            nfps_extra.index = output.index
+            output = pd.concat([output, nfps_extra], axis=1)
+            output.columns = colnames
+
+        elif dataset_name == "public_debt_central_bank":
+            cb_raw = read_excel(
+                xls,
+                sheet_name="BCU bruta",
+                usecols="B:O",
+                index_col=0,
+                skiprows=(dt.datetime.now().year - 1999) * 8 + 20,
+            )
+            output = cb_raw.dropna(how="any")
+            output.index = pd.date_range(
+                start="1999-12-31", periods=len(output), freq="QE-DEC"
+            )
+            cb_extra_raw = read_excel(
+                xls,
+                sheet_name="BCU bruta",
+                usecols="O:P",
+                skiprows=11,
+                nrows=(dt.datetime.now().year - 1999) * 4,
+            )
+            bcu_extra = cb_extra_raw.dropna(how="all")
+            bcu_extra.index = output.index
+            output = pd.concat([output, bcu_extra], axis=1)
+            output.columns = colnames
+
+        else:
+            assets_raw = read_excel(
+                xls,
+                sheet_name="Activos Neta",
+                usecols="B,C,D,K",
+                index_col=0,
+                skiprows=13,
+                nrows=(dt.datetime.now().year - 1999) * 4 - 1,
+            )
+            output = assets_raw.dropna(how="any")
+            output.index = pd.date_range(
+                start="1999-12-31", periods=len(output), freq="QE-DEC"
+            )
+            output.columns = ["Total activos", "Sector público no monetario", "BCU"]
 
     output = output.apply(pd.to_numeric, errors="coerce")
 
@@ -1,7 +1,9 @@
 import pandas as pd
 
 from econuy.base import Dataset, DatasetMetadata
+from econuy.utils.excel import read_excel
 from econuy.utils.operations import get_name_from_function, get_download_sources
+from econuy.utils.retrieval import download
 
 
 def income_household() -> Dataset:
@@ -16,7 +18,7 @@ def income_household() -> Dataset:
     sources = get_download_sources(name)
 
     raw = (
-        pd.read_excel(sources["main"], skiprows=5)
+        read_excel(download(sources["main"]), skiprows=5)
         .dropna(thresh=5)
         .loc[lambda x: x["Mes, Trimestre y Año"].str.contains("/[0-9]{2}", regex=True)]
     )
@@ -69,7 +71,7 @@ def income_capita() -> Dataset:
     sources = get_download_sources(name)
 
     raw = (
-        pd.read_excel(sources["main"], skiprows=5)
+        read_excel(download(sources["main"]), skiprows=5)
         .dropna(thresh=5)
         .loc[lambda x: x["Mes, Trimestre y Año "].str.contains("/[0-9]{2}", regex=True)]
     )
@@ -3,12 +3,14 @@ from pandas.tseries.offsets import MonthEnd
 
 from econuy.base import Dataset, DatasetMetadata
 from econuy import load_dataset
+from econuy.utils.excel import read_excel
 from econuy.utils.operations import (
     get_name_from_function,
     get_download_sources,
     get_names_and_ids,
     get_base_metadata,
 )
+from econuy.utils.retrieval import download
 
 
 def labor_rates_gender() -> Dataset:
@@ -22,7 +24,7 @@ def labor_rates_gender() -> Dataset:
     name = get_name_from_function()
     sources = get_download_sources(name)
 
-    raw = pd.read_excel(sources["main"], skiprows=7).dropna(axis=0, thresh=2)
+    raw = read_excel(download(sources["main"]), skiprows=7).dropna(axis=0, thresh=2)
     output = raw[~raw["Unnamed: 0"].str.contains("-|/|Total", regex=True)]
     output.index = pd.date_range(start="2006-01-31", periods=len(output), freq="ME")
     output = output.drop(columns="Unnamed: 0")
@@ -76,7 +78,7 @@ def activity_region() -> Dataset:
     name = get_name_from_function()
     sources = get_download_sources(name)
 
-    raw = pd.read_excel(sources["main"], skiprows=8).dropna(axis=0, thresh=2)
+    raw = read_excel(download(sources["main"]), skiprows=8).dropna(axis=0, thresh=2)
     output = raw[~raw["Unnamed: 0"].str.contains("-|/|Total", regex=True)]
     output.index = pd.date_range(start="2006-01-31", periods=len(output), freq="ME")
     output = output.drop(columns="Unnamed: 0")
@@ -107,7 +109,7 @@ def employment_region() -> Dataset:
     name = get_name_from_function()
     sources = get_download_sources(name)
 
-    raw = pd.read_excel(sources["main"], skiprows=8).dropna(axis=0, thresh=2)
+    raw = read_excel(download(sources["main"]), skiprows=8).dropna(axis=0, thresh=2)
     output = raw[~raw["Unnamed: 0"].str.contains("-|/|Total", regex=True)]
     output.index = pd.date_range(start="2006-01-31", periods=len(output), freq="ME")
     output = output.drop(columns="Unnamed: 0")
@@ -138,7 +140,7 @@ def unemployment_region() -> Dataset:
     name = get_name_from_function()
     sources = get_download_sources(name)
 
-    raw = pd.read_excel(sources["main"], skiprows=8).dropna(axis=0, thresh=2)
+    raw = read_excel(download(sources["main"]), skiprows=8).dropna(axis=0, thresh=2)
     output = raw[~raw["Unnamed: 0"].str.contains("-|/|Total", regex=True)]
     output.index = pd.date_range(start="2006-01-31", periods=len(output), freq="ME")
     output = output.drop(columns="Unnamed: 0")
@@ -169,7 +171,7 @@ def employment_age() -> Dataset:
     name = get_name_from_function()
     sources = get_download_sources(name)
 
-    raw = pd.read_excel(sources["main"], skiprows=7).dropna(axis=0, thresh=2)
+    raw = read_excel(download(sources["main"]), skiprows=7).dropna(axis=0, thresh=2)
     output = raw[~raw["Unnamed: 0"].str.contains("-|/|Total", regex=True)]
     output.index = pd.date_range(start="2006-01-31", periods=len(output), freq="ME")
     output = output.drop(columns="Unnamed: 0")
@@ -199,7 +201,7 @@ def unemployment_contributions() -> Dataset:
     name = get_name_from_function()
     sources = get_download_sources(name)
 
-    raw = pd.read_excel(sources["main"], skiprows=9).dropna(axis=0, thresh=2)
+    raw = read_excel(download(sources["main"]), skiprows=9).dropna(axis=0, thresh=2)
     output = raw[~raw["Unnamed: 0"].str.contains("-|/|Total", regex=True)]
     output.index = pd.date_range(start="2006-01-31", periods=len(output), freq="ME")
     output = output.drop(columns="Unnamed: 0")
@@ -230,7 +232,7 @@ def unemployment_characteristics() -> Dataset:
     name = get_name_from_function()
     sources = get_download_sources(name)
 
-    raw = pd.read_excel(sources["main"], skiprows=8).dropna(axis=0, thresh=2)
+    raw = read_excel(download(sources["main"]), skiprows=8).dropna(axis=0, thresh=2)
     output = raw[~raw["Unnamed: 0"].str.contains("-|/|Total", regex=True)]
     output.index = pd.date_range(start="2006-01-31", periods=len(output), freq="ME")
     output = output.drop(columns="Unnamed: 0")
@@ -261,8 +263,8 @@ def unemployment_conditions() -> Dataset:
     name = get_name_from_function()
     sources = get_download_sources(name)
 
-    raw = pd.read_excel(
-        sources["main"], skiprows=9, na_values=[".."], usecols="A:I"
+    raw = read_excel(
+        download(sources["main"]), skiprows=9, na_values=[".."], usecols="A:I"
     ).dropna(axis=0, thresh=2)
     output = raw[~raw["Unnamed: 0"].str.contains("-|/|Total", regex=True)]
     output.index = pd.date_range(start="2006-01-31", periods=len(output), freq="ME")
@@ -294,7 +296,7 @@ def unemployment_duration() -> Dataset:
     name = get_name_from_function()
     sources = get_download_sources(name)
 
-    raw = pd.read_excel(sources["main"], skiprows=9, usecols="A,J").dropna(
+    raw = read_excel(download(sources["main"]), skiprows=9, usecols="A,J").dropna(
         axis=0, thresh=2
     )
     output = raw[~raw["Unnamed: 0"].str.contains("-|/|Total", regex=True)]
@@ -327,7 +329,7 @@ def employment_characteristics() -> Dataset:
     name = get_name_from_function()
     sources = get_download_sources(name)
 
-    raw = pd.read_excel(sources["main"], skiprows=8).dropna(axis=0, thresh=2)
+    raw = read_excel(download(sources["main"]), skiprows=8).dropna(axis=0, thresh=2)
     output = raw[~raw["Unnamed: 0"].str.contains("-|/|Total", regex=True)]
     output.index = pd.date_range(start="2006-01-31", periods=len(output), freq="ME")
     output = output.drop(columns="Unnamed: 0")
@@ -358,8 +360,8 @@ def nominal_wages() -> Dataset:
     name = get_name_from_function()
     sources = get_download_sources(name)
 
-    historical = pd.read_excel(sources["historical"], skiprows=8, usecols="A:B")
-    current = pd.read_excel(sources["current"], skiprows=8, usecols="A,C:D")
+    historical = read_excel(download(sources["historical"]), skiprows=8, usecols="A:B")
+    current = read_excel(download(sources["current"]), skiprows=8, usecols="A,C:D")
     historical = historical.dropna(how="any").set_index("Unnamed: 0")
     current = current.dropna(how="any").set_index("Unnamed: 0")
     output = pd.concat([historical, current], axis=1)
@@ -407,7 +409,7 @@ def employment_sector() -> Dataset:
     name = get_name_from_function()
     sources = get_download_sources(name)
 
-    raw = pd.read_excel(sources["main"], skiprows=7).dropna(axis=0, thresh=2)
+    raw = read_excel(download(sources["main"]), skiprows=7).dropna(axis=0, thresh=2)
     output = raw[~raw["Unnamed: 0"].str.contains("-|/|Total", regex=True)]
     output.index = pd.date_range(start="2011-01-31", periods=len(output), freq="ME")
     output = output.drop(columns="Unnamed: 0")
@@ -438,7 +440,7 @@ def hours_worked() -> Dataset:
     name = get_name_from_function()
     sources = get_download_sources(name)
 
-    raw = pd.read_excel(sources["main"]).dropna(axis=0, thresh=2)
+    raw = read_excel(download(sources["main"])).dropna(axis=0, thresh=2)
 
     output = raw[~raw.iloc[:, 0].str.contains("-|/|Total|Año", regex=True)].iloc[:, 1:]
     output.index = pd.date_range(start="2011-01-31", periods=len(output), freq="ME")
@@ -511,8 +513,8 @@ def labor_rates_persons(*args, **kwargs) -> Dataset:
             "Tasa de desempleo: total",
         ],
     ]
-    working_age = pd.read_excel(
-        sources["population"], skiprows=7, index_col=0, nrows=92
+    working_age = read_excel(
+        download(sources["population"]), skiprows=7, index_col=0, nrows=92
     ).dropna(how="all")
     rates.columns = rates.columns.str.replace(": total", "")
 
@@ -1,8 +1,7 @@
-from urllib.error import URLError
-
 import pandas as pd
 from pandas.tseries.offsets import MonthEnd
 
+from econuy.utils.excel import read_excel
 from econuy.utils.operations import (
     get_name_from_function,
     get_download_sources,
@@ -11,7 +10,7 @@ from econuy.utils.operations import (
 )
 from econuy.base import Dataset, DatasetMetadata
 from econuy import load_dataset
-from econuy.utils.retrieval import get_with_ssl_context
+from econuy.utils.retrieval import download
 
 
 def cpi() -> Dataset:
@@ -25,7 +24,9 @@ def cpi() -> Dataset:
     name = get_name_from_function()
     sources = get_download_sources(name)
 
-    raw = pd.read_excel(sources["main"], usecols="C").dropna(axis=0, how="any")
+    raw = read_excel(download(sources["main"]), usecols="C").dropna(
+        axis=0, how="any"
+    )
     output = raw.set_index(
         pd.date_range(start="1937-07-31", freq="ME", periods=len(raw))
     ).rename_axis(None)
@@ -66,7 +67,7 @@ def cpi_core() -> Dataset:
     name = get_name_from_function()
     sources = get_download_sources(name)
 
-    raw = pd.read_excel(sources["main"], usecols="D")
+    raw = read_excel(download(sources["main"]), usecols="D")
     output = raw.set_index(
         pd.date_range(start="2022-10-31", freq="ME", periods=len(raw))
     ).rename_axis(None)
@@ -95,7 +96,9 @@ def indexed_unit() -> Dataset:
     name = get_name_from_function()
     sources = get_download_sources(name)
 
-    raw = pd.read_excel(sources["main"], usecols="A:B", skiprows=5, index_col=0)
+    raw = read_excel(
+        download(sources["main"]), usecols="A:B", skiprows=5, index_col=0
+    )
     output = raw.copy().rename_axis(None).dropna(how="any")
     output.index = pd.to_datetime(output.index, format="%m/%d/%Y")
     output = output.apply(pd.to_numeric, errors="coerce")
@@ -123,7 +126,7 @@ def cpi_divisions() -> Dataset:
     name = get_name_from_function()
     sources = get_download_sources(name)
     raw = (
-        pd.read_excel(sources["main"], usecols="A:D")
+        read_excel(download(sources["main"]), usecols="A:D")
         .dropna(axis=0, how="any")
         .assign(
             date=lambda x: x["Año"].astype(str)
@@ -255,12 +258,7 @@ def inflation_expectations() -> Dataset:
     name = get_name_from_function()
     sources = get_download_sources(name)
 
-    try:
-        raw = pd.read_excel(sources["main"], skiprows=9)
-    except URLError as err:
-        if "SSL: CERTIFICATE_VERIFY_FAILED" in str(err):
-            r_bytes = get_with_ssl_context("bcu", sources["main"])
-            raw = pd.read_excel(r_bytes, skiprows=9)
+    raw = read_excel(download(sources["main"]), skiprows=9)
     raw = raw.dropna(how="all", axis=1).dropna(thresh=4)
     mask = raw.iloc[-12:].isna().all()
     output = raw.loc[:, ~mask]
@@ -317,7 +315,9 @@ def inflation_expectations_corporate() -> Dataset:
     name = get_name_from_function()
     sources = get_download_sources(name)
 
-    raw = pd.read_excel(sources["main"], skiprows=3, usecols="A:G", index_col=0)
+    raw = read_excel(
+        download(sources["main"]), skiprows=3, usecols="A:G", index_col=0
+    )
     output = raw.copy()
     output.index = pd.date_range(start="2020-10-31", freq="ME", periods=len(output))
     output = output.apply(pd.to_numeric, errors="coerce")
@@ -431,7 +431,7 @@ def ppi() -> Dataset:
     sources = get_download_sources(name)
 
     raw = (
-        pd.read_excel(sources["main"], skiprows=7, usecols="H,I,J,K")
+        read_excel(download(sources["main"]), skiprows=7, usecols="H,I,J,K")
         .dropna()
         .rename_axis(None)
     )
@@ -492,8 +492,8 @@ def nxr_monthly(*args, **kwargs) -> Dataset:
         }
     )
 
-    historical = pd.read_excel(
-        sources["historical"], skiprows=4, index_col=0, usecols="A,C,F"
+    historical = read_excel(
+        download(sources["historical"]), skiprows=4, index_col=0, usecols="A,C,F"
     ).dropna(how="any", axis=0)
     historical.columns = [
         "Tipo de cambio venta, fin de período",
@@ -541,7 +541,7 @@ def nxr_daily() -> Dataset:
     name = get_name_from_function()
     sources = get_download_sources(name)
 
-    output = pd.read_excel(sources["main"], usecols="A,D", index_col=0)
+    output = read_excel(download(sources["main"]), usecols="A,D", index_col=0)
     output.index = pd.to_datetime(output.index, format="%d-%m-%Y")
     output = output.loc[~output.index.duplicated(keep="last")]
 
@@ -4,21 +4,21 @@ import tempfile
 import time
 import zipfile
 import datetime as dt
-import ssl
 from io import BytesIO
 from os import path, listdir
 
 import pandas as pd
 import numpy as np
-import httpx
 from pandas.tseries.offsets import MonthEnd
 from dotenv import load_dotenv
 
 from econuy import load_dataset
 from econuy.base import Dataset, DatasetMetadata
-from econuy.utils.chromedriver import _build
+from econuy.utils.excel import read_excel
+from econuy.utils.frozen import read_frozen_source
+from econuy.utils.chromedriver import _build, _get_page
 from econuy.utils.operations import get_download_sources, get_name_from_function
-from econuy.utils.retrieval import get_certs_path
+from econuy.utils.retrieval import download, http_get
 
 
 load_dotenv()
@@ -37,34 +37,29 @@ def regional_gdp() -> Dataset:
     sources = get_download_sources(name)
 
     driver = _build()
-    driver.get(sources["arg_new"])
+    _get_page(driver, sources["arg_new"])
     time.sleep(5)
     source = driver.page_source
     driver.quit()
     url = re.findall(r"/ftp/cuadros/economia/.+desest.+\.xls", source)[0]
     full_url = f"https://www.indec.gob.ar{url}"
-    arg = pd.read_excel(full_url, skiprows=3, usecols="C").dropna(how="all")
+    arg = read_excel(download(full_url), skiprows=3, usecols="C").dropna(how="all")
     arg.index = pd.date_range(start="2004-03-31", freq="QE-DEC", periods=len(arg))
-    arg_old = pd.read_excel(sources["arg_old"], skiprows=7, usecols="D").dropna(
-        how="all"
-    )
+    arg_old = read_frozen_source(
+        name,
+        "arg_old",
+        lambda url: read_excel(download(url), skiprows=7, usecols="D"),
+    ).dropna(how="all")
     arg_old.index = pd.date_range(
         start="1993-03-31", freq="QE-DEC", periods=len(arg_old)
     )
-    arg = pd.concat([arg, arg_old], axis=1)
-    for row in reversed(range(len(arg))):
-        if pd.isna(arg.iloc[row, 0]):
-            arg.iloc[row, 0] = (
-                arg.iloc[row, 1] / arg.iloc[row + 1, 1] * arg.iloc[row + 1, 0]
-            )
-    arg = arg.iloc[:, [0]]
 
-    r = httpx.get(sources["bra"])
+    r = http_get(sources["bra"])
     temp_dir = tempfile.TemporaryDirectory()
     with zipfile.ZipFile(BytesIO(r.content), "r") as f:
         f.extractall(path=temp_dir.name)
     path_temp = path.join(temp_dir.name, listdir(temp_dir.name)[0])
-    bra = pd.read_excel(
+    bra = read_excel(
         path_temp, usecols="Q", skiprows=3, sheet_name="Val encad preços 95 com ajuste"
     )
     bra.index = pd.date_range(start="1996-03-31", freq="QE-DEC", periods=len(bra))
@@ -95,6 +90,11 @@ def regional_gdp() -> Dataset:
     for indicator, currency in zip(ids, ["ARS", "BRL"]):
         metadata.update_indicator_metadata_value(indicator, "currency", currency)
     dataset = Dataset(name, output, metadata)
+    # Argentina's current series is extended backwards with the older one
+    argentina = dataset.select(ids=ids[0])
+    argentina = argentina.splice(Dataset(name, arg_old, argentina.metadata))
+    output = pd.concat([argentina.data, output[ids[1:]]], axis=1)
+    dataset = Dataset(name, output, metadata)
 
     return dataset
 
@@ -112,10 +112,12 @@ def regional_monthly_gdp() -> Dataset:
     name = get_name_from_function()
     sources = get_download_sources(name)
 
-    arg = pd.read_excel(sources["arg"], usecols="E", skiprows=3).dropna(how="all")
+    arg = read_excel(download(sources["arg"]), usecols="E", skiprows=3).dropna(
+        how="all"
+    )
     arg.index = pd.date_range(start="2004-01-31", freq="ME", periods=len(arg))
 
-    bra = pd.read_csv(sources["bra"], sep=";", index_col=0, decimal=",")
+    bra = pd.read_csv(download(sources["bra"]), sep=";", index_col=0, decimal=",")
     bra.index = pd.date_range(start="2003-01-31", freq="ME", periods=len(bra))
 
     output = pd.concat([arg, bra], axis=1)
@@ -161,21 +163,19 @@ def regional_cpi() -> pd.DataFrame:
     name = get_name_from_function()
     sources = get_download_sources(name)
 
-    certs = get_certs_path("bcra")
-    ssl_context = ssl.create_default_context(cafile=str(certs))
-    arg = httpx.get(
+    arg = download(
         sources["ar"].format(
             end_date=dt.datetime.now().strftime("%Y-%m-%d"),
         ),
-        verify=ssl_context,
+        provider="bcra",
     )
-    arg = pd.read_html(arg.content)[0]
+    arg = pd.read_html(arg)[0]
     arg.set_index("Fecha", drop=True, inplace=True)
     arg.index = pd.to_datetime(arg.index, format="%d/%m/%Y")
     arg.columns = ["nivel"]
     arg = arg.divide(10)
 
-    arg_unoff = pd.read_excel(sources["ar_unofficial"])
+    arg_unoff = read_excel(download(sources["ar_unofficial"]))
     arg_unoff.set_index("date", drop=True, inplace=True)
     arg_unoff.index = arg_unoff.index + MonthEnd(0)
     arg_unoff = arg_unoff.loc[
@@ -192,7 +192,7 @@ def regional_cpi() -> pd.DataFrame:
     )
     arg = arg.divide(100).add(1).cumprod()
 
-    bra_r = httpx.get(sources["bra"].format(date=dt.datetime.now().strftime("%Y%m")))
+    bra_r = http_get(sources["bra"].format(date=dt.datetime.now().strftime("%Y%m")))
     bra = pd.DataFrame(bra_r.json())[["v"]]
     bra.index = pd.date_range(start="1979-12-31", freq="ME", periods=len(bra))
     bra = bra.apply(pd.to_numeric, errors="coerce")
@@ -241,7 +241,9 @@ def regional_embi_spreads() -> Dataset:
     name = get_name_from_function()
     sources = get_download_sources(name)
 
-    raw = pd.read_excel(sources["main"], usecols="A:B,E,G", skiprows=1, index_col=0)
+    raw = read_excel(
+        download(sources["main"]), usecols="A:B,E,G", skiprows=1, index_col=0
+    )
     output = (
         raw.loc[~pd.isna(raw.index)]
         .mul(100)
@@ -296,7 +298,7 @@ def regional_embi_yields(*args, **kwargs) -> Dataset:
             "FRED_API_KEY not found. Get one at https://fredaccount.stlouisfed.org/apikeys and set it as an environment variable."
         )
 
-    r = httpx.get(sources["treasury"].format(FRED_API_KEY))
+    r = http_get(sources["treasury"].format(FRED_API_KEY))
     treasuries = pd.DataFrame.from_records(r.json()["observations"]).set_index("date")[
         ["value"]
     ]
@@ -350,7 +352,7 @@ def regional_nxr() -> Dataset:
 
     arg = []
     for dollar in ["ar", "ar_unofficial"]:
-        r = httpx.get(
+        r = http_get(
             sources[dollar].format(date=dt.datetime.now().strftime("%d-%m-%Y")),
             headers={
                 "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36"
@@ -367,7 +369,7 @@ def regional_nxr() -> Dataset:
     arg = arg[0].join(arg[1], how="left")
     arg.columns = ["Argentina - oficial", "Argentina - informal"]
 
-    r = httpx.get(sources["bra"])
+    r = http_get(sources["bra"])
     bra = pd.DataFrame(r.json())
     bra = [(x["VALDATA"], x["VALVALOR"]) for x in bra["value"]]
     bra = pd.DataFrame.from_records(bra).dropna(how="any")
@@ -415,7 +417,7 @@ def regional_policy_rates() -> Dataset:
     name = get_name_from_function()
     sources = get_download_sources(name)
 
-    r = httpx.get(sources["main"])
+    r = http_get(sources["main"])
     temp_dir = tempfile.TemporaryDirectory()
     with zipfile.ZipFile(BytesIO(r.content), "r") as f:
         f.extractall(path=temp_dir.name)
@@ -566,7 +568,7 @@ def _ifs(*args, **kwargs) -> pd.DataFrame:
             base_url = (
                 f"{url_}.{country}.{indicator}.{url_extra}{dt.datetime.now().year}"
             )
-            r_json = httpx.get(base_url, timeout=30).json()
+            r_json = http_get(base_url, timeout=30).json()
             data = r_json["CompactData"]["DataSet"]["Series"]["Obs"]
             try:
                 data = pd.DataFrame(data)
@@ -2,6 +2,8 @@ from typing import Tuple
 
 import pandas as pd
 
+from econuy.utils.transform import infer_freq
+
 
 def _chg_diff(
     data: pd.DataFrame,
@@ -16,7 +18,7 @@ def _chg_diff(
     # We get the first one because we validated that all indicators have the same metadata, or pass them one by one
     single_metadata = metadata.indicator_metadata[indicators[0]]
     time_series_type = single_metadata["time_series_type"]
-    inferred_freq = pd.infer_freq(data.index)
+    inferred_freq = infer_freq(data.index)
 
     type_change = {
         "last": {
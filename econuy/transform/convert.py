@@ -3,7 +3,11 @@ from datetime import datetime
 
 import pandas as pd
 
-from econuy.utils.transform import error_handler
+from econuy.utils.transform import error_handler, get_shared_input, infer_freq
+
+
+# Datasets loaded by each conversion flavor
+CONVERTER_DATASETS = {"usd": "nxr_monthly", "real": "cpi", "gdp": "gdp_denominator"}
 
 
 def _convert_usd(
@@ -22,9 +26,8 @@ def _convert_usd(
         output = error_handler(data, errors=error_handling, msg="Currency is not UYU")
         return output, metadata
 
-    nxr = load_dataset("nxr_monthly")
     time_series_type = single_metadata["time_series_type"]
-    inferred_freq = pd.infer_freq(data.index)
+    inferred_freq = infer_freq(data.index)
     target_freq = inferred_freq
 
     # For now we only support converting monthly or lower frequency data, so we resample first.
@@ -36,13 +39,24 @@ def _convert_usd(
         target_freq = "ME"
 
     if time_series_type == "Stock":
-        nxr_freq = nxr.resample(target_freq, operation="last").data.iloc[:, [1]]
+        nxr_freq = get_shared_input(
+            (CONVERTER_DATASETS["usd"], target_freq, "last"),
+            lambda: (
+                load_dataset(CONVERTER_DATASETS["usd"])
+                .resample(target_freq, operation="last")
+                .data.iloc[:, [1]]
+            ),
+        )
     else:
         cum_periods = single_metadata["cumulative_periods"]
-        nxr_freq = (
-            nxr.resample(target_freq, operation="mean")
-            .rolling(window=cum_periods, operation="mean")
-            .data.iloc[:, [0]]
+        nxr_freq = get_shared_input(
+            (CONVERTER_DATASETS["usd"], target_freq, "mean", cum_periods),
+            lambda: (
+                load_dataset(CONVERTER_DATASETS["usd"])
+                .resample(target_freq, operation="mean")
+                .rolling(window=cum_periods, operation="mean")
+                .data.iloc[:, [0]]
+            ),
         )
 
     nxr_to_use = nxr_freq.reindex(data.index).iloc[:, 0]
@@ -76,22 +90,24 @@ def _convert_real(
         )
         return output, metadata
 
-    cpi = load_dataset("cpi")
-
-    inferred_freq = pd.infer_freq(data.index)
+    inferred_freq = infer_freq(data.index)
     target_freq = inferred_freq
     if inferred_freq in ["D", "B", "C", "W", "W-SUN", None]:
         if single_metadata["time_series_type"] == "Flow":
             data = data.resample("ME").sum()
         else:
             data = data.resample("ME").mean()
-        target_freq = pd.infer_freq(data.index)
+        target_freq = infer_freq(data.index)
 
     cum_periods = single_metadata["cumulative_periods"]
-    cpi_to_use = (
-        cpi.resample(target_freq, operation="mean")
-        .rolling(cum_periods, operation="mean")
-        .data.iloc[:, 0]
+    cpi_to_use = get_shared_input(
+        (CONVERTER_DATASETS["real"], target_freq, "mean", cum_periods),
+        lambda: (
+            load_dataset(CONVERTER_DATASETS["real"])
+            .resample(target_freq, operation="mean")
+            .rolling(cum_periods, operation="mean")
+            .data.iloc[:, 0]
+        ),
     )
 
     start_date = (
@@ -168,9 +184,12 @@ def _convert_gdp(
         )
         return output, metadata
 
-    gdp = load_dataset("gdp_denominator").data
+    gdp = get_shared_input(
+        (CONVERTER_DATASETS["gdp"],),
+        lambda: load_dataset(CONVERTER_DATASETS["gdp"]).data,
+    )
 
-    inferred_freq = pd.infer_freq(data.index)
+    inferred_freq = infer_freq(data.index)
     target_freq = inferred_freq
     cum_periods = single_metadata["cumulative_periods"]
     ts_type = single_metadata["time_series_type"]
@@ -0,0 +1,143 @@
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas.tseries.frequencies import to_offset
+from pandas.tseries.offsets import MonthEnd
+
+from econuy.utils.transform import infer_freq
+
+
+PERIODS_PER_YEAR = {"ME": 12, "QE": 4, "QE-DEC": 4, "YE": 1, "YE-DEC": 1}
+
+
+def _extend_yoy(
+    data: pd.DataFrame, growth: pd.DataFrame, periods: Optional[int] = None
+) -> pd.DataFrame:
+    """
+    Extend series with year-over-year growth rates.
+
+    Each period of ``growth`` that is not in ``data`` is filled with the value
+    one year earlier times ``1 + growth / 100``, chaining through extended
+    periods when ``growth`` spans more than a year. Every period one year apart
+    is chained with a cumulative product, instead of period by period, and the
+    result is the same as applying the rates one period at a time.
+
+    If the index of ``data`` has no monthly, quarterly or annual frequency and
+    ``periods`` is not set, or has no frequency at all, each period is instead
+    matched with the date one calendar year earlier, or the month end one year
+    earlier for month-end dates. Growth rates dated off the frequency of
+    ``data`` (e.g. month starts for month-end data) are moved to the period that
+    contains them.
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        The base series.
+    growth : pd.DataFrame
+        Year-over-year percent changes. Columns not in ``data`` are added.
+    periods : Optional[int], optional
+        Number of periods in a year. If None, it is inferred from the frequency
+        of ``data``.
+
+    Returns
+    -------
+    pd.DataFrame
+        ``data`` with the periods of ``growth`` appended. Periods whose value
+        one year earlier is not available are left missing.
+    """
+    freq = data.index.freqstr
+    if freq is None and len(data.index) >= 3:
+        freq = infer_freq(data.index)
+    if freq is None or (periods is None and freq not in PERIODS_PER_YEAR):
+        return _extend_yoy_by_date(data, growth)
+    if periods is None:
+        periods = PERIODS_PER_YEAR[freq]
+
+    aligned = _align_growth(growth, data.index[0], freq)
+    if aligned is None:
+        return _extend_yoy_by_date(data, growth)
+    growth = aligned.loc[~aligned.index.isin(data.index)]
+    columns = data.columns.append(growth.columns.difference(data.columns, sort=False))
+    if growth.empty:
+        return data.reindex(columns=columns)
+    index = pd.date_range(
+        data.index[0], max(data.index[-1], growth.index[-1]), freq=freq
+    )
+    output = data.reindex(index=index, columns=columns)
+
+    # Base values start a chain of growth factors in each period of the year
+    extended = index.isin(growth.index) & ~index.isin(data.index)
+    factors = output[growth.columns].where(
+        pd.Series(~extended, index=index), 1 + growth.reindex(index) / 100, axis=0
+    )
+    positions = np.arange(len(index))
+    phases = positions % periods
+    chains = pd.Series(~extended).groupby(phases).cumsum().to_numpy()
+    chained = (
+        factors.set_axis(positions)
+        .groupby([phases, chains])
+        .cumprod(skipna=False)
+        .set_axis(index)
+    )
+    # Chains of periods before the first base value of their phase have no base
+    chained.loc[chains == 0] = np.nan
+    output.loc[extended, growth.columns] = chained.loc[extended]
+    return output.loc[data.index.union(growth.index)]
+
+
+def _align_growth(
+    growth: pd.DataFrame, start: pd.Timestamp, freq: str
+) -> Optional[pd.DataFrame]:
+    """
+    Move growth rates to the dates of the periods of ``freq`` starting at
+    ``start`` that contain them, or return None if some are before ``start`` or
+    two fall in the same period.
+    """
+    if growth.empty:
+        return growth
+    grid = pd.date_range(start, growth.index.max() + to_offset(freq), freq=freq)
+    if growth.index.isin(grid).all():
+        return growth
+    try:
+        grid_periods = grid.to_period()
+        positions = grid_periods.get_indexer(growth.index.to_period(grid_periods.freq))
+    except (ValueError, TypeError):
+        return None
+    if (positions == -1).any() or pd.Index(positions).has_duplicates:
+        return None
+    return growth.set_axis(grid[positions])
+
+
+def _extend_yoy_by_date(data: pd.DataFrame, growth: pd.DataFrame) -> pd.DataFrame:
+    """Extend series with year-over-year growth rates matched by calendar date."""
+    growth = growth.loc[~growth.index.isin(data.index)]
+    columns = data.columns.append(growth.columns.difference(data.columns, sort=False))
+    output = data.reindex(index=data.index.union(growth.index), columns=columns)
+
+    # Periods whose year-ago value is already known are extended together, so
+    # there is one step per year spanned by the growth rates
+    pending = growth.index.sort_values()
+    while not pending.empty:
+        year_ago = pending - pd.DateOffset(years=1)
+        # Month ends are matched with month ends, such as February 29
+        year_ago = year_ago.where(~pending.is_month_end, year_ago + MonthEnd(0))
+        ready = ~year_ago.isin(pending)
+        base = output[growth.columns].reindex(year_ago[ready]).to_numpy()
+        rates = growth.loc[pending[ready]].to_numpy()
+        output.loc[pending[ready], growth.columns] = base * (1 + rates / 100)
+        pending = pending[~ready]
+    return output
+
+
+def _extend_yoy_dataset(
+    data: pd.DataFrame,
+    metadata: "Metadata",  # type: ignore # noqa: F821
+    growth: pd.DataFrame,
+    periods: Optional[int] = None,
+) -> Tuple[pd.DataFrame, "Metadata"]:  # type: ignore # noqa: F821
+    metadata = metadata.copy()
+    output = _extend_yoy(data, growth, periods)
+    end_date = output.index[-1].strftime("%Y-%m-%d")
+    metadata.add_transformation_step({"extend_yoy": {"end_date": end_date}})
+    return output, metadata
@@ -4,6 +4,8 @@ from typing import Union, Tuple
 import pandas as pd
 import numpy as np
 
+from econuy.utils.transform import infer_freq
+
 
 def _resample(
     data: pd.DataFrame,
@@ -52,7 +54,7 @@ def _resample(
         metadata.update_dataset_metadata({"cumulative_periods": cum_adj})
 
     if operation in ["sum", "mean", "last"]:
-        infer_base = pd.infer_freq(data.index)
+        infer_base = infer_freq(data.index)
         try:
             base_freq = pd_frequencies[infer_base]
             target_freq = pd_frequencies[rule]
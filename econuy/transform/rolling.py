@@ -2,6 +2,8 @@ from typing import Optional, Tuple
 
 import pandas as pd
 
+from econuy.utils.transform import infer_freq
+
 
 def _rolling(
     data: pd.DataFrame,
@@ -32,7 +34,7 @@ def _rolling(
     }
 
     if window is None:
-        inferred_freq = pd.infer_freq(data.index)
+        inferred_freq = infer_freq(data.index)
         window = pd_frequencies[inferred_freq]
 
     output = data.apply(window_operation[operation])
@@ -0,0 +1,70 @@
+from typing import Tuple
+
+import numpy as np
+import pandas as pd
+
+
+def _splice(data: pd.DataFrame, older: pd.DataFrame) -> pd.DataFrame:
+    """
+    Extend series backwards with the growth rates of older series.
+
+    Periods in which every column of ``data`` is missing are filled by chaining
+    the next period's value with the period-on-period ratios of ``older``, i.e.
+    ``data[t] = data[t + 1] * older[t] / older[t + 1]``. The chain is computed
+    as a cumulative product of ratios from each period to the next available
+    period of ``data``, instead of period by period. Columns are matched by
+    position.
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        The newer series.
+    older : pd.DataFrame
+        The older series, with the same number of columns as ``data``.
+
+    Returns
+    -------
+    pd.DataFrame
+        ``data`` reindexed to the union of both indexes, with missing periods
+        filled. Periods without a later value in ``data`` are left missing.
+    """
+    index = data.index.union(older.index)
+    output = data.reindex(index)
+    older = older.set_axis(output.columns, axis=1).reindex(index)
+    missing = output.isna().all(axis=1).to_numpy()
+    if not missing.any():
+        return output
+
+    # Each missing period is chained to the next period with data
+    positions = np.arange(len(index), dtype=float)
+    anchors = pd.Series(np.where(missing, np.nan, positions)).bfill().to_numpy()
+    ratios = (older / older.shift(-1)).where(
+        pd.Series(missing, index=index), 1.0, axis=0
+    )
+    ratios = ratios.set_axis(np.arange(len(index)))
+    factors = (
+        ratios.iloc[::-1].groupby(anchors[::-1]).cumprod(skipna=False).sort_index()
+    )
+    chained = np.full(output.shape, np.nan)
+    anchored = ~np.isnan(anchors)
+    chained[anchored] = (
+        output.to_numpy()[anchors[anchored].astype(int)]
+        * factors.reindex(np.flatnonzero(anchored)).to_numpy()
+    )
+    output.iloc[missing] = chained[missing]
+    return output
+
+
+def _splice_dataset(
+    data: pd.DataFrame,
+    metadata: "Metadata",  # type: ignore # noqa: F821
+    older: pd.DataFrame,
+    older_name: str,
+) -> Tuple[pd.DataFrame, "Metadata"]:  # type: ignore # noqa: F821
+    metadata = metadata.copy()
+    output = _splice(data, older)
+    start_date = output.index[0].strftime("%Y-%m-%d")
+    metadata.add_transformation_step(
+        {"splice": {"older": older_name, "start_date": start_date}}
+    )
+    return output, metadata
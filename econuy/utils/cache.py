@@ -0,0 +1,555 @@
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Tuple, Dict, Hashable, List
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from econuy.utils.locking import atomic_path, dataset_lock
+
+
+CACHE_FORMATS = {"parquet": ".parquet", "arrow": ".arrow", "csv": ".csv"}
+DEFAULT_CACHE_FORMAT = "parquet"
+CACHE_FORMAT_FILENAME = ".econuy_format"
+DEFAULT_MEMORY_CACHE_BYTES = 256 * 1024**2
+DEFAULT_REVISION_WINDOW = 24
+MAX_SEGMENTS = 12
+
+
+def get_cache_format(
+    data_dir: Optional[Path] = None, cache_format: Optional[str] = None
+) -> str:
+    """
+    Get the file format used for cached datasets.
+
+    The format is chosen with the following precedence: the ``cache_format``
+    argument, the ``ECONUY_CACHE_FORMAT`` environment variable, a
+    ``.econuy_format`` file in ``data_dir`` containing the format name, and
+    finally ``DEFAULT_CACHE_FORMAT``.
+
+    Parameters
+    ----------
+    data_dir : Path, optional
+        The cache directory.
+    cache_format : str, optional
+        Explicit format, one of ``parquet``, ``arrow`` or ``csv``.
+
+    Returns
+    -------
+    str
+        The cache format.
+
+    Raises
+    ------
+    ValueError
+        If the format is not one of the available options.
+    """
+    cache_format = cache_format or os.getenv("ECONUY_CACHE_FORMAT", "")
+    if not cache_format and data_dir is not None:
+        format_file = Path(data_dir) / CACHE_FORMAT_FILENAME
+        if format_file.exists():
+            cache_format = format_file.read_text().strip()
+    cache_format = (cache_format or DEFAULT_CACHE_FORMAT).lower()
+    if cache_format not in CACHE_FORMATS:
+        raise ValueError(
+            f"Invalid cache format '{cache_format}'. "
+            f"Must be one of {list(CACHE_FORMATS.keys())}."
+        )
+    return cache_format
+
+
+def get_data_path(name: str, data_dir: Path, cache_format: str) -> Path:
+    return Path(data_dir) / f"{name}{CACHE_FORMATS[cache_format]}"
+
+
+def get_metadata_path(name: str, data_dir: Path) -> Path:
+    return Path(data_dir) / f"{name}_metadata.json"
+
+
+def find_data_path(
+    name: str, data_dir: Path, cache_format: str
+) -> Optional[Tuple[Path, str]]:
+    """
+    Find the cached data file for a dataset, looking first for the preferred
+    format and then for any other supported format.
+
+    Parameters
+    ----------
+    name : str
+        The name of the dataset.
+    data_dir : Path
+        The cache directory.
+    cache_format : str
+        The preferred cache format.
+
+    Returns
+    -------
+    Optional[Tuple[Path, str]]
+        The path of the data file and its format, or None if there is no file.
+    """
+    formats = [cache_format] + [x for x in CACHE_FORMATS if x != cache_format]
+    for file_format in formats:
+        path = get_data_path(name, data_dir, file_format)
+        if path.exists():
+            return path, file_format
+    return None
+
+
+def read_data(path: Path, cache_format: str, memory_map: bool = False) -> pd.DataFrame:
+    """
+    Read a cached data file.
+
+    Parameters
+    ----------
+    path : Path
+        The path of the data file.
+    cache_format : str
+        The format of the data file.
+    memory_map : bool, default False
+        Only used for Arrow IPC files. If True, return a DataFrame whose
+        columns are backed by the memory-mapped file instead of copies. These
+        arrays are read-only and several processes mapping the same file will
+        share the same pages.
+
+    Returns
+    -------
+    pd.DataFrame
+        The cached data.
+    """
+    if cache_format == "parquet":
+        return pq.read_table(path).to_pandas()
+    elif cache_format == "arrow":
+        source = pa.memory_map(str(path), "r")
+        table = pa.ipc.open_file(source).read_all()
+        if memory_map:
+            # Mapped buffers stay alive as long as the frame references them.
+            return table.to_pandas(split_blocks=True)
+        output = table.to_pandas()
+        source.close()
+        return output
+    else:
+        return pd.read_csv(path, index_col=0, parse_dates=True)
+
+
+def _to_arrow_table(data: pd.DataFrame) -> pa.Table:
+    table = pa.Table.from_pandas(data, preserve_index=True)
+    # Keep NaNs as values instead of nulls so float columns can be mapped
+    # without copying when read back.
+    for i, field in enumerate(table.schema):
+        if field.name in data.columns and pa.types.is_floating(field.type):
+            values = pa.array(data[field.name].to_numpy(), type=field.type)
+            table = table.set_column(i, field, values)
+    return table
+
+
+def write_data(data: pd.DataFrame, path: Path, cache_format: str) -> None:
+    with atomic_path(path) as tmp_path:
+        if cache_format == "csv":
+            data.to_csv(tmp_path)
+        elif cache_format == "parquet":
+            pq.write_table(_to_arrow_table(data), tmp_path)
+        else:
+            table = _to_arrow_table(data)
+            with pa.OSFile(str(tmp_path), "wb") as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+    return
+
+
+def remove_other_formats(name: str, data_dir: Path, cache_format: str) -> None:
+    """Remove data files for a dataset that are not in ``cache_format``."""
+    for file_format in CACHE_FORMATS:
+        if file_format == cache_format:
+            continue
+        get_data_path(name, data_dir, file_format).unlink(missing_ok=True)
+    return
+
+
+def get_segments_dir(name: str, data_dir: Path) -> Path:
+    return Path(data_dir) / f"{name}.segments"
+
+
+def get_segment_paths(name: str, data_dir: Path, cache_format: str) -> List[Path]:
+    segments_dir = get_segments_dir(name, data_dir)
+    if not segments_dir.exists():
+        return []
+    return sorted(segments_dir.glob(f"*{CACHE_FORMATS[cache_format]}"))
+
+
+def remove_segments(name: str, data_dir: Path) -> None:
+    shutil.rmtree(get_segments_dir(name, data_dir), ignore_errors=True)
+    return
+
+
+def read_cached_data(
+    name: str, data_dir: Path, cache_format: str, memory_map: bool = False
+) -> pd.DataFrame:
+    """
+    Read a cached dataset's data, applying any appended segments on top of the
+    base file.
+
+    Each segment replaces all rows of the data from the position encoded in its
+    file name onwards.
+
+    Parameters
+    ----------
+    name : str
+        The name of the dataset.
+    data_dir : Path
+        The cache directory.
+    cache_format : str
+        The format of the data files.
+    memory_map : bool, default False
+        Passed to ``read_data``.
+
+    Returns
+    -------
+    pd.DataFrame
+        The cached data.
+    """
+    data = read_data(
+        get_data_path(name, data_dir, cache_format),
+        cache_format,
+        memory_map=memory_map,
+    )
+    for path in get_segment_paths(name, data_dir, cache_format):
+        start = int(path.stem.split("-")[1])
+        segment = read_data(path, cache_format)
+        data = pd.concat([data.iloc[:start], segment])
+    return data
+
+
+def write_cached_data(
+    data: pd.DataFrame,
+    name: str,
+    data_dir: Path,
+    cache_format: str,
+    revision_window: Optional[int] = None,
+) -> None:
+    """
+    Write a dataset's data to the cache, persisting only the changed rows when
+    possible.
+
+    If the cached data matches the new data except for the last
+    ``revision_window`` rows and any appended rows, only the rows from the first
+    difference onwards are written as a new segment. Otherwise, or when there
+    are more than ``MAX_SEGMENTS`` segments, the full data is rewritten and
+    existing segments are compacted away. CSV caches are always rewritten.
+
+    Parameters
+    ----------
+    data : pd.DataFrame
+        The data to write.
+    name : str
+        The name of the dataset.
+    data_dir : Path
+        The cache directory.
+    cache_format : str
+        The format of the data files.
+    revision_window : int, optional
+        Number of trailing rows of the cached data that may be revised while
+        still writing a segment. If None, use the ``ECONUY_REVISION_WINDOW``
+        environment variable or ``DEFAULT_REVISION_WINDOW``.
+    """
+    path = get_data_path(name, data_dir, cache_format)
+    if cache_format == "csv" or not path.exists():
+        write_data(data, path, cache_format)
+        remove_segments(name, data_dir)
+        return
+
+    if revision_window is None:
+        revision_window = int(
+            os.getenv("ECONUY_REVISION_WINDOW", DEFAULT_REVISION_WINDOW)
+        )
+    existing = read_cached_data(name, data_dir, cache_format)
+    start = _find_append_start(existing, data, revision_window)
+    if start == len(data):
+        return
+    segments = get_segment_paths(name, data_dir, cache_format)
+    if start is None or start == 0 or len(segments) >= MAX_SEGMENTS:
+        write_data(data, path, cache_format)
+        remove_segments(name, data_dir)
+        return
+
+    segments_dir = get_segments_dir(name, data_dir)
+    segments_dir.mkdir(exist_ok=True)
+    number = int(segments[-1].stem.split("-")[0]) + 1 if segments else 0
+    segment_path = segments_dir / f"{number:05d}-{start}{CACHE_FORMATS[cache_format]}"
+    write_data(data.iloc[start:], segment_path, cache_format)
+    return
+
+
+def compact(name: str, data_dir: Path, cache_format: Optional[str] = None) -> None:
+    """
+    Merge a cached dataset's segments into its base data file.
+
+    Parameters
+    ----------
+    name : str
+        The name of the dataset.
+    data_dir : Path
+        The cache directory.
+    cache_format : str, optional
+        The format of the data files.
+    """
+    cache_format = get_cache_format(data_dir, cache_format)
+    with dataset_lock(name, data_dir):
+        if not get_segment_paths(name, data_dir, cache_format):
+            return
+        data = read_cached_data(name, data_dir, cache_format)
+        write_data(data, get_data_path(name, data_dir, cache_format), cache_format)
+        remove_segments(name, data_dir)
+    return
+
+
+def _find_append_start(
+    existing: pd.DataFrame, new: pd.DataFrame, revision_window: int
+) -> Optional[int]:
+    """
+    Find the first row position at which ``new`` differs from ``existing``.
+
+    Returns None if the data cannot be expressed as ``existing`` with revised
+    trailing rows plus appended rows.
+    """
+    if (
+        len(new) < len(existing)
+        or not existing.columns.equals(new.columns)
+        or not existing.dtypes.equals(new.dtypes)
+        or existing.index.dtype != new.index.dtype
+    ):
+        return None
+
+    n = len(existing)
+    head = new.iloc[:n]
+    same_index = existing.index == head.index
+    same_values = (
+        (existing.to_numpy() == head.to_numpy())
+        | (existing.isna().to_numpy() & head.isna().to_numpy())
+    ).all(axis=1)
+    different = ~(same_index & same_values)
+    start = int(different.argmax()) if different.any() else n
+    if start < n - revision_window:
+        return None
+    return start
+
+
+class DatasetHandle:
+    """
+    Lightweight, picklable reference to a dataset stored as an Arrow IPC file.
+
+    Worker processes can persist a dataset and return its handle instead of the
+    dataset itself, so the receiving process memory-maps the file rather than
+    unpickling a full copy of the data.
+
+    Parameters
+    ----------
+    name : str
+        The name of the dataset.
+    directory : Path
+        The directory holding the data and metadata files.
+    transformed : bool
+        Whether the data has been transformed.
+    """
+
+    def __init__(self, name: str, directory: Path, transformed: bool = False):
+        self.name = name
+        self.directory = Path(directory)
+        self.transformed = transformed
+
+    @classmethod
+    def from_dataset(cls, dataset: "Dataset", directory: Path) -> "DatasetHandle":  # noqa: F821
+        """
+        Persist a dataset to ``directory`` and return a handle to it.
+
+        Parameters
+        ----------
+        dataset : Dataset
+            The dataset to persist.
+        directory : Path
+            The directory to write the Arrow IPC and metadata files to.
+
+        Returns
+        -------
+        DatasetHandle
+            A handle to the persisted dataset.
+        """
+        dataset.save(directory, name=dataset.name, cache_format="arrow")
+        return cls(dataset.name, directory, dataset.transformed)
+
+    def load(self) -> "Dataset":  # noqa: F821
+        """
+        Load the dataset with its data backed by the memory-mapped file.
+
+        Returns
+        -------
+        Dataset
+            The dataset. Its underlying arrays are read-only.
+        """
+        from econuy.base import Dataset, DatasetMetadata
+
+        data = read_data(
+            get_data_path(self.name, self.directory, "arrow"),
+            "arrow",
+            memory_map=True,
+        )
+        metadata = DatasetMetadata.from_json(
+            get_metadata_path(self.name, self.directory)
+        )
+        return Dataset(self.name, data, metadata, transformed=self.transformed)
+
+    def __repr__(self) -> str:
+        return f"DatasetHandle(name={self.name}, directory={self.directory})"
+
+
+class MemoryCache:
+    """
+    Bounded, thread-safe LRU cache for datasets read from disk.
+
+    Entries are stored along with a signature of the files they were read from
+    (modification time and size), and are considered stale if the signature
+    changes.
+
+    Parameters
+    ----------
+    max_bytes : int, optional
+        Maximum total size of cached data, in bytes. If None, use the
+        ``ECONUY_MEMORY_CACHE_BYTES`` environment variable or 256 MiB. Setting
+        it to 0 disables the cache.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None) -> None:
+        if max_bytes is None:
+            max_bytes = int(
+                os.getenv("ECONUY_MEMORY_CACHE_BYTES", DEFAULT_MEMORY_CACHE_BYTES)
+            )
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.current_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def file_signature(*paths: Path) -> Tuple:
+        """Get a signature of files based on their modification time and size."""
+        signature = []
+        for path in paths:
+            stat = Path(path).stat()
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+
+    def get(self, key: Hashable, signature: Tuple) -> Optional["Dataset"]:  # noqa: F821
+        """
+        Get a copy of a cached dataset.
+
+        Parameters
+        ----------
+        key : Hashable
+            The cache key.
+        signature : Tuple
+            The current signature of the dataset's files.
+
+        Returns
+        -------
+        Optional[Dataset]
+            A copy of the cached dataset, or None if it is not cached or stale.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != signature:
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            dataset = entry[1]
+        return _copy_dataset(dataset)
+
+    def put(self, key: Hashable, signature: Tuple, dataset: "Dataset") -> None:  # noqa: F821
+        """
+        Cache a copy of a dataset, evicting least recently used entries if needed.
+
+        Parameters
+        ----------
+        key : Hashable
+            The cache key.
+        signature : Tuple
+            The signature of the dataset's files.
+        dataset : Dataset
+            The dataset to cache.
+        """
+        nbytes = int(dataset.data.memory_usage(index=True, deep=True).sum())
+        if nbytes > self.max_bytes:
+            return
+        dataset = _copy_dataset(dataset)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (signature, dataset, nbytes)
+            self.current_bytes += nbytes
+            while self.current_bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+        return
+
+    def invalidate(self, key: Hashable) -> None:
+        """Remove a dataset from the cache."""
+        with self._lock:
+            self._remove(key)
+        return
+
+    def clear(self) -> None:
+        """Remove all datasets from the cache and reset counters."""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+        return
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get cache statistics.
+
+        Returns
+        -------
+        Dict[str, int]
+            Hits, misses, evictions, number of entries and cached bytes.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.current_bytes -= entry[2]
+
+
+def _copy_dataset(dataset: "Dataset") -> "Dataset":  # noqa: F821
+    return dataset.__class__(
+        name=dataset.name,
+        data=dataset.data.copy(),
+        metadata=dataset.metadata.copy(),
+        transformed=dataset.transformed,
+    )
+
+
+def get_memory_cache_key(name: str, data_dir: Path) -> Tuple[str, str]:
+    return name, Path(data_dir).resolve().as_posix()
+
+
+MEMORY_CACHE = MemoryCache()
@@ -3,6 +3,9 @@ import os
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
+from selenium.common.exceptions import WebDriverException
+
+from econuy.utils.throttling import call_with_retries
 
 
 def _build(download_dir: str = "."):
@@ -26,3 +29,8 @@ def _build(download_dir: str = "."):
         service = None
 
     return webdriver.Chrome(service=service, options=chrome_options)
+
+
+def _get_page(driver, url: str) -> None:
+    """Load a page, retrying failed loads."""
+    call_with_retries(lambda: driver.get(url), (WebDriverException,))
@@ -0,0 +1,494 @@
+import argparse
+import atexit
+import contextlib
+import importlib.util
+import json
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import warnings
+import zipfile
+from concurrent import futures
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Type, Union
+
+import pandas as pd
+
+from econuy.utils.operations import get_data_dir
+from econuy.utils.raw_cache import URLS_DIRNAME, get_raw_dir, read_body
+
+
+ENGINES = ("calamine", "openpyxl", "xlrd")
+# Engines used for each workbook format
+FORMAT_ENGINES = {"xlsx": ("calamine", "openpyxl"), "xls": ("calamine", "xlrd")}
+# Engines whose sheets are worth parsing in parallel: they parse a sheet only
+# when it is read (pandas opens xlsx files with openpyxl in read-only mode), and
+# slowly enough to pay for moving the frames between processes. xlrd parses the
+# whole workbook on open, and calamine is faster than the transfer
+PARALLEL_ENGINES = ("openpyxl",)
+XLS_SIGNATURE = b"\xd0\xcf\x11\xe0"
+AUTO_ENGINE = "auto"
+DEFAULT_ENGINE = "default"
+# Process pool shared by every call to read_excel_sheets
+_POOL: Optional[futures.ProcessPoolExecutor] = None
+_POOL_LOCK = threading.Lock()
+
+
+def engine_available(engine: str) -> bool:
+    """Check whether an Excel engine's package is installed."""
+    module = "python_calamine" if engine == "calamine" else engine
+    return importlib.util.find_spec(module) is not None
+
+
+def get_excel_engine() -> Optional[str]:
+    """
+    Get the engine used to read Excel workbooks, set with the
+    ``ECONUY_EXCEL_ENGINE`` env var.
+
+    ``auto`` (the default) selects calamine when ``python-calamine`` is
+    installed, and ``default`` leaves the choice to pandas, which reads xlsx
+    files with openpyxl and xls files with xlrd.
+
+    Returns
+    -------
+    Optional[str]
+        The engine, or None for pandas' default.
+
+    Raises
+    ------
+    ValueError
+        If the env var is not ``auto``, ``default`` or one of ``ENGINES``.
+    """
+    engine = os.getenv("ECONUY_EXCEL_ENGINE", AUTO_ENGINE).lower()
+    if engine == AUTO_ENGINE:
+        return "calamine" if engine_available("calamine") else None
+    if engine == DEFAULT_ENGINE:
+        return None
+    if engine not in ENGINES:
+        options = (AUTO_ENGINE, DEFAULT_ENGINE) + ENGINES
+        raise ValueError(f"ECONUY_EXCEL_ENGINE must be one of {options}.")
+    return engine
+
+
+def read_excel(io, engine: Optional[str] = None, **kwargs) -> pd.DataFrame:
+    """
+    Read an Excel workbook with ``pd.read_excel`` using the selected engine.
+
+    If the engine cannot parse the workbook, it is read again with pandas'
+    default engine and a warning is issued. Other errors, such as missing
+    files or sheets, are raised.
+
+    Parameters
+    ----------
+    io : file-like, path or pd.ExcelFile
+        The workbook. ``pd.ExcelFile`` objects are read with the engine they
+        were opened with.
+    engine : Optional[str], optional
+        The engine. If None, ``get_excel_engine`` is used.
+    **kwargs
+        Passed to ``pd.read_excel``.
+
+    Returns
+    -------
+    pd.DataFrame or Dict[str, pd.DataFrame]
+        As returned by ``pd.read_excel``.
+    """
+    if isinstance(io, pd.ExcelFile):
+        return pd.read_excel(io, **kwargs)
+    engine = engine or get_excel_engine()
+    if engine is None:
+        return pd.read_excel(io, **kwargs)
+    try:
+        return pd.read_excel(io, engine=engine, **kwargs)
+    except _get_parse_errors(engine) as exc:
+        warnings.warn(
+            f"Could not parse the workbook with {engine} ({exc}). "
+            "Using pandas' default engine.",
+            stacklevel=2,
+        )
+        _rewind(io)
+        return pd.read_excel(io, **kwargs)
+
+
+def open_excel(io, engine: Optional[str] = None, **kwargs) -> pd.ExcelFile:
+    """
+    Open an Excel workbook with ``pd.ExcelFile`` using the selected engine,
+    falling back to pandas' default engine as in ``read_excel``.
+
+    Parameters
+    ----------
+    io : file-like or path
+        The workbook.
+    engine : Optional[str], optional
+        The engine. If None, ``get_excel_engine`` is used.
+    **kwargs
+        Passed to ``pd.ExcelFile``.
+
+    Returns
+    -------
+    pd.ExcelFile
+        The opened workbook.
+    """
+    engine = engine or get_excel_engine()
+    if engine is None:
+        return pd.ExcelFile(io, **kwargs)
+    try:
+        return pd.ExcelFile(io, engine=engine, **kwargs)
+    except _get_parse_errors(engine) as exc:
+        warnings.warn(
+            f"Could not parse the workbook with {engine} ({exc}). "
+            "Using pandas' default engine.",
+            stacklevel=2,
+        )
+        _rewind(io)
+        return pd.ExcelFile(io, **kwargs)
+
+
+def _get_parse_errors(engine: str) -> Tuple[Type[Exception], ...]:
+    """Get the exceptions an engine raises for workbooks it cannot parse."""
+    if not engine_available(engine):
+        return ()
+    if engine == "calamine":
+        from python_calamine import CalamineError
+
+        return (CalamineError,)
+    if engine == "openpyxl":
+        from openpyxl.utils.exceptions import InvalidFileException
+
+        return (zipfile.BadZipFile, InvalidFileException)
+    if engine == "xlrd":
+        from xlrd import XLRDError
+        from xlrd.compdoc import CompDocError
+
+        return (XLRDError, CompDocError)
+    return ()
+
+
+def read_excel_sheets(
+    io,
+    sheet_names: Optional[List[str]] = None,
+    engine: Optional[str] = None,
+    max_workers: Optional[int] = None,
+    **kwargs,
+) -> Dict[str, pd.DataFrame]:
+    """
+    Read several sheets of an Excel workbook in parallel.
+
+    With openpyxl, which parses xlsx sheets on demand and slowly, the sheets are
+    split between the processes of a pool, and each process opens the workbook
+    once and parses its share of the sheets. Other engines read the workbook
+    once in the current process: xlrd parses every sheet when it opens an xls
+    file, and calamine parses sheets faster than they can be sent between
+    processes. ``benchmark_sheets`` compares both modes.
+
+    The pool is shared by all calls, including those from retrievers running in
+    parallel threads, and is started with the forkserver or spawn method, since
+    forking a process with several threads can deadlock on locks held by other
+    threads. It has the number of workers of the first call that uses it.
+    Workbooks with a single sheet, and calls from daemonic processes, which
+    cannot start children, are read in the current process.
+
+    Workbooks given as paths are opened from disk by every process that reads
+    them, and never loaded whole into memory. Others are read into memory and,
+    for parallel reads, written to a temporary file.
+
+    Parameters
+    ----------
+    io : file-like, path or bytes
+        The workbook.
+    sheet_names : Optional[List[str]], optional
+        The sheets to read. If None, all sheets.
+    engine : Optional[str], optional
+        The engine. If None, ``get_excel_engine`` is used.
+    max_workers : Optional[int], optional
+        Maximum number of processes. If None, ``ECONUY_EXCEL_WORKERS`` or the
+        number of CPUs. Values below 2 read sequentially.
+    **kwargs
+        Passed to ``pd.read_excel`` for every sheet.
+
+    Returns
+    -------
+    Dict[str, pd.DataFrame]
+        The sheets keyed by name, in workbook order.
+    """
+    workbook = Path(io) if isinstance(io, (str, os.PathLike)) else _read_bytes(io)
+    engine = engine or get_excel_engine()
+    if max_workers is None:
+        max_workers = int(os.getenv("ECONUY_EXCEL_WORKERS", os.cpu_count() or 1))
+    if (
+        max_workers < 2
+        or multiprocessing.current_process().daemon
+        or not _parses_in_parallel(workbook, engine)
+    ):
+        return _read_sheets(workbook, sheet_names, engine, kwargs)
+    if sheet_names is None:
+        with open_excel(_as_io(workbook), engine=engine) as xls:
+            sheet_names = xls.sheet_names
+    workers = min(max_workers, len(sheet_names))
+    if workers < 2:
+        return _read_sheets(workbook, sheet_names, engine, kwargs)
+    # Workers open the workbook from a file instead of receiving it with the
+    # task, and each parses every ``workers``-th sheet
+    with (
+        contextlib.nullcontext(None)
+        if isinstance(workbook, Path)
+        else tempfile.TemporaryDirectory(prefix="econuy_")
+    ) as tmp_dir:
+        if tmp_dir is None:
+            path = workbook
+        else:
+            path = Path(tmp_dir) / "workbook"
+            path.write_bytes(workbook)
+        shares = [sheet_names[i::workers] for i in range(workers)]
+        frames = {}
+        for share in _get_pool(workers).map(
+            _read_file_sheets,
+            [path] * workers,
+            shares,
+            [engine] * workers,
+            [kwargs] * workers,
+        ):
+            frames.update(share)
+    return {sheet: frames[sheet] for sheet in sheet_names}
+
+
+def _parses_in_parallel(workbook: Union[bytes, Path], engine: Optional[str]) -> bool:
+    """Check whether a workbook's sheets are parsed in the process pool."""
+    if engine is None:
+        engine = "xlrd" if get_workbook_format(workbook) == "xls" else "openpyxl"
+    return engine in PARALLEL_ENGINES
+
+
+def _get_pool(workers: int) -> futures.ProcessPoolExecutor:
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            methods = multiprocessing.get_all_start_methods()
+            method = "forkserver" if "forkserver" in methods else "spawn"
+            _POOL = futures.ProcessPoolExecutor(
+                workers, mp_context=multiprocessing.get_context(method)
+            )
+            atexit.register(_POOL.shutdown)
+        return _POOL
+
+
+def _read_sheets(
+    workbook: Union[bytes, Path],
+    sheet_names: Optional[List[str]],
+    engine: Optional[str],
+    kwargs: Dict,
+) -> Dict[str, pd.DataFrame]:
+    # A list of sheets is read with a single open of the workbook
+    sheet_name = None if sheet_names is None else list(sheet_names)
+    return read_excel(_as_io(workbook), engine=engine, sheet_name=sheet_name, **kwargs)
+
+
+def _read_file_sheets(
+    path: Path, sheet_names: List[str], engine: Optional[str], kwargs: Dict
+) -> Dict[str, pd.DataFrame]:
+    return _read_sheets(path, sheet_names, engine, kwargs)
+
+
+def _read_bytes(io) -> bytes:
+    """Read an in-memory workbook, given as bytes or a file-like object."""
+    if isinstance(io, bytes):
+        return io
+    return io.read()
+
+
+def _as_io(workbook: Union[bytes, Path]) -> Union[BytesIO, Path]:
+    return BytesIO(workbook) if isinstance(workbook, bytes) else workbook
+
+
+def _rewind(io) -> None:
+    if hasattr(io, "seek"):
+        io.seek(0)
+    return
+
+
+def get_workbook_format(workbook: Union[bytes, Path]) -> Optional[str]:
+    """
+    Get whether a file is an ``xlsx`` or ``xls`` workbook from its contents,
+    given as bytes or a path. Files are not read whole.
+    """
+    if isinstance(workbook, bytes):
+        if workbook.startswith(XLS_SIGNATURE):
+            return "xls"
+        if workbook.startswith(b"PK") and b"xl/workbook" in workbook:
+            return "xlsx"
+        return None
+    with open(workbook, "rb") as f:
+        if f.read(len(XLS_SIGNATURE)) == XLS_SIGNATURE:
+            return "xls"
+    if zipfile.is_zipfile(workbook):
+        with zipfile.ZipFile(workbook) as archive:
+            if any(x.startswith("xl/workbook") for x in archive.namelist()):
+                return "xlsx"
+    return None
+
+
+def find_recorded_workbooks(
+    data_dir: Union[str, Path, None] = None,
+) -> Dict[str, bytes]:
+    """
+    Find the workbooks stored in the raw download cache.
+
+    Parameters
+    ----------
+    data_dir : Union[str, Path, None], optional
+        The cache directory. If None, the default data directory is used.
+
+    Returns
+    -------
+    Dict[str, bytes]
+        The workbooks' contents keyed by URL.
+    """
+    data_dir = Path(data_dir or get_data_dir())
+    workbooks = {}
+    for path in sorted((get_raw_dir(data_dir) / URLS_DIRNAME).glob("*.json")):
+        with open(path, "r") as f:
+            entry = json.load(f)
+        try:
+            body = read_body(entry, data_dir)
+        except FileNotFoundError:
+            continue
+        if get_workbook_format(body) is not None:
+            workbooks[entry["url"]] = body
+    return workbooks
+
+
+def benchmark_engines(
+    workbooks: Optional[Dict[str, bytes]] = None,
+    data_dir: Union[str, Path, None] = None,
+    engines: Optional[Sequence[str]] = None,
+    repeat: int = 3,
+) -> pd.DataFrame:
+    """
+    Time reading every sheet of recorded workbooks with each Excel engine.
+
+    Parameters
+    ----------
+    workbooks : Optional[Dict[str, bytes]], optional
+        The workbooks' contents keyed by name. If None, the workbooks stored in
+        the raw download cache of ``data_dir`` are used.
+    data_dir : Union[str, Path, None], optional
+        The cache directory. If None, the default data directory is used.
+    engines : Optional[Sequence[str]], optional
+        The engines to compare. If None, all installed engines.
+    repeat : int, optional
+        Number of reads per workbook and engine, of which the fastest is kept.
+        Default is 3.
+
+    Returns
+    -------
+    pd.DataFrame
+        Seconds per read, with one row per workbook and one column per engine.
+        Engines that cannot read a workbook's format, or fail to, are NaN.
+    """
+    if workbooks is None:
+        workbooks = find_recorded_workbooks(data_dir)
+    engines = [x for x in engines or ENGINES if engine_available(x)]
+    results = {}
+    for name, body in workbooks.items():
+        workbook_format = get_workbook_format(body)
+        results[name] = {
+            engine: _time_read(body, engine, repeat)
+            if engine in FORMAT_ENGINES.get(workbook_format, ENGINES)
+            else float("nan")
+            for engine in engines
+        }
+    return pd.DataFrame.from_dict(results, orient="index", columns=engines)
+
+
+def _time_read(body: bytes, engine: str, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        try:
+            pd.read_excel(BytesIO(body), sheet_name=None, header=None, engine=engine)
+        except Exception:
+            return float("nan")
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def benchmark_sheets(
+    workbooks: Optional[Dict[str, bytes]] = None,
+    data_dir: Union[str, Path, None] = None,
+    max_workers: Optional[int] = None,
+    repeat: int = 3,
+) -> pd.DataFrame:
+    """
+    Time ``read_excel_sheets`` on recorded workbooks, reading sequentially and
+    in the process pool.
+
+    Parameters
+    ----------
+    workbooks : Optional[Dict[str, bytes]], optional
+        The workbooks' contents keyed by name. If None, the workbooks stored in
+        the raw download cache of ``data_dir`` are used.
+    data_dir : Union[str, Path, None], optional
+        The cache directory. If None, the default data directory is used.
+    max_workers : Optional[int], optional
+        Processes of the parallel reads. If None, as in ``read_excel_sheets``.
+    repeat : int, optional
+        Number of reads per workbook and mode, of which the fastest is kept.
+        Default is 3.
+
+    Returns
+    -------
+    pd.DataFrame
+        Seconds per read, with one row per workbook, its number of sheets and
+        one column per mode.
+    """
+    if workbooks is None:
+        workbooks = find_recorded_workbooks(data_dir)
+    results = {}
+    for name, body in workbooks.items():
+        with open_excel(BytesIO(body)) as xls:
+            sheets = len(xls.sheet_names)
+        results[name] = {"sheets": sheets}
+        for mode, workers in [("sequential", 1), ("parallel", max_workers)]:
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                read_excel_sheets(body, max_workers=workers, header=None)
+                timings.append(time.perf_counter() - start)
+            results[name][mode] = min(timings)
+    return pd.DataFrame.from_dict(
+        results, orient="index", columns=["sheets", "sequential", "parallel"]
+    )
+
+
+def main(argv: Optional[Iterable[str]] = None) -> None:
+    """Print a comparison of Excel engines on the recorded workbooks."""
+    parser = argparse.ArgumentParser(
+        prog="econuy-excel-benchmark",
+        description="Compare Excel engines on the workbooks in the raw cache.",
+    )
+    parser.add_argument("--data-dir", help="The cache directory.")
+    parser.add_argument("--repeat", type=int, default=3, help="Reads per engine.")
+    parser.add_argument("--engines", nargs="*", help="Engines to compare.")
+    parser.add_argument(
+        "--sheets",
+        action="store_true",
+        help="Compare sequential and parallel reads of every sheet instead.",
+    )
+    args = parser.parse_args(argv)
+    if args.sheets:
+        results = benchmark_sheets(data_dir=args.data_dir, repeat=args.repeat)
+    else:
+        results = benchmark_engines(
+            data_dir=args.data_dir, engines=args.engines, repeat=args.repeat
+        )
+    if results.empty:
+        print("No recorded workbooks. Load datasets with the raw cache enabled.")
+        return
+    with pd.option_context("display.max_colwidth", 60, "display.width", 200):
+        print(results.round(3))
+        print("\nTotal seconds")
+        print(results.sum().round(3))
+    return
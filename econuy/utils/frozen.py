@@ -0,0 +1,141 @@
+import contextlib
+import functools
+import hashlib
+import re
+import shutil
+from contextvars import ContextVar
+from pathlib import Path
+from types import CodeType, FunctionType
+from typing import Any, Callable, Iterator, Optional, Set, Union
+
+import pandas as pd
+
+from econuy.utils.locking import atomic_path
+from econuy.utils.operations import get_download_sources, get_frozen_sources
+
+
+FROZEN_DIRNAME = "frozen"
+
+# Cache directory of the retrieval running in the current context, if any
+FROZEN_CACHE_DIR: ContextVar[Optional[Path]] = ContextVar(
+    "frozen_cache_dir", default=None
+)
+
+
+def get_frozen_dir(data_dir: Path) -> Path:
+    return Path(data_dir) / FROZEN_DIRNAME
+
+
+def get_frozen_path(name: str, key: str, digest: str, data_dir: Path) -> Path:
+    return get_frozen_dir(data_dir) / name / f"{key}.{digest[:16]}.pkl"
+
+
+def get_parser_digest(url: str, parse: Callable[[str], pd.DataFrame]) -> str:
+    """
+    Hash a frozen source's URL and the code of its parser, so that cached
+    frames are parsed again when either changes.
+
+    The parser's code includes the functions and values it closes over and the
+    code of nested functions, recursively.
+    """
+    payload = repr((url, _describe_code(parse, set())))
+    # Memory addresses in the repr of closed over objects change between runs
+    payload = re.sub(r" at 0x[0-9a-fA-F]+", "", payload)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _describe_code(obj: Any, seen: Set[int]) -> Any:
+    """Describe a function or code object by its code and closure, recursively."""
+    if isinstance(obj, (FunctionType, CodeType)):
+        # Recursive functions close over themselves
+        if id(obj) in seen:
+            return "<recursive>"
+        seen.add(id(obj))
+    if isinstance(obj, FunctionType):
+        closure = []
+        for cell in obj.__closure__ or ():
+            try:
+                closure.append(_describe_code(cell.cell_contents, seen))
+            except ValueError:
+                # Cells of variables not assigned yet are empty
+                closure.append("<empty>")
+        return (_describe_code(obj.__code__, seen), closure)
+    if isinstance(obj, functools.partial):
+        return (_describe_code(obj.func, seen), obj.args, obj.keywords)
+    if isinstance(obj, CodeType):
+        consts = [_describe_code(x, seen) for x in obj.co_consts]
+        return (obj.co_code, consts, obj.co_names)
+    return obj
+
+
+@contextlib.contextmanager
+def caching_frozen(data_dir: Path) -> Iterator[None]:
+    """Cache the frozen sources parsed in this context in ``data_dir``."""
+    token = FROZEN_CACHE_DIR.set(Path(data_dir))
+    try:
+        yield
+    finally:
+        FROZEN_CACHE_DIR.reset(token)
+
+
+def read_frozen_source(
+    name: str, key: str, parse: Callable[[str], pd.DataFrame]
+) -> pd.DataFrame:
+    """
+    Parse a download source, reusing its parsed frame if it is frozen.
+
+    Sources listed in the ``sources.frozen`` key of a dataset's registry entry,
+    such as workbooks with discontinued base years, never change. During a
+    retrieval their parsed frames are stored in ``data_dir/frozen`` the first
+    time and read back afterwards without downloading or parsing the source.
+    Other sources, and retrievers called outside ``load_dataset``, are parsed
+    every time.
+
+    Parameters
+    ----------
+    name : str
+        The name of the dataset.
+    key : str
+        The key of the source in the dataset's ``sources.downloads``.
+    parse : Callable[[str], pd.DataFrame]
+        Downloads and parses the source given its URL. The frame it returns is
+        cached, so processing that is cheap or depends on other sources should
+        be done on the result instead.
+
+    Returns
+    -------
+    pd.DataFrame
+        The parsed source.
+    """
+    url = get_download_sources(name)[key]
+    data_dir = FROZEN_CACHE_DIR.get()
+    if data_dir is None or key not in get_frozen_sources(name):
+        return parse(url)
+    path = get_frozen_path(name, key, get_parser_digest(url, parse), data_dir)
+    if path.exists():
+        return pd.read_pickle(path)
+    frame = parse(url)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    for previous in path.parent.glob(f"{key}.*.pkl"):
+        previous.unlink(missing_ok=True)
+    with atomic_path(path) as tmp_path:
+        frame.to_pickle(tmp_path)
+    return frame
+
+
+def clear_frozen(data_dir: Union[str, Path], name: Optional[str] = None) -> None:
+    """
+    Remove cached frozen sources, so they are downloaded and parsed again.
+
+    Parameters
+    ----------
+    data_dir : Union[str, Path]
+        The cache directory.
+    name : Optional[str], optional
+        The dataset whose sources are removed. If None, all datasets'.
+    """
+    path = get_frozen_dir(data_dir)
+    if name is not None:
+        path = path / name
+    shutil.rmtree(path, ignore_errors=True)
+    return
@@ -0,0 +1,204 @@
+import contextlib
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import Iterator, Optional, Union
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+
+LOCKS_DIRNAME = ".locks"
+POLL_INTERVAL = 0.05
+
+
+class FileLock:
+    """
+    Advisory lock on a file, shared across threads and processes.
+
+    Uses ``flock`` on POSIX and ``msvcrt.locking`` on Windows, where shared
+    locks are not available and are taken as exclusive locks instead. Each
+    acquisition opens its own file descriptor, so the lock also excludes other
+    threads of the same process. The lock is not reentrant.
+
+    Parameters
+    ----------
+    path : str or Path
+        The path of the lock file. It is created if it does not exist.
+    shared : bool, default False
+        If True, take a shared (read) lock instead of an exclusive one.
+    timeout : float, optional
+        Maximum number of seconds to wait for the lock. If None, wait
+        indefinitely.
+    """
+
+    def __init__(
+        self,
+        path: Union[str, Path],
+        shared: bool = False,
+        timeout: Optional[float] = None,
+    ) -> None:
+        self.path = Path(path)
+        self.shared = shared
+        self.timeout = timeout
+        self._fd = None
+
+    def acquire(self) -> None:
+        """
+        Acquire the lock, blocking until it is available.
+
+        Raises
+        ------
+        TimeoutError
+            If the lock could not be acquired within ``timeout`` seconds.
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        while True:
+            try:
+                self._lock(fd, blocking=deadline is None)
+                break
+            except OSError:
+                if deadline is not None and time.monotonic() < deadline:
+                    time.sleep(POLL_INTERVAL)
+                    continue
+                os.close(fd)
+                if deadline is not None:
+                    raise TimeoutError(f"Could not acquire lock on {self.path}.")
+                raise
+        self._fd = fd
+        return
+
+    def release(self) -> None:
+        """Release the lock."""
+        if self._fd is None:
+            return
+        try:
+            if os.name == "nt":
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+        return
+
+    def _lock(self, fd: int, blocking: bool) -> None:
+        if os.name == "nt":
+            # LK_LOCK only retries for 10 seconds, so always poll instead
+            while True:
+                try:
+                    os.lseek(fd, 0, os.SEEK_SET)
+                    msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+                    return
+                except OSError:
+                    if not blocking:
+                        raise
+                    time.sleep(POLL_INTERVAL)
+        operation = fcntl.LOCK_SH if self.shared else fcntl.LOCK_EX
+        if not blocking:
+            operation |= fcntl.LOCK_NB
+        fcntl.flock(fd, operation)
+        return
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+    def __repr__(self) -> str:
+        return f"FileLock(path={self.path}, shared={self.shared})"
+
+
+def get_lock_path(name: str, data_dir: Union[str, Path], kind: str = "data") -> Path:
+    return Path(data_dir) / LOCKS_DIRNAME / f"{name}.{kind}.lock"
+
+
+def dataset_lock(
+    name: str,
+    data_dir: Union[str, Path],
+    shared: bool = False,
+    timeout: Optional[float] = None,
+) -> FileLock:
+    """
+    Get the lock guarding a dataset's cached files.
+
+    Writers take it exclusively while replacing the data and metadata files so
+    readers, which take it shared, always see a consistent pair.
+
+    Parameters
+    ----------
+    name : str
+        The name of the dataset.
+    data_dir : str or Path
+        The cache directory.
+    shared : bool, default False
+        If True, take a shared (read) lock.
+    timeout : float, optional
+        Maximum number of seconds to wait for the lock.
+
+    Returns
+    -------
+    FileLock
+        The lock, to be used as a context manager.
+    """
+    return FileLock(get_lock_path(name, data_dir, "data"), shared, timeout)
+
+
+def fetch_lock(
+    name: str, data_dir: Union[str, Path], timeout: Optional[float] = None
+) -> FileLock:
+    """
+    Get the lock that allows a single in-flight retrieval of a dataset per cache
+    directory.
+
+    Parameters
+    ----------
+    name : str
+        The name of the dataset.
+    data_dir : str or Path
+        The cache directory.
+    timeout : float, optional
+        Maximum number of seconds to wait for the lock.
+
+    Returns
+    -------
+    FileLock
+        The lock, to be used as a context manager.
+    """
+    return FileLock(get_lock_path(name, data_dir, "fetch"), timeout=timeout)
+
+
+@contextlib.contextmanager
+def atomic_path(path: Union[str, Path]) -> Iterator[Path]:
+    """
+    Yield a temporary path next to ``path`` and move it into place on success.
+
+    The final rename is atomic, so readers see either the previous or the new
+    file but never a partially written one. Processes that memory-mapped the
+    previous file keep reading it unchanged.
+
+    Parameters
+    ----------
+    path : str or Path
+        The destination path.
+
+    Yields
+    ------
+    Path
+        The temporary path to write to.
+    """
+    path = Path(path)
+    tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
@@ -1,13 +1,32 @@
+import ast
+import functools
 import inspect
 import json
 import os
+import warnings
+from contextvars import ContextVar
+from datetime import datetime
 from pathlib import Path
-from typing import Optional, Dict, List, Tuple
+from typing import Optional, Dict, Iterable, List, Tuple
 
-import pandas as pd
+import httpx
 
 from econuy.utils import get_project_root
 from econuy.base import Dataset, DatasetMetadata
+from econuy.transform.convert import CONVERTER_DATASETS
+from econuy.utils.cache import (
+    MEMORY_CACHE,
+    get_memory_cache_key,
+    get_cache_format,
+    get_data_path,
+    get_metadata_path,
+    get_segment_paths,
+    find_data_path,
+    read_cached_data,
+    write_cached_data,
+    remove_segments,
+)
+from econuy.utils.locking import dataset_lock
 
 
 class DatasetRegistry:
@@ -150,8 +169,116 @@ class DatasetRegistry:
         """
         return list(self.get_by_area(area, keep_disabled, keep_auxiliary).keys())
 
+    def get_dependencies(self, name: str) -> List[str]:
+        """
+        Get the datasets a dataset's retriever loads through ``load_dataset``.
+
+        Dependencies are read from the entry's ``dependencies`` key if declared,
+        or otherwise discovered from the retriever's source code.
+
+        Parameters
+        ----------
+        name : str
+            The name of the dataset.
+
+        Returns
+        -------
+        List[str]
+            The names of the datasets it depends on.
+        """
+        entry = self.registry[name]
+        if "dependencies" in entry:
+            return list(entry["dependencies"])
+        return discover_dependencies(entry["function"], self.registry)
+
 
 REGISTRY = DatasetRegistry()
+# Source responses downloaded ahead of time, keyed by URL
+PREFETCHED_SOURCES: ContextVar[Optional[Dict[str, httpx.Response]]] = ContextVar(
+    "prefetched_sources", default=None
+)
+
+
+def discover_dependencies(function_string: str, names: Iterable[str]) -> List[str]:
+    """
+    Find the datasets a retriever loads by parsing its source code.
+
+    A retriever depends on every registry name passed as a string literal to
+    ``load_dataset``, and on registry names listed in the function when
+    ``load_dataset`` is called with a variable, and on the datasets loaded by
+    the flavors passed to ``Dataset.convert``. Functions of the same module
+    called by the retriever are inspected as well.
+
+    Parameters
+    ----------
+    function_string : str
+        The retriever in ``module.function`` form, as in the registry.
+    names : Iterable[str]
+        The available dataset names.
+
+    Returns
+    -------
+    List[str]
+        The names of the datasets it depends on, in order of appearance.
+    """
+    module, function = function_string.split(".")
+    functions = _parse_retrieval_module(module)
+    names = set(names)
+
+    dependencies = []
+    visited = set()
+    pending = [function]
+    while pending:
+        current = pending.pop(0)
+        if current in visited or current not in functions:
+            continue
+        visited.add(current)
+        literals = [
+            node.value
+            for node in ast.walk(functions[current])
+            if isinstance(node, ast.Constant) and node.value in names
+        ]
+        for node in ast.walk(functions[current]):
+            if not isinstance(node, ast.Call):
+                continue
+            if isinstance(node.func, ast.Attribute) and node.func.attr == "convert":
+                flavors = node.args[:1] + [
+                    x.value for x in node.keywords if x.arg == "flavor"
+                ]
+                found = [
+                    CONVERTER_DATASETS[x.value]
+                    for x in flavors
+                    if isinstance(x, ast.Constant) and x.value in CONVERTER_DATASETS
+                ]
+                dependencies.extend(
+                    x
+                    for x in found
+                    if x in names and x != function and x not in dependencies
+                )
+                continue
+            if not isinstance(node.func, ast.Name):
+                continue
+            if node.func.id != "load_dataset":
+                pending.append(node.func.id)
+            elif node.args and isinstance(node.args[0], ast.Constant):
+                found = [node.args[0].value]
+            else:
+                found = literals
+            if node.func.id == "load_dataset":
+                dependencies.extend(x for x in found if x not in dependencies)
+    return dependencies
+
+
+@functools.lru_cache(maxsize=None)
+def _parse_retrieval_module(module: str) -> Dict[str, ast.FunctionDef]:
+    path = get_project_root() / "retrieval" / f"{module}.py"
+    with open(path, "r", encoding="utf-8") as f:
+        source = f.read()
+    with warnings.catch_warnings():
+        # Some retrievers have regex patterns with invalid escape sequences
+        warnings.simplefilter("ignore")
+        tree = ast.parse(source)
+    return {node.name: node for node in tree.body if isinstance(node, ast.FunctionDef)}
 
 
 def get_name_from_function() -> str:
@@ -162,6 +289,70 @@ def get_download_sources(name: str) -> Dict:
     return REGISTRY[name]["sources"]["downloads"]
 
 
+def get_frozen_sources(name: str) -> List[str]:
+    """Get the download sources of a dataset that are declared as never changing."""
+    return REGISTRY[name]["sources"].get("frozen", [])
+
+
+def get_prefetchable_sources(function_string: str) -> List[str]:
+    """
+    Find the download sources a retriever only fetches with ``download``.
+
+    These sources can be downloaded ahead of time and served to the retriever
+    from ``PREFETCHED_SOURCES``. A retriever that uses its sources in any other
+    way (e.g. formatting URLs or with Selenium) has none.
+
+    Parameters
+    ----------
+    function_string : str
+        The retriever in ``module.function`` form, as in the registry.
+
+    Returns
+    -------
+    List[str]
+        The keys of the sources in the entry's ``downloads``.
+    """
+    module, function = function_string.split(".")
+    node = _parse_retrieval_module(module).get(function)
+    if node is None:
+        return []
+    parents = {
+        child: parent
+        for parent in ast.walk(node)
+        for child in ast.iter_child_nodes(parent)
+    }
+    keys = []
+    for child in ast.walk(node):
+        if not isinstance(child, ast.Name) or child.id != "sources":
+            continue
+        parent = parents.get(child)
+        if isinstance(parent, ast.Assign):
+            continue
+        if not (
+            isinstance(parent, ast.Subscript) and isinstance(parent.slice, ast.Constant)
+        ):
+            return []
+        call = parents.get(parent)
+        if not (
+            isinstance(call, ast.Call)
+            and call.args
+            and call.args[0] is parent
+            and isinstance(call.func, ast.Name)
+            and call.func.id == "download"
+        ):
+            return []
+        if parent.slice.value not in keys:
+            keys.append(parent.slice.value)
+    return keys
+
+
+def get_refresh_policy(name: str) -> Dict:
+    try:
+        return REGISTRY[name].get("refresh", {})
+    except KeyError:
+        return {}
+
+
 def get_base_metadata(name: str) -> Dict:
     return REGISTRY[name]["base_metadata"]
 
@@ -182,13 +373,109 @@ def get_data_dir() -> Path:
     return data_dir
 
 
-def read_dataset(name: str, data_dir: Path) -> Optional[Dataset]:  # noqa: F821
-    dataset_path = (data_dir / name).with_suffix(".csv")
-    metadata_path = (data_dir / f"{name}_metadata").with_suffix(".json")
-    if not dataset_path.exists() or not metadata_path.exists():
+def read_created_at(
+    name: str, data_dir: Path, cache_format: Optional[str] = None
+) -> Optional[datetime]:
+    """
+    Get the creation time of a cached dataset without reading its data.
+
+    Parameters
+    ----------
+    name : str
+        The name of the dataset.
+    data_dir : Path
+        The cache directory.
+    cache_format : str, optional
+        The preferred cache format.
+
+    Returns
+    -------
+    Optional[datetime]
+        The time at which the cached dataset was created, or None if the dataset
+        is not in the cache.
+    """
+    cache_format = get_cache_format(data_dir, cache_format)
+    metadata_path = get_metadata_path(name, data_dir)
+    if (
+        not metadata_path.exists()
+        or find_data_path(name, data_dir, cache_format) is None
+    ):
+        return None
+    with open(metadata_path, "r") as f:
+        created_at = json.load(f)["created_at"]
+    return datetime.fromisoformat(created_at)
+
+
+def read_checked_at(name: str, data_dir: Path) -> Optional[datetime]:
+    """
+    Get the last time a cached dataset's sources were checked.
+
+    Refreshes that find the same data keep the dataset's creation time and
+    record the check instead.
+
+    Parameters
+    ----------
+    name : str
+        The name of the dataset.
+    data_dir : Path
+        The cache directory.
+
+    Returns
+    -------
+    Optional[datetime]
+        The time of the last check, its creation time if it was not checked
+        since, or None if the dataset is not in the cache.
+    """
+    try:
+        with open(get_metadata_path(name, data_dir), "r") as f:
+            metadata = json.load(f)
+    except FileNotFoundError:
+        return None
+    return datetime.fromisoformat(metadata.get("checked_at") or metadata["created_at"])
+
+
+def read_dataset(
+    name: str,
+    data_dir: Path,
+    cache_format: Optional[str] = None,
+    memory_map: bool = False,
+    use_memory_cache: bool = True,
+) -> Optional[Dataset]:  # noqa: F821
+    cache_format = get_cache_format(data_dir, cache_format)
+    metadata_path = get_metadata_path(name, data_dir)
+    found = find_data_path(name, data_dir, cache_format)
+    if found is None or not metadata_path.exists():
         return None
 
-    dataset = pd.read_csv(dataset_path, index_col=0, parse_dates=True)
-    metadata = DatasetMetadata.from_json(metadata_path)
-    dataset = Dataset(name, dataset, metadata)
+    dataset_path, file_format = found
+    if file_format != cache_format:
+        # Migrate caches written in a different format (e.g. legacy CSV files)
+        with dataset_lock(name, data_dir):
+            if dataset_path.exists():
+                data = read_cached_data(name, data_dir, file_format)
+                remove_segments(name, data_dir)
+                write_cached_data(data, name, data_dir, cache_format)
+                dataset_path.unlink()
+        dataset_path = get_data_path(name, data_dir, cache_format)
+
+    # Writers replace the data and metadata files under an exclusive lock
+    with dataset_lock(name, data_dir, shared=True):
+        # Memory-mapped reads are already cheap and should not be copied
+        use_memory_cache = use_memory_cache and not memory_map
+        if use_memory_cache:
+            key = get_memory_cache_key(name, data_dir)
+            signature = MEMORY_CACHE.file_signature(
+                dataset_path,
+                metadata_path,
+                *get_segment_paths(name, data_dir, cache_format),
+            )
+            dataset = MEMORY_CACHE.get(key, signature)
+            if dataset is not None:
+                return dataset
+
+        data = read_cached_data(name, data_dir, cache_format, memory_map=memory_map)
+        metadata = DatasetMetadata.from_json(metadata_path)
+    dataset = Dataset(name, data, metadata)
+    if use_memory_cache:
+        MEMORY_CACHE.put(key, signature, dataset)
     return dataset
@@ -0,0 +1,523 @@
+import collections
+import contextlib
+import datetime as dt
+import hashlib
+import json
+import os
+import shutil
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Callable, Dict, Iterator, Optional, Set, Union
+
+import httpx
+
+from econuy.utils.locking import FileLock, atomic_path
+
+
+RAW_DIRNAME = "raw"
+URLS_DIRNAME = "urls"
+OBJECTS_DIRNAME = "objects"
+DATASETS_DIRNAME = "datasets"
+DEFAULT_RAW_CACHE_BYTES = 2 * 1024**3
+
+# Cache directory of the retrieval running in the current context, if any
+RAW_CACHE_DIR: ContextVar[Optional[Path]] = ContextVar("raw_cache_dir", default=None)
+# Whether downloads are replayed from the raw cache, overriding ECONUY_OFFLINE
+OFFLINE: ContextVar[Optional[bool]] = ContextVar("offline", default=None)
+# Validators of the sources downloaded by the current retrieval, keyed by URL
+_DOWNLOADED: ContextVar[Optional[Dict[str, Optional[Dict[str, str]]]]] = ContextVar(
+    "downloaded", default=None
+)
+
+
+def get_raw_dir(data_dir: Path) -> Path:
+    return Path(data_dir) / RAW_DIRNAME
+
+
+def get_url_key(url: str) -> str:
+    return hashlib.sha256(url.encode()).hexdigest()
+
+
+def get_request_url(url: str, params: Union[str, Dict[str, str], None] = None) -> str:
+    """
+    Get the URL a request is sent to, including its query parameters, which
+    identifies its stored downloads.
+    """
+    if not params:
+        return url
+    return str(httpx.URL(url, params=params))
+
+
+def get_entry_path(url: str, data_dir: Path) -> Path:
+    return get_raw_dir(data_dir) / URLS_DIRNAME / f"{get_url_key(url)}.json"
+
+
+def get_object_path(digest: str, data_dir: Path) -> Path:
+    return get_raw_dir(data_dir) / OBJECTS_DIRNAME / digest[:2] / digest
+
+
+def get_validators_path(name: str, data_dir: Path) -> Path:
+    return get_raw_dir(data_dir) / DATASETS_DIRNAME / f"{name}.json"
+
+
+def _get_raw_lock(data_dir: Path) -> FileLock:
+    return FileLock(get_raw_dir(data_dir) / ".lock")
+
+
+def raw_cache_enabled() -> bool:
+    """
+    Check whether raw downloads are cached, using the ``ECONUY_RAW_CACHE`` env var.
+    Caching is enabled by default.
+    """
+    return os.getenv("ECONUY_RAW_CACHE", "1").lower() not in ("0", "false", "no", "")
+
+
+def get_raw_cache_max_bytes() -> int:
+    """
+    Get the maximum total size of stored bodies, from the
+    ``ECONUY_RAW_CACHE_BYTES`` env var or 2 GiB.
+    """
+    return int(os.getenv("ECONUY_RAW_CACHE_BYTES", DEFAULT_RAW_CACHE_BYTES))
+
+
+def offline_enabled() -> bool:
+    """
+    Check whether downloads are replayed from the raw cache instead of the
+    network, set with ``load_dataset(offline=...)`` or the ``ECONUY_OFFLINE``
+    env var.
+    """
+    offline = OFFLINE.get()
+    if offline is not None:
+        return offline
+    return os.getenv("ECONUY_OFFLINE", "0").lower() not in ("0", "false", "no", "")
+
+
+@contextlib.contextmanager
+def offline_mode(offline: Optional[bool]) -> Iterator[None]:
+    """Set whether downloads in this context are replayed, if ``offline`` is not None."""
+    if offline is None:
+        yield
+        return
+    token = OFFLINE.set(offline)
+    try:
+        yield
+    finally:
+        OFFLINE.reset(token)
+
+
+def get_response_validators(response: httpx.Response) -> Optional[Dict[str, str]]:
+    """
+    Get the validators a response can be revalidated with.
+
+    Parameters
+    ----------
+    response : httpx.Response
+        The response.
+
+    Returns
+    -------
+    Optional[Dict[str, str]]
+        The ``etag`` and ``last_modified`` headers that are present, or None if
+        the response has neither.
+    """
+    validators = {
+        key: response.headers[header]
+        for key, header in (("etag", "ETag"), ("last_modified", "Last-Modified"))
+        if header in response.headers
+    }
+    return validators or None
+
+
+def get_conditional_headers(validators: Optional[Dict[str, str]]) -> Dict[str, str]:
+    """Get the headers of a conditional request from a response's validators."""
+    if not validators:
+        return {}
+    headers = {}
+    if "etag" in validators:
+        headers["If-None-Match"] = validators["etag"]
+    if "last_modified" in validators:
+        headers["If-Modified-Since"] = validators["last_modified"]
+    return headers
+
+
+def read_entry(url: str, data_dir: Path) -> Optional[Dict]:
+    """
+    Read the entry of the latest stored download of a URL.
+
+    Parameters
+    ----------
+    url : str
+        The URL.
+    data_dir : Path
+        The cache directory.
+
+    Returns
+    -------
+    Optional[Dict]
+        The entry, with the ``digest`` of the body, its ``validators`` and
+        ``content_type``, and when it was ``fetched_at``. None if the URL's
+        body is not stored.
+    """
+    path = get_entry_path(url, data_dir)
+    if not path.exists():
+        return None
+    with open(path, "r") as f:
+        entry = json.load(f)
+    if not get_object_path(entry["digest"], data_dir).exists():
+        return None
+    return entry
+
+
+def read_body(entry: Dict, data_dir: Path) -> bytes:
+    """Read a stored download's body."""
+    return get_object_path(entry["digest"], data_dir).read_bytes()
+
+
+def write_entry(
+    url: str,
+    body: bytes,
+    data_dir: Path,
+    validators: Optional[Dict[str, str]] = None,
+    content_type: Optional[str] = None,
+) -> Dict:
+    """
+    Store a downloaded body as the latest download of a URL.
+
+    Bodies are stored once per content hash, so a URL that is downloaded again
+    without changes, or several URLs serving the same file, share a body. Only
+    the latest download of each URL is kept: the body it replaces is removed
+    unless another URL still serves it. If the stored bodies exceed
+    ``get_raw_cache_max_bytes``, the least recently downloaded URLs are removed.
+
+    Parameters
+    ----------
+    url : str
+        The URL.
+    body : bytes
+        The response body.
+    data_dir : Path
+        The cache directory.
+    validators : Optional[Dict[str, str]]
+        The response's validators, from ``get_response_validators``.
+    content_type : Optional[str]
+        The response's ``Content-Type`` header.
+
+    Returns
+    -------
+    Dict
+        The new entry.
+    """
+    digest = hashlib.sha256(body).hexdigest()
+    # The body and the entry that references it are written under the same
+    # lock as prune_raw_cache, which would otherwise remove the body in between
+    with _get_raw_lock(data_dir):
+        object_path = get_object_path(digest, data_dir)
+        if not object_path.exists():
+            object_path.parent.mkdir(parents=True, exist_ok=True)
+            with atomic_path(object_path) as tmp_path:
+                tmp_path.write_bytes(body)
+        return _write_entry_file(url, digest, data_dir, validators, content_type)
+
+
+def write_file_entry(
+    url: str,
+    path: Path,
+    digest: str,
+    data_dir: Path,
+    validators: Optional[Dict[str, str]] = None,
+    content_type: Optional[str] = None,
+) -> Dict:
+    """
+    Store a body downloaded to a file as the latest download of a URL, without
+    reading it into memory.
+
+    Parameters
+    ----------
+    url : str
+        The URL.
+    path : Path
+        The file with the response body.
+    digest : str
+        The SHA-256 hex digest of the file.
+    data_dir : Path
+        The cache directory.
+    validators : Optional[Dict[str, str]]
+        The response's validators, from ``get_response_validators``.
+    content_type : Optional[str]
+        The response's ``Content-Type`` header.
+
+    Returns
+    -------
+    Dict
+        The new entry.
+    """
+    with _get_raw_lock(data_dir):
+        object_path = get_object_path(digest, data_dir)
+        if not object_path.exists():
+            object_path.parent.mkdir(parents=True, exist_ok=True)
+            with atomic_path(object_path) as tmp_path:
+                shutil.copyfile(path, tmp_path)
+        return _write_entry_file(url, digest, data_dir, validators, content_type)
+
+
+def _write_entry_file(
+    url: str,
+    digest: str,
+    data_dir: Path,
+    validators: Optional[Dict[str, str]],
+    content_type: Optional[str],
+) -> Dict:
+    entry = {
+        "url": url,
+        "digest": digest,
+        "validators": validators,
+        "content_type": content_type,
+        "fetched_at": dt.datetime.now().isoformat(),
+    }
+    # Called with the raw cache lock held
+    path = get_entry_path(url, data_dir)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    previous = _read_entry_file(path)
+    with atomic_path(path) as tmp_path:
+        with open(tmp_path, "w") as f:
+            json.dump(entry, f, indent=4)
+    if previous is not None and previous["digest"] != digest:
+        if previous["digest"] not in _get_referenced_digests(data_dir):
+            get_object_path(previous["digest"], data_dir).unlink(missing_ok=True)
+    _evict_entries(data_dir, get_raw_cache_max_bytes(), keep=url)
+    return entry
+
+
+def _evict_entries(data_dir: Path, max_bytes: int, keep: Optional[str] = None) -> int:
+    """Remove the least recently downloaded URLs until the bodies fit in ``max_bytes``."""
+    # Called with the raw cache lock held
+    entries = []
+    for path in (get_raw_dir(data_dir) / URLS_DIRNAME).glob("*.json"):
+        entry = _read_entry_file(path)
+        if entry is not None and entry["url"] != keep:
+            entries.append((entry["fetched_at"], path, entry["digest"]))
+    references = collections.Counter(digest for _, _, digest in entries)
+    if keep is not None:
+        keep_entry = _read_entry_file(get_entry_path(keep, data_dir))
+        if keep_entry is not None:
+            references[keep_entry["digest"]] += 1
+    sizes = {}
+    for digest in references:
+        try:
+            sizes[digest] = get_object_path(digest, data_dir).stat().st_size
+        except FileNotFoundError:
+            sizes[digest] = 0
+    total = sum(sizes.values())
+    freed = 0
+    for _, path, digest in sorted(entries):
+        if total <= max_bytes:
+            break
+        path.unlink(missing_ok=True)
+        references[digest] -= 1
+        if references[digest] == 0:
+            get_object_path(digest, data_dir).unlink(missing_ok=True)
+            total -= sizes[digest]
+            freed += sizes[digest]
+    return freed
+
+
+def _read_entry_file(path: Path) -> Optional[Dict]:
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _get_referenced_digests(data_dir: Path) -> Set[str]:
+    digests = set()
+    for path in (get_raw_dir(data_dir) / URLS_DIRNAME).glob("*.json"):
+        entry = _read_entry_file(path)
+        if entry is not None:
+            digests.add(entry["digest"])
+    return digests
+
+
+def prune_raw_cache(data_dir: Path, max_bytes: Optional[int] = None) -> int:
+    """
+    Remove stored bodies that are not the latest download of any URL, such as
+    those left by earlier versions of econuy, which kept every body.
+
+    Parameters
+    ----------
+    data_dir : Path
+        The cache directory.
+    max_bytes : int, optional
+        If given, the least recently downloaded URLs are also removed until the
+        stored bodies take at most this many bytes.
+
+    Returns
+    -------
+    int
+        The number of bytes freed.
+    """
+    freed = 0
+    with _get_raw_lock(data_dir):
+        referenced = _get_referenced_digests(data_dir)
+        for path in (get_raw_dir(data_dir) / OBJECTS_DIRNAME).glob("*/*"):
+            # Temporary files of bodies being written start with a dot
+            if path.name.startswith(".") or path.name in referenced:
+                continue
+            if path.is_file():
+                freed += path.stat().st_size
+                path.unlink(missing_ok=True)
+        if max_bytes is not None:
+            freed += _evict_entries(data_dir, max_bytes)
+    return freed
+
+
+def fetch(
+    url: str,
+    data_dir: Path,
+    send: Callable[[Dict[str, str]], httpx.Response],
+) -> httpx.Response:
+    """
+    Download a URL through the raw cache.
+
+    Successful responses are stored. If the URL was downloaded before with
+    validators, the request is sent with ``If-None-Match`` and
+    ``If-Modified-Since``, and a 304 response is replaced by the stored body.
+    In offline mode the stored body is returned without sending a request.
+
+    Parameters
+    ----------
+    url : str
+        The URL.
+    data_dir : Path
+        The cache directory.
+    send : Callable[[Dict[str, str]], httpx.Response]
+        Sends the request with the given extra headers.
+
+    Returns
+    -------
+    httpx.Response
+        The response.
+
+    Raises
+    ------
+    FileNotFoundError
+        If in offline mode and the URL has not been downloaded before.
+    """
+    entry = read_entry(url, data_dir)
+    if offline_enabled():
+        if entry is None:
+            raise FileNotFoundError(f"No stored download of {url} to replay offline.")
+        response = _replay(entry, data_dir, httpx.Request("GET", url))
+    else:
+        validators = entry["validators"] if entry is not None else None
+        response = send(get_conditional_headers(validators))
+        if response.status_code == httpx.codes.NOT_MODIFIED and entry is not None:
+            response = _replay(entry, data_dir, response.request)
+        elif response.is_success:
+            entry = write_entry(
+                url,
+                response.content,
+                data_dir,
+                get_response_validators(response),
+                response.headers.get("Content-Type"),
+            )
+        else:
+            return response
+
+    record_download(url, entry["validators"])
+    return response
+
+
+def record_download(url: str, validators: Optional[Dict[str, str]]) -> None:
+    """Record a download made by the current retrieval, if it is being recorded."""
+    downloaded = _DOWNLOADED.get()
+    if downloaded is not None:
+        downloaded[url] = validators
+    return
+
+
+def _replay(entry: Dict, data_dir: Path, request: httpx.Request) -> httpx.Response:
+    headers = {"Content-Type": entry["content_type"]} if entry["content_type"] else {}
+    return httpx.Response(
+        200, content=read_body(entry, data_dir), headers=headers, request=request
+    )
+
+
+@contextlib.contextmanager
+def recording_downloads(
+    data_dir: Path,
+) -> Iterator[Dict[str, Optional[Dict[str, str]]]]:
+    """
+    Store the downloads made in this context and record their validators.
+
+    Parameters
+    ----------
+    data_dir : Path
+        The cache directory.
+
+    Yields
+    ------
+    Dict[str, Optional[Dict[str, str]]]
+        Filled with the validators of each downloaded URL, or None for URLs
+        whose responses had none.
+    """
+    downloaded = {}
+    dir_token = RAW_CACHE_DIR.set(Path(data_dir))
+    downloaded_token = _DOWNLOADED.set(downloaded)
+    try:
+        yield downloaded
+    finally:
+        _DOWNLOADED.reset(downloaded_token)
+        RAW_CACHE_DIR.reset(dir_token)
+
+
+def read_source_validators(
+    name: str, data_dir: Path
+) -> Optional[Dict[str, Dict[str, str]]]:
+    """
+    Read the validators of the sources a cached dataset was parsed from.
+
+    Parameters
+    ----------
+    name : str
+        The name of the dataset.
+    data_dir : Path
+        The cache directory.
+
+    Returns
+    -------
+    Optional[Dict[str, Dict[str, str]]]
+        The validators keyed by URL, or None if they were not recorded.
+    """
+    path = get_validators_path(name, data_dir)
+    if not path.exists():
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def save_source_validators(
+    name: str, data_dir: Path, validators: Optional[Dict[str, Dict[str, str]]]
+) -> None:
+    """
+    Record the validators of the sources a dataset was parsed from.
+
+    Parameters
+    ----------
+    name : str
+        The name of the dataset.
+    data_dir : Path
+        The cache directory.
+    validators : Optional[Dict[str, Dict[str, str]]]
+        The validators keyed by URL. If None, previously recorded validators
+        are removed, so the dataset is not reused without running its retriever.
+    """
+    path = get_validators_path(name, data_dir)
+    if validators is None:
+        path.unlink(missing_ok=True)
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with atomic_path(path) as tmp_path:
+        with open(tmp_path, "w") as f:
+            json.dump(validators, f, indent=4)
+    return
@@ -1,22 +1,626 @@
+import contextlib
+import functools
+import hashlib
+import importlib.util
+import os
 import ssl
+import threading
+import warnings
+from collections import OrderedDict
+from contextvars import ContextVar
 from io import BytesIO
-from typing import Literal
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    Literal,
+    Optional,
+    Tuple,
+    Union,
+)
 from pathlib import Path
+from urllib.parse import urlparse
 
+import certifi
 import httpx
+import pandas as pd
 
-from econuy.utils.operations import get_project_root
+from econuy.utils.excel import open_excel
+from econuy.utils.locking import atomic_path
+from econuy.utils.operations import get_project_root, PREFETCHED_SOURCES
+from econuy.utils.raw_cache import (
+    RAW_CACHE_DIR,
+    fetch,
+    get_conditional_headers,
+    get_object_path,
+    get_request_url,
+    get_response_validators,
+    offline_enabled,
+    read_entry,
+    record_download,
+    write_entry,
+    write_file_entry,
+)
+from econuy.utils.throttling import send_with_retries
+
+
+PROVIDERS = ("bcu", "ine", "inac", "bcra")
+DEFAULT_PROVIDER = "default"
+ALL_PROVIDERS = "all"
+CHUNK_SIZE = 1024 * 1024
+DEFAULT_WORKBOOK_CACHE_BYTES = 128 * 1024**2
+PROVIDER_HOSTS = {
+    "bcu.gub.uy": "bcu",
+    "ine.gub.uy": "ine",
+    "inac.uy": "inac",
+    "bcra.gob.ar": "bcra",
+    "bcra.gov.ar": "bcra",
+}
+CLIENT_CONFIG = {
+    "timeout": httpx.Timeout(60.0, connect=10.0),
+    "limits": httpx.Limits(max_connections=20, max_keepalive_connections=10),
+    "follow_redirects": True,
+}
+
+_CLIENTS: Dict[str, httpx.Client] = {}
+_CLIENTS_LOCK = threading.Lock()
 
 
 def get_certs_path(source: Literal["bcu", "ine", "inac", "bcra"]) -> Path:
     return Path(get_project_root(), "utils", "files", f"{source}_certs.pem")
 
 
+def get_provider(url: str) -> str:
+    """
+    Get the provider whose client should be used for a URL.
+
+    Parameters
+    ----------
+    url : str
+        The URL to download.
+
+    Returns
+    -------
+    str
+        One of ``PROVIDERS``, or ``DEFAULT_PROVIDER`` for other hosts.
+    """
+    host = urlparse(url).hostname or ""
+    for suffix, provider in PROVIDER_HOSTS.items():
+        if host == suffix or host.endswith(f".{suffix}"):
+            return provider
+    return DEFAULT_PROVIDER
+
+
+@functools.lru_cache(maxsize=None)
+def get_ssl_context(provider: str = DEFAULT_PROVIDER) -> ssl.SSLContext:
+    """
+    Get the SSL context for a provider, built once per process.
+
+    Provider contexts trust the provider's bundled certificates in addition to
+    the usual certificate authorities, since some of their servers do not send
+    complete certificate chains.
+
+    Parameters
+    ----------
+    provider : str, default "default"
+        The provider. ``ALL_PROVIDERS`` trusts the certificates of every
+        provider, for clients shared between them.
+
+    Returns
+    -------
+    ssl.SSLContext
+        The SSL context.
+    """
+    context = ssl.create_default_context(cafile=certifi.where())
+    providers = PROVIDERS if provider == ALL_PROVIDERS else (provider,)
+    for name in providers:
+        if name in PROVIDERS:
+            context.load_verify_locations(cafile=str(get_certs_path(name)))
+    return context
+
+
+def http2_enabled() -> bool:
+    """
+    Check whether clients should use HTTP/2, set with the ``ECONUY_HTTP2`` env var.
+
+    HTTP/2 requires the ``h2`` package (``pip install httpx[http2]``). If it is
+    not installed, HTTP/1.1 is used.
+    """
+    if os.getenv("ECONUY_HTTP2", "0").lower() in ("0", "false", "no", ""):
+        return False
+    if importlib.util.find_spec("h2") is None:
+        warnings.warn(
+            "ECONUY_HTTP2 is set but h2 is not installed. Using HTTP/1.1.",
+            stacklevel=2,
+        )
+        return False
+    return True
+
+
+def get_client_kwargs(provider: str = DEFAULT_PROVIDER) -> Dict[str, Any]:
+    """Get the arguments used to build a provider's sync or async client."""
+    return CLIENT_CONFIG | {
+        "verify": get_ssl_context(provider),
+        "http2": http2_enabled(),
+    }
+
+
+def get_client(provider: str = DEFAULT_PROVIDER) -> httpx.Client:
+    """
+    Get the shared, pooled client for a provider.
+
+    Clients are created on first use and keep connections alive between
+    requests, so datasets from the same provider reuse TLS connections.
+
+    Parameters
+    ----------
+    provider : str, default "default"
+        One of ``PROVIDERS`` or ``DEFAULT_PROVIDER``.
+
+    Returns
+    -------
+    httpx.Client
+        The client.
+    """
+    client = _CLIENTS.get(provider)
+    if client is not None:
+        return client
+    with _CLIENTS_LOCK:
+        if provider not in _CLIENTS:
+            _CLIENTS[provider] = httpx.Client(**get_client_kwargs(provider))
+        return _CLIENTS[provider]
+
+
+def configure_clients(**kwargs) -> None:
+    """
+    Update the configuration of the shared clients and close existing ones.
+
+    Parameters
+    ----------
+    **kwargs
+        Arguments for ``httpx.Client``, such as ``timeout``, ``limits`` or
+        ``headers``.
+    """
+    CLIENT_CONFIG.update(kwargs)
+    close_clients()
+    return
+
+
+def close_clients() -> None:
+    """Close all shared clients and their connections."""
+    with _CLIENTS_LOCK:
+        clients = list(_CLIENTS.values())
+        _CLIENTS.clear()
+    for client in clients:
+        client.close()
+    return
+
+
+def _forget_clients() -> None:
+    # Connections inherited by forked processes must not be shared with the parent
+    _CLIENTS.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_clients)
+
+
+def http_get(url: str, provider: Optional[str] = None, **kwargs) -> httpx.Response:
+    """
+    Send a GET request through the shared client for the URL's provider.
+
+    During a dataset retrieval, successful responses are stored in the raw
+    cache, revalidated with conditional requests and replayed in offline mode
+    (see ``econuy.utils.raw_cache``).
+
+    Parameters
+    ----------
+    url : str
+        The URL.
+    provider : str, optional
+        The provider. If None, it is inferred from the URL's host.
+    **kwargs
+        Passed to ``httpx.Client.get``.
+
+    Returns
+    -------
+    httpx.Response
+        The response.
+    """
+    data_dir = RAW_CACHE_DIR.get()
+    if data_dir is None:
+        return _send(url, provider, **kwargs)
+
+    headers = kwargs.pop("headers", None) or {}
+
+    def send(conditional_headers: Dict[str, str]) -> httpx.Response:
+        return _send(url, provider, headers=headers | conditional_headers, **kwargs)
+
+    return fetch(get_request_url(url, kwargs.get("params")), data_dir, send)
+
+
+def download(url: str, provider: Optional[str] = None, **kwargs) -> BytesIO:
+    """
+    Download a file through the shared client for the URL's provider.
+
+    Bodies prefetched by the async loaders are returned without a request, and
+    stored in the raw cache as if they had been downloaded by the retrieval.
+
+    Parameters
+    ----------
+    url : str
+        The URL.
+    provider : str, optional
+        The provider. If None, it is inferred from the URL's host.
+    **kwargs
+        Passed to ``httpx.Client.get``.
+
+    Returns
+    -------
+    BytesIO
+        The response body.
+
+    Raises
+    ------
+    httpx.HTTPStatusError
+        If the response has an error status code.
+    """
+    prefetched = PREFETCHED_SOURCES.get()
+    if prefetched and url in prefetched:
+        response = prefetched[url]
+        data_dir = RAW_CACHE_DIR.get()
+        if data_dir is not None:
+            response = fetch(url, data_dir, lambda headers: prefetched[url])
+        return BytesIO(response.content)
+    response = http_get(url, provider, **kwargs)
+    response.raise_for_status()
+    return BytesIO(response.content)
+
+
+def download_to_file(
+    url: str,
+    path: Union[str, Path],
+    provider: Optional[str] = None,
+    hash_algorithm: Optional[str] = None,
+    progress: Optional[Callable[[int, Optional[int]], None]] = None,
+    chunk_size: int = CHUNK_SIZE,
+    **kwargs,
+) -> Optional[str]:
+    """
+    Stream a file to disk through the shared client for the URL's provider.
+
+    The body is written in chunks as it arrives, so large archives and
+    workbooks are never held in memory. The file is moved into place once
+    complete. During a dataset retrieval the file is also stored in the raw
+    cache, revalidated with conditional requests and replayed in offline mode.
+
+    Parameters
+    ----------
+    url : str
+        The URL.
+    path : str or Path
+        The file to write.
+    provider : str, optional
+        The provider. If None, it is inferred from the URL's host.
+    hash_algorithm : str, optional
+        A ``hashlib`` algorithm, such as "sha256", to hash the body with.
+    progress : Callable[[int, Optional[int]], None], optional
+        Called after each chunk with the bytes written so far and the total
+        size, or None if the server did not send a ``Content-Length``.
+    chunk_size : int, default 1 MiB
+        Size of the chunks read from the response.
+    **kwargs
+        Passed to ``httpx.Client.build_request``.
+
+    Returns
+    -------
+    Optional[str]
+        The hex digest of the body if ``hash_algorithm`` is set.
+
+    Raises
+    ------
+    httpx.HTTPStatusError
+        If the response has an error status code.
+    FileNotFoundError
+        If in offline mode and the URL has not been downloaded before.
+    """
+    path = Path(path)
+    hashes = {"sha256": hashlib.sha256()}
+    if hash_algorithm is not None:
+        hashes.setdefault(hash_algorithm, hashlib.new(hash_algorithm))
+    data_dir = RAW_CACHE_DIR.get()
+    request_url = get_request_url(url, kwargs.get("params"))
+    entry = read_entry(request_url, data_dir) if data_dir is not None else None
+
+    if data_dir is not None and offline_enabled():
+        if entry is None:
+            raise FileNotFoundError(
+                f"No stored download of {request_url} to replay offline."
+            )
+        _copy_stored(entry, data_dir, path, hashes, progress, chunk_size)
+        record_download(request_url, entry["validators"])
+        return hashes[hash_algorithm].hexdigest() if hash_algorithm else None
+
+    validators = entry["validators"] if entry is not None else None
+    headers = (kwargs.pop("headers", None) or {}) | get_conditional_headers(validators)
+    client = get_client(provider or get_provider(url))
+    request = client.build_request("GET", url, headers=headers, **kwargs)
+    # The host's request slot is held until the body has been read
+    slot = contextlib.ExitStack()
+    response = send_with_retries(
+        url, lambda: client.send(request, stream=True), hold=slot
+    )
+    try:
+        if response.status_code == httpx.codes.NOT_MODIFIED and entry is not None:
+            _copy_stored(entry, data_dir, path, hashes, progress, chunk_size)
+        else:
+            response.raise_for_status()
+            size = response.headers.get("Content-Length")
+            _write_chunks(
+                response.iter_bytes(chunk_size),
+                path,
+                hashes,
+                progress,
+                int(size) if size is not None and size.isdigit() else None,
+            )
+            if data_dir is not None:
+                entry = write_file_entry(
+                    request_url,
+                    path,
+                    hashes["sha256"].hexdigest(),
+                    data_dir,
+                    get_response_validators(response),
+                    response.headers.get("Content-Type"),
+                )
+    finally:
+        response.close()
+        slot.close()
+    if entry is not None:
+        record_download(request_url, entry["validators"])
+    return hashes[hash_algorithm].hexdigest() if hash_algorithm else None
+
+
+def _write_chunks(
+    chunks: Iterable[bytes],
+    path: Path,
+    hashes: Dict[str, Any],
+    progress: Optional[Callable[[int, Optional[int]], None]],
+    total: Optional[int],
+) -> None:
+    written = 0
+    with atomic_path(path) as tmp_path:
+        with open(tmp_path, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+                for hash_ in hashes.values():
+                    hash_.update(chunk)
+                written += len(chunk)
+                if progress is not None:
+                    progress(written, total)
+    return
+
+
+def _copy_stored(
+    entry: Dict,
+    data_dir: Path,
+    path: Path,
+    hashes: Dict[str, Any],
+    progress: Optional[Callable[[int, Optional[int]], None]],
+    chunk_size: int,
+) -> None:
+    source = get_object_path(entry["digest"], data_dir)
+    with open(source, "rb") as f:
+        chunks = iter(functools.partial(f.read, chunk_size), b"")
+        _write_chunks(chunks, path, hashes, progress, source.stat().st_size)
+    return
+
+
+class WorkbookCache:
+    """
+    Workbooks downloaded and opened once and shared by the retrievers of a run,
+    keyed by URL.
+
+    Sibling datasets that read different sheets of the same source file, such as
+    the ``fiscal_balance_*`` and ``public_debt_*`` datasets, then cost a single
+    download. Reads of a workbook are serialized, since the underlying Excel
+    readers are not thread safe.
+
+    The cache is bounded by the size of the downloaded files, and the least
+    recently used workbooks that are not being read are closed when it is full.
+
+    Parameters
+    ----------
+    max_bytes : int, optional
+        Maximum total size of cached workbooks, in bytes. If None, use the
+        ``ECONUY_WORKBOOK_CACHE_BYTES`` environment variable or 128 MiB. Setting
+        it to 0 closes every workbook once it is no longer being read.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = None) -> None:
+        if max_bytes is None:
+            max_bytes = int(
+                os.getenv("ECONUY_WORKBOOK_CACHE_BYTES", DEFAULT_WORKBOOK_CACHE_BYTES)
+            )
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._workbooks: OrderedDict[str, Tuple[pd.ExcelFile, Optional[Dict], int]] = (
+            OrderedDict()
+        )
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def open(self, url: str, provider: Optional[str] = None) -> Iterator[pd.ExcelFile]:
+        """Open the workbook at ``url``, downloading it if it is not cached."""
+        with self._lock:
+            lock = self._locks.setdefault(url, threading.Lock())
+        try:
+            with lock:
+                with self._lock:
+                    cached = self._workbooks.get(url)
+                    if cached is not None:
+                        self._workbooks.move_to_end(url)
+                if cached is not None:
+                    xls, validators, _ = cached
+                    # Retrievers served from the cache downloaded the file as well
+                    record_download(url, validators)
+                else:
+                    body = download(url, provider)
+                    xls = open_excel(body)
+                    data_dir = RAW_CACHE_DIR.get()
+                    entry = read_entry(url, data_dir) if data_dir is not None else None
+                    validators = entry["validators"] if entry is not None else None
+                    nbytes = body.getbuffer().nbytes
+                    with self._lock:
+                        self._workbooks[url] = (xls, validators, nbytes)
+                        self.current_bytes += nbytes
+                yield xls
+        finally:
+            self._evict()
+
+    def _evict(self) -> None:
+        """Close least recently used workbooks until the cache fits its bound."""
+        with self._lock:
+            for url in list(self._workbooks):
+                if self.current_bytes <= self.max_bytes:
+                    break
+                # Workbooks being read by other retrievers are kept
+                lock = self._locks[url]
+                if not lock.acquire(blocking=False):
+                    continue
+                try:
+                    xls, _, nbytes = self._workbooks.pop(url)
+                    xls.close()
+                    self.current_bytes -= nbytes
+                finally:
+                    lock.release()
+        return
+
+    def close(self) -> None:
+        """Close and forget the cached workbooks."""
+        with self._lock:
+            for xls, _, _ in self._workbooks.values():
+                xls.close()
+            self._workbooks.clear()
+            self._locks.clear()
+            self.current_bytes = 0
+        return
+
+
+# Workbooks shared by the retrievers of the current run, if any
+WORKBOOKS: ContextVar[Optional[WorkbookCache]] = ContextVar("workbooks", default=None)
+
+
+@contextlib.contextmanager
+def open_workbook(url: str, provider: Optional[str] = None) -> Iterator[pd.ExcelFile]:
+    """
+    Download and open an Excel workbook.
+
+    Inside ``sharing_workbooks`` the workbook is downloaded once and reused by
+    every retriever that opens the same URL. Otherwise it is downloaded and
+    closed on exit.
+
+    Parameters
+    ----------
+    url : str
+        The URL.
+    provider : str, optional
+        The provider. If None, it is inferred from the URL's host.
+
+    Yields
+    ------
+    pd.ExcelFile
+        The workbook.
+    """
+    workbooks = WORKBOOKS.get()
+    if workbooks is None:
+        with open_excel(download(url, provider)) as xls:
+            yield xls
+        return
+    with workbooks.open(url, provider) as xls:
+        yield xls
+    return
+
+
+@contextlib.contextmanager
+def sharing_workbooks(
+    workbooks: Optional[WorkbookCache] = None,
+) -> Iterator[WorkbookCache]:
+    """
+    Share the workbooks opened with ``open_workbook`` in this context.
+
+    Parameters
+    ----------
+    workbooks : Optional[WorkbookCache], optional
+        The cache to use, for contexts that run in other threads. If None, the
+        current context's cache is reused, or a new one is created and closed
+        on exit.
+
+    Yields
+    ------
+    WorkbookCache
+        The cache.
+    """
+    current = WORKBOOKS.get()
+    if workbooks is None and current is not None:
+        yield current
+        return
+    owned = workbooks is None
+    workbooks = workbooks or WorkbookCache()
+    token = WORKBOOKS.set(workbooks)
+    try:
+        yield workbooks
+    finally:
+        WORKBOOKS.reset(token)
+        if owned:
+            workbooks.close()
+    return
+
+
+def _send(url: str, provider: Optional[str] = None, **kwargs) -> httpx.Response:
+    client = get_client(provider or get_provider(url))
+    return send_with_retries(url, lambda: client.get(url, **kwargs))
+
+
+def sources_unchanged(validators: Dict[str, Dict[str, str]], data_dir: Path) -> bool:
+    """
+    Check whether sources are unchanged since they were downloaded.
+
+    Conditional requests are sent for every URL. Changed bodies are stored in
+    the raw cache, so the retriever that runs next does not download them again.
+
+    Parameters
+    ----------
+    validators : Dict[str, Dict[str, str]]
+        The validators of the previous downloads, keyed by URL.
+    data_dir : Path
+        The cache directory.
+
+    Returns
+    -------
+    bool
+        True if every URL responded with 304 Not Modified.
+    """
+    unchanged = True
+    for url, url_validators in validators.items():
+        response = _send(url, headers=get_conditional_headers(url_validators))
+        if response.status_code == httpx.codes.NOT_MODIFIED:
+            continue
+        unchanged = False
+        if response.is_success:
+            write_entry(
+                url,
+                response.content,
+                data_dir,
+                get_response_validators(response),
+                response.headers.get("Content-Type"),
+            )
+    return unchanged
+
+
 def get_with_ssl_context(
     source: Literal["bcu", "ine", "inac", "bcra"], url: str
-) -> bytes:
-    certs_path = get_certs_path(source)
-    ssl_context = ssl.create_default_context(cafile=str(certs_path))
-
-    r = httpx.get(url, verify=ssl_context)
-    return BytesIO(r.content)
+) -> BytesIO:
+    return download(url, source)
@@ -0,0 +1,588 @@
+import asyncio
+import collections
+import contextlib
+import functools
+import json
+import os
+import random
+import threading
+import time
+from pathlib import Path
+from typing import (
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    TypeVar,
+)
+from urllib.parse import urlparse
+
+import httpx
+
+from econuy.utils.locking import FileLock
+from econuy.utils.operations import REGISTRY
+
+
+POLL_INTERVAL = 0.05
+MAX_ATTEMPTS = 4
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 10.0
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+FAILURE_THRESHOLD = 5
+COOLDOWN = 60.0
+DEFAULT_LIMITS = {"max_concurrency": 8, "rate": 10.0}
+# Requests per second and simultaneous requests per host, by registry provider
+PROVIDER_LIMITS = {
+    "BCU": {"max_concurrency": 4, "rate": 4.0},
+    "INE": {"max_concurrency": 4, "rate": 4.0},
+    "MEF": {"max_concurrency": 2, "rate": 2.0},
+    "MIEM": {"max_concurrency": 2, "rate": 2.0},
+    "Yahoo Finance": {"max_concurrency": 2, "rate": 2.0},
+}
+
+T = TypeVar("T")
+
+_LIMITERS: Dict[str, "HostLimiter"] = {}
+_BREAKERS: Dict[str, "CircuitBreaker"] = {}
+_LIMITERS_LOCK = threading.Lock()
+# Directory of the request slots shared with other processes, set in process
+# pool workers, and the fraction of each host's rate available to this process
+_SLOTS_DIR: Optional[Path] = None
+_RATE_SHARE = 1.0
+
+
+class HostLimiter:
+    """
+    Limit the simultaneous requests and the request rate to a host.
+
+    The rate is enforced with a token bucket that allows bursts of up to
+    ``max_concurrency`` requests. The limiter is shared by threads and event
+    loops, which wait for a slot by polling.
+
+    Parameters
+    ----------
+    max_concurrency : int, optional
+        Maximum number of requests in flight. If None, there is no limit.
+    rate : float, optional
+        Maximum number of requests started per second. If None, there is no
+        limit.
+    slots_dir : Path, optional
+        If given, each request in flight also holds a lock on one of
+        ``max_concurrency`` files in this directory, so limiters of other
+        processes that use the same directory share the concurrency limit.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: Optional[int] = None,
+        rate: Optional[float] = None,
+        slots_dir: Optional[Path] = None,
+    ) -> None:
+        self.max_concurrency = max_concurrency
+        self.rate = rate
+        self.slots_dir = slots_dir
+        self._lock = threading.Lock()
+        self._active = 0
+        self._slots: List[FileLock] = []
+        self._tokens = float(max_concurrency or 1)
+        self._updated = time.monotonic()
+
+    def try_acquire(self) -> float:
+        """
+        Take a slot if one is available.
+
+        Returns
+        -------
+        float
+            0 if a slot was taken, otherwise the number of seconds to wait
+            before trying again.
+        """
+        with self._lock:
+            if (
+                self.max_concurrency is not None
+                and self._active >= self.max_concurrency
+            ):
+                return POLL_INTERVAL
+            slot = None
+            if self.slots_dir is not None and self.max_concurrency is not None:
+                slot = self._lock_slot()
+                if slot is None:
+                    return POLL_INTERVAL
+            if self.rate is not None:
+                now = time.monotonic()
+                burst = float(self.max_concurrency or 1)
+                self._tokens = min(
+                    burst, self._tokens + (now - self._updated) * self.rate
+                )
+                self._updated = now
+                if self._tokens < 1:
+                    if slot is not None:
+                        slot.release()
+                    return (1 - self._tokens) / self.rate
+                self._tokens -= 1
+            self._active += 1
+            if slot is not None:
+                self._slots.append(slot)
+            return 0.0
+
+    def release(self) -> None:
+        """Release a slot taken with ``try_acquire``."""
+        with self._lock:
+            self._active -= 1
+            if self._slots:
+                self._slots.pop().release()
+        return
+
+    def _lock_slot(self) -> Optional[FileLock]:
+        """Lock a free slot file shared with other processes, if there is one."""
+        for i in range(self.max_concurrency):
+            slot = FileLock(self.slots_dir / f"{i}.lock", timeout=0)
+            try:
+                slot.acquire()
+            except TimeoutError:
+                continue
+            return slot
+        return None
+
+    @contextlib.contextmanager
+    def limit(self) -> Iterator[None]:
+        """Wait for a slot, blocking the thread, and hold it."""
+        while wait := self.try_acquire():
+            time.sleep(wait)
+        try:
+            yield
+        finally:
+            self.release()
+
+    @contextlib.asynccontextmanager
+    async def alimit(self) -> AsyncIterator[None]:
+        """Wait for a slot without blocking the event loop, and hold it."""
+        while wait := self.try_acquire():
+            await asyncio.sleep(wait)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def __repr__(self) -> str:
+        return f"HostLimiter(max_concurrency={self.max_concurrency}, rate={self.rate})"
+
+
+@functools.lru_cache(maxsize=1)
+def get_host_providers() -> Dict[str, str]:
+    """
+    Map the hosts in the registry's download sources to their provider.
+
+    Each host is assigned the provider most often listed in ``sources.provider``
+    by the entries that download from it. Entries with several providers or
+    derived data ("econuy en base a ...") are ignored.
+
+    Returns
+    -------
+    Dict[str, str]
+        The provider of each host.
+    """
+    counts = collections.defaultdict(collections.Counter)
+    for entry in REGISTRY.registry.values():
+        sources = entry.get("sources", {})
+        providers = sources.get("provider") or []
+        if len(providers) != 1 or providers[0].startswith("econuy"):
+            continue
+        for url in sources.get("downloads", {}).values():
+            host = urlparse(url).hostname
+            if host:
+                counts[host][providers[0]] += 1
+    return {host: count.most_common(1)[0][0] for host, count in counts.items()}
+
+
+def get_limits(host: str) -> Dict[str, Optional[float]]:
+    """
+    Get the limits for a host, from ``PROVIDER_LIMITS`` for its provider or
+    ``DEFAULT_LIMITS``, updated with the ``ECONUY_HOST_LIMITS`` env var.
+
+    ``ECONUY_HOST_LIMITS`` is a JSON object mapping providers, hosts or
+    "default" to limits, e.g. ``{"BCU": {"max_concurrency": 2, "rate": 1}}``.
+
+    Parameters
+    ----------
+    host : str
+        The host.
+
+    Returns
+    -------
+    Dict[str, Optional[float]]
+        The ``max_concurrency`` and ``rate`` for the host.
+    """
+    provider = get_host_providers().get(host)
+    overrides = json.loads(os.getenv("ECONUY_HOST_LIMITS", "{}"))
+    limits = DEFAULT_LIMITS | overrides.get("default", {})
+    if provider is not None:
+        limits = limits | PROVIDER_LIMITS.get(provider, {})
+        limits = limits | overrides.get(provider, {})
+    return limits | overrides.get(host, {})
+
+
+def get_limiter(url: str) -> HostLimiter:
+    """
+    Get the limiter shared by all requests to a URL's host in this process, and
+    by other processes that share the host's limits (see ``share_limits``).
+
+    Parameters
+    ----------
+    url : str
+        The URL.
+
+    Returns
+    -------
+    HostLimiter
+        The limiter.
+    """
+    host = urlparse(url).hostname or ""
+    limiter = _LIMITERS.get(host)
+    if limiter is not None:
+        return limiter
+    with _LIMITERS_LOCK:
+        if host not in _LIMITERS:
+            limits = get_limits(host)
+            concurrency, rate = limits["max_concurrency"], limits["rate"]
+            _LIMITERS[host] = HostLimiter(
+                concurrency,
+                None if rate is None else rate * _RATE_SHARE,
+                None if _SLOTS_DIR is None else _SLOTS_DIR / (host or "default"),
+            )
+        return _LIMITERS[host]
+
+
+def configure_limits(
+    provider: str,
+    max_concurrency: Optional[int] = None,
+    rate: Optional[float] = None,
+) -> None:
+    """
+    Set the limits for a provider's hosts, or "default" for other hosts.
+
+    Parameters
+    ----------
+    provider : str
+        The provider, as in the registry's ``sources.provider``.
+    max_concurrency : int, optional
+        Maximum number of simultaneous requests per host. If None, there is no
+        limit.
+    rate : float, optional
+        Maximum number of requests per second per host. If None, there is no
+        limit.
+    """
+    limits = {"max_concurrency": max_concurrency, "rate": rate}
+    if provider == "default":
+        DEFAULT_LIMITS.update(limits)
+    else:
+        PROVIDER_LIMITS[provider] = limits
+    with _LIMITERS_LOCK:
+        _LIMITERS.clear()
+    return
+
+
+def share_limits(slots_dir: Optional[Path], rate_share: float = 1.0) -> None:
+    """
+    Share each host's limits with other processes.
+
+    Process pool workers take request slots from the same directory, so the
+    pool as a whole never has more requests in flight to a host than its
+    ``max_concurrency``. Each worker gets an equal share of the host's rate.
+
+    Parameters
+    ----------
+    slots_dir : Path, optional
+        The directory of the slot files shared by the processes. If None, the
+        limits apply to this process alone.
+    rate_share : float, default 1.0
+        The fraction of each host's rate available to this process.
+    """
+    global _SLOTS_DIR, _RATE_SHARE
+    _SLOTS_DIR = None if slots_dir is None else Path(slots_dir)
+    _RATE_SHARE = rate_share
+    with _LIMITERS_LOCK:
+        _LIMITERS.clear()
+    return
+
+
+class CircuitOpenError(httpx.TransportError):
+    """Raised instead of sending a request to a host that is failing."""
+
+
+class CircuitBreaker:
+    """
+    Stop sending requests to a host after consecutive failures.
+
+    After ``failure_threshold`` consecutive failed requests the circuit opens
+    and requests fail immediately with ``CircuitOpenError``. Once ``cooldown``
+    seconds have passed a single trial request is let through, which closes
+    the circuit if it succeeds and opens it again if it fails.
+
+    Parameters
+    ----------
+    failure_threshold : int, default 5
+        Number of consecutive failures that open the circuit.
+    cooldown : float, default 60
+        Seconds to wait before sending a trial request.
+    """
+
+    def __init__(
+        self, failure_threshold: int = FAILURE_THRESHOLD, cooldown: float = COOLDOWN
+    ) -> None:
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def check(self, host: str = "host") -> bool:
+        """
+        Check that a request may be sent.
+
+        Returns
+        -------
+        bool
+            True if the request is the trial request of an open circuit, which
+            must end with ``record_success``, ``record_failure`` or
+            ``release_trial``.
+
+        Raises
+        ------
+        CircuitOpenError
+            If the circuit is open, or a trial request is already in flight.
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return False
+            remaining = self._opened_at + self.cooldown - time.monotonic()
+            if remaining > 0 or self._trial:
+                raise CircuitOpenError(
+                    f"Requests to {host} are suspended after "
+                    f"{self._failures} consecutive failures. "
+                    f"Retrying in {max(remaining, 0):.0f} seconds."
+                )
+            self._trial = True
+        return True
+
+    def release_trial(self) -> None:
+        """
+        Let another trial request through after one ended without an outcome,
+        such as a cancelled request, leaving the circuit open.
+        """
+        with self._lock:
+            self._trial = False
+        return
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial = False
+        return
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._trial or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial = False
+        return
+
+    def __repr__(self) -> str:
+        state = "open" if self.is_open else "closed"
+        return f"CircuitBreaker(state={state}, failures={self._failures})"
+
+
+def get_breaker(url: str) -> CircuitBreaker:
+    """Get the circuit breaker shared by all requests to a URL's host in this process."""
+    host = urlparse(url).hostname or ""
+    breaker = _BREAKERS.get(host)
+    if breaker is not None:
+        return breaker
+    with _LIMITERS_LOCK:
+        return _BREAKERS.setdefault(host, CircuitBreaker())
+
+
+def get_backoff(attempt: int, response: Optional[httpx.Response] = None) -> float:
+    """
+    Get the seconds to wait before retrying a request, with exponential backoff
+    and full jitter. A ``Retry-After`` header in the response is respected, up
+    to ``BACKOFF_MAX`` seconds.
+
+    Parameters
+    ----------
+    attempt : int
+        The number of the attempt that failed, starting at 0.
+    response : httpx.Response, optional
+        The failed response, if there was one.
+
+    Returns
+    -------
+    float
+        The seconds to wait.
+    """
+    backoff = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2**attempt))
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after is not None and retry_after.isdigit():
+        backoff = max(backoff, min(float(retry_after), BACKOFF_MAX))
+    return backoff
+
+
+def _is_failure(response: httpx.Response) -> bool:
+    return response.status_code in RETRY_STATUS_CODES
+
+
+def send_with_retries(
+    url: str,
+    send: Callable[[], httpx.Response],
+    hold: Optional[contextlib.ExitStack] = None,
+) -> httpx.Response:
+    """
+    Send a request within its host's limits, retrying transient failures.
+
+    Connection errors, timeouts and 429 or 5xx responses are retried up to
+    ``MAX_ATTEMPTS`` times with ``get_backoff`` between attempts, and are
+    recorded by the host's circuit breaker.
+
+    Parameters
+    ----------
+    url : str
+        The URL of the request.
+    send : Callable[[], httpx.Response]
+        Sends the request.
+    hold : contextlib.ExitStack, optional
+        If given, the host's request slot is held until the stack is closed
+        instead of released when ``send`` returns, so that streamed bodies are
+        read within the host's limits.
+
+    Returns
+    -------
+    httpx.Response
+        The response. It may have an error status code if every attempt failed.
+
+    Raises
+    ------
+    httpx.TransportError
+        If the last attempt failed without a response.
+    CircuitOpenError
+        If the host's circuit is open.
+    """
+    breaker = get_breaker(url)
+    limiter = get_limiter(url)
+    for attempt in range(MAX_ATTEMPTS):
+        trial = breaker.check(urlparse(url).hostname)
+        slot = contextlib.ExitStack()
+        try:
+            slot.enter_context(limiter.limit())
+            response = send()
+        except httpx.TransportError:
+            slot.close()
+            breaker.record_failure()
+            if attempt == MAX_ATTEMPTS - 1:
+                raise
+            time.sleep(get_backoff(attempt))
+            continue
+        except BaseException:
+            # Interrupted or invalid requests say nothing about the host
+            slot.close()
+            if trial:
+                breaker.release_trial()
+            raise
+        failed = _is_failure(response)
+        if failed:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        if not failed or attempt == MAX_ATTEMPTS - 1:
+            if hold is None:
+                slot.close()
+            else:
+                hold.enter_context(slot)
+            return response
+        response.close()
+        slot.close()
+        time.sleep(get_backoff(attempt, response))
+
+
+def call_with_retries(
+    call: Callable[[], T], exceptions: Tuple[Type[BaseException], ...]
+) -> T:
+    """
+    Call a function that fetches something without httpx, such as a Selenium
+    page load, retrying it up to ``MAX_ATTEMPTS`` times with ``get_backoff``
+    between attempts when it raises one of ``exceptions``.
+
+    Parameters
+    ----------
+    call : Callable[[], T]
+        The function.
+    exceptions : Tuple[Type[BaseException], ...]
+        The exceptions that are retried.
+
+    Returns
+    -------
+    T
+        What the function returns.
+    """
+    for attempt in range(MAX_ATTEMPTS):
+        try:
+            return call()
+        except exceptions:
+            if attempt == MAX_ATTEMPTS - 1:
+                raise
+            time.sleep(get_backoff(attempt))
+
+
+async def asend_with_retries(
+    url: str, send: Callable[[], Awaitable[httpx.Response]]
+) -> httpx.Response:
+    """Async version of ``send_with_retries``, which waits without blocking the event loop."""
+    breaker = get_breaker(url)
+    limiter = get_limiter(url)
+    for attempt in range(MAX_ATTEMPTS):
+        trial = breaker.check(urlparse(url).hostname)
+        try:
+            async with limiter.alimit():
+                response = await send()
+        except httpx.TransportError:
+            breaker.record_failure()
+            if attempt == MAX_ATTEMPTS - 1:
+                raise
+            await asyncio.sleep(get_backoff(attempt))
+            continue
+        except BaseException:
+            # Including cancellation while waiting for a slot or the response
+            if trial:
+                breaker.release_trial()
+            raise
+        if not _is_failure(response):
+            breaker.record_success()
+            return response
+        breaker.record_failure()
+        if attempt == MAX_ATTEMPTS - 1:
+            return response
+        await response.aclose()
+        await asyncio.sleep(get_backoff(attempt, response))
+
+
+def _forget_state() -> None:
+    # Locks inherited by forked processes may be held by threads that no longer exist
+    global _LIMITERS_LOCK
+    _LIMITERS_LOCK = threading.Lock()
+    _LIMITERS.clear()
+    _BREAKERS.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_forget_state)
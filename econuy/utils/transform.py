@@ -1,3 +1,8 @@
+import contextlib
+import threading
+from contextvars import ContextVar
+from typing import Callable, Dict, Hashable, Iterator, List, Optional, Tuple
+
 import pandas as pd
 import numpy as np
 
@@ -13,3 +18,106 @@ def error_handler(df: pd.DataFrame, errors: str, msg: str = None) -> pd.DataFram
         if msg is None:
             msg = ""
         raise InvalidTransformation(msg)
+
+
+class TransformCache:
+    """
+    Inputs shared by the transformations of a run.
+
+    Holds the frequencies inferred from indexes, which transformations chained
+    on the same data would otherwise infer again at every step, and the
+    converter series, such as exchange rates or prices at a given frequency,
+    computed once for every dataset converted in the run.
+    """
+
+    def __init__(self) -> None:
+        self._frequencies: Dict[Tuple, List[Tuple[pd.Index, Optional[str]]]] = {}
+        self._inputs: Dict[Hashable, object] = {}
+        self._locks: Dict[Hashable, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def infer_freq(self, index: pd.Index) -> Optional[str]:
+        """Infer the frequency of an index, reusing it for equal indexes."""
+        if len(index) == 0:
+            return pd.infer_freq(index)
+        key = (len(index), index[0], index[-1])
+        with self._lock:
+            for cached, freq in self._frequencies.get(key, []):
+                if cached is index or cached.equals(index):
+                    return freq
+        freq = pd.infer_freq(index)
+        with self._lock:
+            self._frequencies.setdefault(key, []).append((index, freq))
+        return freq
+
+    def get(self, key: Hashable, compute: Callable[[], object]) -> object:
+        """Get a shared input, computing it the first time it is requested."""
+        with self._lock:
+            lock = self._locks.setdefault(key, threading.Lock())
+        with lock:
+            if key not in self._inputs:
+                self._inputs[key] = compute()
+            return self._inputs[key]
+
+
+# Inputs shared by the transformations of the current run, if any
+TRANSFORM_CACHE: ContextVar[Optional[TransformCache]] = ContextVar(
+    "transform_cache", default=None
+)
+
+
+def infer_freq(index: pd.Index) -> Optional[str]:
+    """
+    Infer the frequency of an index with ``pd.infer_freq``.
+
+    Inside ``sharing_transform_inputs`` the frequency of each index is inferred
+    once.
+    """
+    cache = TRANSFORM_CACHE.get()
+    if cache is None:
+        return pd.infer_freq(index)
+    return cache.infer_freq(index)
+
+
+def get_shared_input(key: Hashable, compute: Callable[[], object]) -> object:
+    """
+    Get an input of a transformation, such as a converter series.
+
+    Inside ``sharing_transform_inputs`` it is computed once per ``key``.
+    Otherwise it is computed on every call.
+    """
+    cache = TRANSFORM_CACHE.get()
+    if cache is None:
+        return compute()
+    return cache.get(key, compute)
+
+
+@contextlib.contextmanager
+def sharing_transform_inputs(
+    cache: Optional[TransformCache] = None,
+) -> Iterator[TransformCache]:
+    """
+    Share inferred frequencies and converter inputs between the transformations
+    run in this context.
+
+    Parameters
+    ----------
+    cache : Optional[TransformCache], optional
+        The cache to use, for contexts that run in other threads. If None, the
+        current context's cache is reused, or a new one is created.
+
+    Yields
+    ------
+    TransformCache
+        The cache.
+    """
+    current = TRANSFORM_CACHE.get()
+    if cache is None and current is not None:
+        yield current
+        return
+    cache = cache or TransformCache()
+    token = TRANSFORM_CACHE.set(cache)
+    try:
+        yield cache
+    finally:
+        TRANSFORM_CACHE.reset(token)
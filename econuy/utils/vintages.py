@@ -0,0 +1,275 @@
+import datetime as dt
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import List, Optional, Set, Union
+
+import pandas as pd
+import pyarrow as pa
+
+from econuy.utils.locking import FileLock, atomic_path
+
+
+VINTAGES_DIRNAME = "vintages"
+OBJECTS_DIRNAME = "objects"
+CHUNK_ROWS = 64
+VINTAGE_TIMESTAMP_FORMAT = "%Y%m%dT%H%M%S%f"
+
+
+def get_vintages_dir(data_dir: Path) -> Path:
+    return Path(data_dir) / VINTAGES_DIRNAME
+
+
+def get_object_path(data_dir: Path, digest: str) -> Path:
+    return get_vintages_dir(data_dir) / OBJECTS_DIRNAME / digest[:2] / f"{digest}.arrow"
+
+
+def vintages_enabled() -> bool:
+    """
+    Check whether vintages are archived, using the ``ECONUY_VINTAGES`` env var.
+    Archiving is disabled by default.
+    """
+    return os.getenv("ECONUY_VINTAGES", "0").lower() not in ("0", "false", "no", "")
+
+
+def _get_vintages_lock(data_dir: Path) -> FileLock:
+    return FileLock(get_vintages_dir(data_dir) / ".lock")
+
+
+def list_vintages(name: str, data_dir: Path) -> List[dt.datetime]:
+    """
+    List the archived vintages of a dataset.
+
+    Parameters
+    ----------
+    name : str
+        The name of the dataset.
+    data_dir : Path
+        The cache directory.
+
+    Returns
+    -------
+    List[dt.datetime]
+        The creation time of each vintage, sorted from oldest to newest.
+    """
+    manifests_dir = get_vintages_dir(data_dir) / name
+    if not manifests_dir.exists():
+        return []
+    return sorted(
+        dt.datetime.strptime(path.stem, VINTAGE_TIMESTAMP_FORMAT)
+        for path in manifests_dir.glob("*.json")
+    )
+
+
+def save_vintage(
+    dataset: "Dataset",  # noqa: F821
+    data_dir: Path,
+    name: Optional[str] = None,
+) -> Optional[Path]:
+    """
+    Archive a dataset as a vintage.
+
+    The index and each column are split into chunks of ``CHUNK_ROWS`` rows and
+    every chunk is stored once, keyed by the hash of its contents. A vintage is
+    a manifest listing its chunks and metadata, so unchanged history is shared
+    between vintages. Nothing is written if the data and metadata match the
+    latest vintage.
+
+    Parameters
+    ----------
+    dataset : Dataset
+        The dataset to archive. Its ``created_at`` is used as the vintage time.
+    data_dir : Path
+        The cache directory.
+    name : str, optional
+        The name to archive the dataset under. Default is the dataset's name.
+
+    Returns
+    -------
+    Optional[Path]
+        The path of the vintage manifest, or None if no vintage was written.
+    """
+    name = name or dataset.name
+    get_vintages_dir(data_dir).mkdir(parents=True, exist_ok=True)
+    # Chunks are written before their manifest, so clearing vintages while
+    # one is being saved could remove them
+    with _get_vintages_lock(data_dir):
+        return _save_vintage(dataset, data_dir, name)
+
+
+def _save_vintage(
+    dataset: "Dataset",  # noqa: F821
+    data_dir: Path,
+    name: str,
+) -> Optional[Path]:
+    data = dataset.data
+    metadata = dataset.metadata.to_dict()
+    metadata.pop("created_at")
+    metadata.pop("checked_at")
+    manifest = {
+        "columns": list(data.columns),
+        "index_name": data.index.name,
+        "index": _write_chunks(pd.Series(data.index), data_dir),
+        "data": [
+            _write_chunks(data.iloc[:, i], data_dir) for i in range(data.shape[1])
+        ],
+        "metadata": metadata,
+    }
+
+    manifests_dir = get_vintages_dir(data_dir) / name
+    latest = list_vintages(name, data_dir)
+    if latest:
+        with open(_get_manifest_path(name, data_dir, latest[-1]), "r") as f:
+            if json.load(f) == json.loads(json.dumps(manifest)):
+                return None
+
+    manifests_dir.mkdir(parents=True, exist_ok=True)
+    path = _get_manifest_path(name, data_dir, dataset.metadata.created_at)
+    with atomic_path(path) as tmp_path:
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=4)
+    return path
+
+
+def read_vintage(
+    name: str,
+    data_dir: Path,
+    as_of: Union[str, dt.date, dt.datetime],
+) -> Optional["Dataset"]:  # noqa: F821
+    """
+    Read the latest vintage of a dataset created at or before a given time.
+
+    Parameters
+    ----------
+    name : str
+        The name of the dataset.
+    data_dir : Path
+        The cache directory.
+    as_of : str, dt.date or dt.datetime
+        The reference time. Dates without a time component include every
+        vintage created during that day.
+
+    Returns
+    -------
+    Optional[Dataset]
+        The dataset as it was at ``as_of``, or None if there is no such vintage.
+    """
+    from econuy.base import Dataset, DatasetMetadata
+
+    as_of = pd.Timestamp(as_of)
+    if as_of == as_of.normalize():
+        as_of = as_of + pd.Timedelta(days=1) - pd.Timedelta(microseconds=1)
+    candidates = [x for x in list_vintages(name, data_dir) if x <= as_of]
+    if not candidates:
+        return None
+    created_at = candidates[-1]
+    with open(_get_manifest_path(name, data_dir, created_at), "r") as f:
+        manifest = json.load(f)
+
+    index = pd.Index(
+        _read_chunks(manifest["index"], data_dir).rename(manifest["index_name"])
+    )
+    data = pd.DataFrame(
+        {
+            i: _read_chunks(digests, data_dir).to_numpy()
+            for i, digests in enumerate(manifest["data"])
+        },
+        index=index,
+    )
+    data.columns = manifest["columns"]
+    metadata = DatasetMetadata.from_dict(
+        manifest["metadata"] | {"created_at": created_at.isoformat()}
+    )
+    return Dataset(name, data, metadata)
+
+
+def clear_vintages(
+    data_dir: Union[str, Path], name: Optional[str] = None, keep: int = 0
+) -> int:
+    """
+    Remove archived vintages, along with the chunks no remaining vintage uses.
+
+    Parameters
+    ----------
+    data_dir : Union[str, Path]
+        The cache directory.
+    name : Optional[str], optional
+        The dataset whose vintages are removed. If None, all datasets'.
+    keep : int, optional
+        Number of most recent vintages to keep for each dataset. Default is 0.
+
+    Returns
+    -------
+    int
+        The number of vintages removed.
+    """
+    vintages_dir = get_vintages_dir(data_dir)
+    if not vintages_dir.exists():
+        return 0
+    if name is None:
+        names = [
+            path.name
+            for path in vintages_dir.iterdir()
+            if path.is_dir() and path.name != OBJECTS_DIRNAME
+        ]
+    else:
+        names = [name]
+
+    removed = 0
+    with _get_vintages_lock(data_dir):
+        for vintage_name in names:
+            created_ats = list_vintages(vintage_name, data_dir)
+            for created_at in created_ats[: max(len(created_ats) - keep, 0)]:
+                _get_manifest_path(vintage_name, data_dir, created_at).unlink(
+                    missing_ok=True
+                )
+                removed += 1
+        referenced = _get_referenced_digests(data_dir)
+        for path in (vintages_dir / OBJECTS_DIRNAME).glob("*/*.arrow"):
+            if path.stem not in referenced:
+                path.unlink(missing_ok=True)
+    return removed
+
+
+def _get_referenced_digests(data_dir: Path) -> Set[str]:
+    digests = set()
+    for path in get_vintages_dir(data_dir).glob("*/*.json"):
+        with open(path, "r") as f:
+            manifest = json.load(f)
+        digests.update(manifest["index"])
+        for column in manifest["data"]:
+            digests.update(column)
+    return digests
+
+
+def _get_manifest_path(name: str, data_dir: Path, created_at: dt.datetime) -> Path:
+    stem = created_at.strftime(VINTAGE_TIMESTAMP_FORMAT)
+    return get_vintages_dir(data_dir) / name / f"{stem}.json"
+
+
+def _write_chunks(values: pd.Series, data_dir: Path) -> List[str]:
+    digests = []
+    for start in range(0, max(len(values), 1), CHUNK_ROWS):
+        chunk = values.iloc[start : start + CHUNK_ROWS].reset_index(drop=True)
+        table = pa.Table.from_pandas(chunk.to_frame("values"), preserve_index=False)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        body = sink.getvalue().to_pybytes()
+        digest = hashlib.sha256(body).hexdigest()
+        path = get_object_path(data_dir, digest)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with atomic_path(path) as tmp_path:
+                tmp_path.write_bytes(body)
+        digests.append(digest)
+    return digests
+
+
+def _read_chunks(digests: List[str], data_dir: Path) -> pd.Series:
+    chunks = []
+    for digest in digests:
+        with pa.memory_map(str(get_object_path(data_dir, digest)), "r") as source:
+            chunks.append(pa.ipc.open_file(source).read_all().to_pandas()["values"])
+    return pd.concat(chunks, ignore_index=True)
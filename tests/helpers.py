@@ -0,0 +1,27 @@
+import numpy as np
+import pandas as pd
+
+from econuy.base import Dataset, DatasetMetadata
+
+
+def create_dummy_dataset(name="cpi", periods=100, n_cols=3):
+    dates = pd.date_range("2000-01-31", periods=periods, freq="ME")
+    cols = [f"{name}_{i}" for i in range(n_cols)]
+    data = pd.DataFrame(
+        np.random.uniform(1, 100, [periods, n_cols]), index=dates, columns=cols
+    )
+    base_metadata = {
+        "area": "Test",
+        "currency": "UYU",
+        "inflation_adjustment": None,
+        "unit": "Test",
+        "seasonal_adjustment": None,
+        "frequency": "ME",
+        "time_series_type": "Flow",
+        "cumulative_periods": 1,
+        "transformations": [],
+    }
+    metadata = DatasetMetadata.from_cast(
+        name, base_metadata, cols, [{"es": x} for x in cols]
+    )
+    return Dataset(name, data, metadata)
@@ -0,0 +1,282 @@
+import datetime as dt
+import time
+from concurrent import futures
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from econuy import load_dataset, load_datasets_parallel
+from econuy.retrieval import prices
+from econuy.utils.cache import (
+    DatasetHandle,
+    MemoryCache,
+    MEMORY_CACHE,
+    MAX_SEGMENTS,
+    compact,
+    get_segment_paths,
+)
+from econuy.utils.locking import dataset_lock
+from econuy.utils.operations import REGISTRY, read_dataset, read_created_at
+from econuy.utils.vintages import (
+    clear_vintages,
+    list_vintages,
+    read_vintage,
+    save_vintage,
+)
+from tests.helpers import create_dummy_dataset
+
+
+@pytest.mark.parametrize("cache_format", ["parquet", "arrow", "csv"])
+def test_save_read_roundtrip(cache_format, tmp_path):
+    dataset = create_dummy_dataset()
+    dataset.save(tmp_path, cache_format=cache_format)
+    assert (tmp_path / f"cpi.{cache_format}").exists()
+    compare = read_dataset("cpi", tmp_path, cache_format=cache_format)
+    pd.testing.assert_frame_equal(dataset.data, compare.data, check_freq=False)
+
+
+def test_migrate_csv_on_read(tmp_path):
+    dataset = create_dummy_dataset()
+    dataset.save(tmp_path, cache_format="csv")
+    compare = read_dataset("cpi", tmp_path, cache_format="parquet")
+    assert (tmp_path / "cpi.parquet").exists()
+    assert not (tmp_path / "cpi.csv").exists()
+    pd.testing.assert_frame_equal(dataset.data, compare.data, check_freq=False)
+
+
+def test_cache_format_from_env(tmp_path, monkeypatch):
+    monkeypatch.setenv("ECONUY_CACHE_FORMAT", "arrow")
+    create_dummy_dataset().save(tmp_path)
+    assert (tmp_path / "cpi.arrow").exists()
+    monkeypatch.delenv("ECONUY_CACHE_FORMAT")
+    (tmp_path / ".econuy_format").write_text("csv")
+    create_dummy_dataset().save(tmp_path)
+    assert (tmp_path / "cpi.csv").exists()
+    assert not (tmp_path / "cpi.arrow").exists()
+
+
+def test_dataset_handle_memory_map(tmp_path):
+    dataset = create_dummy_dataset()
+    dataset.data.iloc[3, 1] = np.nan
+    handle = DatasetHandle.from_dataset(dataset, tmp_path)
+    compare = handle.load()
+    pd.testing.assert_frame_equal(dataset.data, compare.data, check_freq=False)
+    assert not compare.data.iloc[:, 0].to_numpy().flags.writeable
+
+
+def test_load_parallel_process_handles(tmp_path):
+    for name in ["cpi", "nxr_monthly"]:
+        create_dummy_dataset(name).save(tmp_path)
+    datasets = load_datasets_parallel(
+        ["cpi", "nxr_monthly"], data_dir=tmp_path, executor_type="process"
+    )
+    assert set(datasets.keys()) == {"cpi", "nxr_monthly"}
+    expected = read_dataset("cpi", tmp_path)
+    pd.testing.assert_frame_equal(datasets["cpi"].data, expected.data)
+
+
+def test_load_parallel_process_unknown_name(tmp_path):
+    create_dummy_dataset("cpi").save(tmp_path)
+    # Unknown names fail on their own, as with threads
+    datasets = load_datasets_parallel(
+        ["cpi", "not_a_dataset"], data_dir=tmp_path, executor_type="process"
+    )
+    assert set(datasets.keys()) == {"cpi"}
+
+
+def test_read_created_at(tmp_path):
+    assert read_created_at("cpi", tmp_path) is None
+    dataset = create_dummy_dataset()
+    dataset.save(tmp_path)
+    assert read_created_at("cpi", tmp_path) == dataset.metadata.created_at
+
+
+def test_memory_cache(tmp_path):
+    MEMORY_CACHE.clear()
+    dataset = create_dummy_dataset()
+    dataset.save(tmp_path)
+    first = read_dataset("cpi", tmp_path)
+    second = read_dataset("cpi", tmp_path)
+    assert MEMORY_CACHE.stats()["misses"] == 1
+    assert MEMORY_CACHE.stats()["hits"] == 1
+    second.data.iloc[0, 0] = -1
+    assert read_dataset("cpi", tmp_path).data.iloc[0, 0] == first.data.iloc[0, 0]
+
+    new = create_dummy_dataset(periods=50)
+    new.save(tmp_path)
+    assert read_dataset("cpi", tmp_path).data.shape[0] == 50
+
+
+def test_memory_cache_eviction():
+    cache = MemoryCache(max_bytes=3000)
+    dataset = create_dummy_dataset(periods=50)
+    for i in range(3):
+        cache.put(i, (), dataset)
+    assert cache.stats()["entries"] == 1
+    assert cache.get(0, ()) is None
+    assert cache.get(2, ()) is not None
+    assert cache.stats()["evictions"] == 2
+
+
+def test_append_segments(tmp_path):
+    MEMORY_CACHE.clear()
+    dataset = create_dummy_dataset(periods=100)
+    full = dataset.data.copy()
+    dataset.data = full.iloc[:90]
+    dataset.save(tmp_path)
+    assert get_segment_paths("cpi", tmp_path, "parquet") == []
+    read_dataset("cpi", tmp_path)
+
+    dataset.data = full.copy()
+    dataset.data.iloc[85, 0] = -1
+    dataset.save(tmp_path)
+    segments = get_segment_paths("cpi", tmp_path, "parquet")
+    assert [x.name for x in segments] == ["00000-85.parquet"]
+    pd.testing.assert_frame_equal(
+        read_dataset("cpi", tmp_path).data, dataset.data, check_freq=False
+    )
+
+    dataset.save(tmp_path)
+    assert len(get_segment_paths("cpi", tmp_path, "parquet")) == 1
+
+    compact("cpi", tmp_path)
+    assert get_segment_paths("cpi", tmp_path, "parquet") == []
+    pd.testing.assert_frame_equal(
+        read_dataset("cpi", tmp_path).data, dataset.data, check_freq=False
+    )
+
+
+def test_append_full_rewrite(tmp_path):
+    dataset = create_dummy_dataset(periods=100)
+    full = dataset.data.copy()
+    dataset.data = full.iloc[:90]
+    dataset.save(tmp_path)
+
+    # Revisions older than the revision window rewrite the whole file
+    dataset.data = full.copy()
+    dataset.data.iloc[10, 0] = -1
+    dataset.save(tmp_path)
+    assert get_segment_paths("cpi", tmp_path, "parquet") == []
+    pd.testing.assert_frame_equal(
+        read_dataset("cpi", tmp_path).data, dataset.data, check_freq=False
+    )
+
+    for i in range(MAX_SEGMENTS):
+        dataset.data = pd.concat(
+            [
+                dataset.data,
+                full.iloc[[-1]].set_axis(
+                    [full.index[-1] + (i + 1) * pd.offsets.MonthEnd()]
+                ),
+            ]
+        )
+        dataset.save(tmp_path)
+    assert len(get_segment_paths("cpi", tmp_path, "parquet")) == MAX_SEGMENTS
+    dataset.data.iloc[-1, 0] = -1
+    dataset.save(tmp_path)
+    assert get_segment_paths("cpi", tmp_path, "parquet") == []
+    pd.testing.assert_frame_equal(
+        read_dataset("cpi", tmp_path).data, dataset.data, check_freq=False
+    )
+
+
+def test_vintages(tmp_path):
+    dataset = create_dummy_dataset(periods=200)
+    full = dataset.data.copy()
+    dataset.data = full.iloc[:190]
+    dataset.metadata.created_at = dt.datetime(2024, 1, 5, 10)
+    save_vintage(dataset, tmp_path)
+    objects = list((tmp_path / "vintages" / "objects").rglob("*.arrow"))
+
+    assert save_vintage(dataset, tmp_path) is None
+    second = create_dummy_dataset(periods=200)
+    second.data = full.copy()
+    second.metadata.created_at = dt.datetime(2024, 2, 5, 10)
+    save_vintage(second, tmp_path)
+    assert list_vintages("cpi", tmp_path) == [
+        dt.datetime(2024, 1, 5, 10),
+        dt.datetime(2024, 2, 5, 10),
+    ]
+    # Only the last chunk of the index and each column changed, plus a new one
+    new_objects = list((tmp_path / "vintages" / "objects").rglob("*.arrow"))
+    assert len(new_objects) - len(objects) == 8
+
+    assert read_vintage("cpi", tmp_path, "2024-01-04") is None
+    old = load_dataset("cpi", tmp_path, as_of="2024-01-05")
+    pd.testing.assert_frame_equal(old.data, dataset.data, check_freq=False)
+    assert old.metadata.created_at == dt.datetime(2024, 1, 5, 10)
+    assert old.metadata.indicator_metadata == dataset.metadata.indicator_metadata
+    new = load_dataset("cpi", tmp_path, as_of=dt.datetime(2024, 3, 1))
+    pd.testing.assert_frame_equal(new.data, full, check_freq=False)
+    with pytest.raises(ValueError):
+        load_dataset("cpi", tmp_path, as_of="2023-12-31")
+
+
+def test_clear_vintages(tmp_path):
+    objects_dir = tmp_path / "vintages" / "objects"
+    full = create_dummy_dataset(periods=200).data
+    for i, periods in enumerate([190, 195, 200]):
+        dataset = create_dummy_dataset(periods=200)
+        dataset.data = full.iloc[:periods]
+        dataset.metadata.created_at = dt.datetime(2024, i + 1, 5)
+        save_vintage(dataset, tmp_path)
+    before = len(list(objects_dir.rglob("*.arrow")))
+
+    assert clear_vintages(tmp_path, "cpi", keep=1) == 2
+    assert list_vintages("cpi", tmp_path) == [dt.datetime(2024, 3, 5)]
+    assert len(list(objects_dir.rglob("*.arrow"))) < before
+    pd.testing.assert_frame_equal(
+        read_vintage("cpi", tmp_path, "2024-03-05").data, full, check_freq=False
+    )
+    assert clear_vintages(tmp_path) == 1
+    assert list_vintages("cpi", tmp_path) == []
+    assert list(objects_dir.rglob("*.arrow")) == []
+
+
+def test_file_lock_excludes_threads(tmp_path):
+    events = []
+
+    def worker(i):
+        with dataset_lock("cpi", tmp_path):
+            events.append(("start", i))
+            time.sleep(0.05)
+            events.append(("end", i))
+
+    with futures.ThreadPoolExecutor(4) as executor:
+        list(executor.map(worker, range(4)))
+    for i in range(0, len(events), 2):
+        assert events[i][0] == "start" and events[i + 1] == ("end", events[i][1])
+
+    lock = dataset_lock("cpi", tmp_path, timeout=0.1)
+    with dataset_lock("cpi", tmp_path):
+        with pytest.raises(TimeoutError):
+            lock.acquire()
+    with dataset_lock("cpi", tmp_path, shared=True):
+        with dataset_lock("cpi", tmp_path, shared=True, timeout=0.1):
+            pass
+
+
+def test_single_flight(tmp_path, monkeypatch):
+    calls = []
+
+    def retriever():
+        calls.append(1)
+        time.sleep(0.2)
+        return create_dummy_dataset("dummy_flight")
+
+    monkeypatch.setattr(prices, "dummy_flight", retriever, raising=False)
+    monkeypatch.setitem(
+        REGISTRY.registry, "dummy_flight", {"function": "prices.dummy_flight"}
+    )
+    with futures.ThreadPoolExecutor(4) as executor:
+        results = list(
+            executor.map(
+                lambda _: load_dataset("dummy_flight", tmp_path, skip_cache=True),
+                range(4),
+            )
+        )
+    assert len(calls) == 1
+    for result in results[1:]:
+        pd.testing.assert_frame_equal(result.data, results[0].data, check_freq=False)
+    assert not list(tmp_path.glob(".*.tmp"))
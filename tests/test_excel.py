@@ -0,0 +1,103 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from econuy.utils import excel
+from econuy.utils.raw_cache import write_entry
+
+
+def create_workbook() -> bytes:
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer, engine="openpyxl") as writer:
+        pd.DataFrame({"a": [1, 2, 3]}).to_excel(writer, sheet_name="first")
+        pd.DataFrame({"b": [4.5, 5.5]}).to_excel(writer, sheet_name="second")
+    return buffer.getvalue()
+
+
+def test_excel_engine(monkeypatch):
+    monkeypatch.setenv("ECONUY_EXCEL_ENGINE", "default")
+    assert excel.get_excel_engine() is None
+    monkeypatch.setenv("ECONUY_EXCEL_ENGINE", "openpyxl")
+    assert excel.get_excel_engine() == "openpyxl"
+    monkeypatch.setenv("ECONUY_EXCEL_ENGINE", "fast")
+    with pytest.raises(ValueError):
+        excel.get_excel_engine()
+    monkeypatch.setenv("ECONUY_EXCEL_ENGINE", "auto")
+    expected = "calamine" if excel.engine_available("calamine") else None
+    assert excel.get_excel_engine() == expected
+
+
+def test_read_excel_fallback(tmp_path):
+    body = create_workbook()
+    expected = pd.read_excel(io.BytesIO(body), sheet_name="second", index_col=0)
+
+    # xlrd cannot parse xlsx workbooks, which are read with the default engine
+    with pytest.warns(UserWarning, match="xlrd"):
+        output = excel.read_excel(
+            io.BytesIO(body), engine="xlrd", sheet_name="second", index_col=0
+        )
+    pd.testing.assert_frame_equal(output, expected)
+    with pytest.warns(UserWarning, match="xlrd"):
+        with excel.open_excel(io.BytesIO(body), engine="xlrd") as xls:
+            output = excel.read_excel(xls, sheet_name="second", index_col=0)
+    pd.testing.assert_frame_equal(output, expected)
+
+    # Other errors are not retried
+    with pytest.raises(ValueError, match="third"):
+        excel.read_excel(io.BytesIO(body), engine="openpyxl", sheet_name="third")
+    with pytest.raises(FileNotFoundError):
+        excel.open_excel(tmp_path / "missing.xlsx", engine="openpyxl")
+
+
+def test_benchmark_engines(tmp_path):
+    body = create_workbook()
+    assert excel.get_workbook_format(body) == "xlsx"
+    write_entry("https://example.com/workbook.xlsx", body, tmp_path)
+    write_entry("https://example.com/data.csv", b"a,b\n1,2\n", tmp_path)
+    assert list(excel.find_recorded_workbooks(tmp_path)) == [
+        "https://example.com/workbook.xlsx"
+    ]
+
+    results = excel.benchmark_engines(data_dir=tmp_path, repeat=1)
+    assert list(results.index) == ["https://example.com/workbook.xlsx"]
+    assert results.loc[:, "openpyxl"].gt(0).all()
+    if "xlrd" in results:
+        # xlrd only reads xls workbooks
+        assert np.isnan(results["xlrd"]).all()
+
+
+def test_read_excel_sheets(tmp_path, monkeypatch):
+    body = create_workbook()
+    expected = pd.read_excel(io.BytesIO(body), sheet_name=None, index_col=0)
+    (tmp_path / "workbook.xlsx").write_bytes(body)
+    assert excel.get_workbook_format(tmp_path / "workbook.xlsx") == "xlsx"
+    # Paths are opened from disk by the processes that read them
+    monkeypatch.setattr(excel, "_read_bytes", None)
+    for max_workers in [1, 2]:
+        sheets = excel.read_excel_sheets(
+            tmp_path / "workbook.xlsx",
+            engine="openpyxl",
+            max_workers=max_workers,
+            index_col=0,
+        )
+        assert list(sheets) == ["first", "second"]
+        for sheet, frame in sheets.items():
+            pd.testing.assert_frame_equal(frame, expected[sheet])
+    monkeypatch.undo()
+    # A single pool is shared by every call and does not fork
+    pool = excel._POOL
+    assert pool._mp_context.get_start_method() != "fork"
+    excel.read_excel_sheets(body, engine="openpyxl", max_workers=2, index_col=0)
+    assert excel._POOL is pool
+    sheets = excel.read_excel_sheets(body, sheet_names=["second"], index_col=0)
+    assert list(sheets) == ["second"]
+    # xlrd parses every sheet when it opens a workbook, so it is read once
+    assert excel._parses_in_parallel(body, None)
+    assert not excel._parses_in_parallel(b"\xd0\xcf\x11\xe0", None)
+    assert not excel._parses_in_parallel(body, "calamine")
+
+    results = excel.benchmark_sheets({"workbook": body}, max_workers=2, repeat=1)
+    assert results.loc["workbook", "sheets"] == 2
+    assert results.loc[:, ["sequential", "parallel"]].gt(0).all(axis=None)
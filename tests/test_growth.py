@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+import pytest
+from pandas.tseries.offsets import MonthEnd
+
+from econuy.transform.growth import _extend_yoy
+from tests.helpers import create_dummy_dataset
+
+
+def extend_yoy_loop(data: pd.DataFrame, growth: pd.DataFrame) -> pd.DataFrame:
+    """The period by period extension tax_revenue used."""
+    aux = data.copy()
+    growth = growth.loc[[x not in aux.index for x in growth.index]]
+    for col in growth.columns:
+        for date in growth.index:
+            prev_year = date + MonthEnd(-12)
+            aux.loc[date, col] = aux.loc[prev_year, col] * (
+                1 + growth.loc[date, col] / 100
+            )
+    return aux
+
+
+def test_extend_yoy_matches_loop():
+    data = pd.DataFrame(
+        np.random.uniform(1, 100, [60, 3]),
+        index=pd.date_range("2000-01-31", periods=60, freq="ME"),
+        columns=["a", "b", "c"],
+    )
+    growth = pd.DataFrame(
+        np.random.uniform(-10, 10, [30, 2]),
+        index=pd.date_range(data.index[-6], periods=30, freq="ME"),
+        columns=["c", "a"],
+    )
+    growth.iloc[10, 0] = np.nan
+
+    output = _extend_yoy(data, growth)
+    expected = extend_yoy_loop(data, growth)
+    pd.testing.assert_frame_equal(output, expected, check_freq=False)
+    assert output.index[-1] == growth.index[-1]
+    assert output["b"].iloc[60:].isna().all()
+    # The missing rate propagates to the same month of the following years
+    assert output["c"].iloc[[64, 76]].isna().all()
+    # Nothing to extend
+    pd.testing.assert_frame_equal(_extend_yoy(data, growth.iloc[:5]), data)
+
+
+def test_extend_yoy_periods():
+    data = pd.DataFrame(
+        [100.0, 200.0, 300.0, 400.0],
+        index=pd.date_range("2000-03-31", periods=4, freq="QE"),
+    )
+    growth = pd.DataFrame(
+        [10.0, -50.0, 10.0],
+        index=pd.date_range("2001-03-31", periods=3, freq="QE"),
+    )
+    output = _extend_yoy(data, growth)
+    assert output[0].tolist() == pytest.approx(
+        [100.0, 200.0, 300.0, 400.0, 110.0, 100.0, 330.0]
+    )
+    annual = _extend_yoy(data, growth, periods=1)
+    assert annual[0].iloc[4:].tolist() == pytest.approx([440.0, 220.0, 242.0])
+    # Without a frequency, periods are matched with the date a year earlier
+    irregular = _extend_yoy(data.iloc[[0, 1, 3]], growth)
+    assert irregular[0].iloc[:5].tolist() == pytest.approx(
+        [100.0, 200.0, 400.0, 110.0, 100.0]
+    )
+    assert np.isnan(irregular[0].iloc[5])
+
+
+def test_extend_yoy_irregular_index():
+    index = pd.date_range("2000-01-31", periods=60, freq="ME").delete([5, 20])
+    data = pd.DataFrame(
+        np.random.uniform(1, 100, [58, 2]), index=index, columns=["a", "b"]
+    )
+    growth = pd.DataFrame(
+        np.random.uniform(-10, 10, [30, 2]),
+        index=pd.date_range(index[-6], periods=30, freq="ME"),
+        columns=["b", "a"],
+    )
+    output = _extend_yoy(data, growth)
+    expected = extend_yoy_loop(data, growth)
+    pd.testing.assert_frame_equal(output, expected, check_freq=False)
+
+
+def test_extend_yoy_misaligned_growth():
+    data = pd.DataFrame(
+        np.random.uniform(1, 100, [60, 2]),
+        index=pd.date_range("2000-01-31", periods=60, freq="ME"),
+        columns=["a", "b"],
+    )
+    growth = pd.DataFrame(
+        np.random.uniform(-10, 10, [30, 2]),
+        index=pd.date_range("2004-07-01", periods=30, freq="MS"),
+        columns=["a", "b"],
+    )
+    # Month starts are matched with the month ends of the same months
+    output = _extend_yoy(data, growth)
+    expected = extend_yoy_loop(data, growth.set_axis(growth.index + MonthEnd(0)))
+    pd.testing.assert_frame_equal(output, expected, check_freq=False)
+    # Rates that cannot be aligned are matched by date instead
+    early = growth.set_axis(growth.index - pd.DateOffset(years=5))
+    assert _extend_yoy(data, early).index.equals(data.index.union(early.index))
+
+
+def test_dataset_extend_yoy():
+    dataset = create_dummy_dataset("cpi", periods=48)
+    indicator = dataset.indicators[0]
+    index = pd.date_range(dataset.data.index[-1], periods=13, freq="ME")[1:]
+    growth = pd.DataFrame({indicator: 5.0}, index=index)
+    extended = dataset.extend_yoy(growth)
+    assert extended.transformed and extended.name == "cpi"
+    assert list(extended.data.columns) == list(dataset.data.columns)
+    assert extended.data.index[-1] == index[-1]
+    np.testing.assert_allclose(
+        extended.data[indicator].iloc[-12:], dataset.data[indicator].iloc[-12:] * 1.05
+    )
+    assert extended.metadata.indicator_metadata[indicator]["transformations"][-1] == {
+        "extend_yoy": {"end_date": index[-1].strftime("%Y-%m-%d")}
+    }
+    with pytest.raises(AssertionError):
+        dataset.extend_yoy(growth.rename(columns={indicator: "other"}))
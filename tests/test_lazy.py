@@ -0,0 +1,103 @@
+import pandas as pd
+import pytest
+
+from econuy import load
+from econuy.lazy import collect_all
+from tests.helpers import create_dummy_dataset
+
+
+def assert_same_dataset(output, expected):
+    pd.testing.assert_frame_equal(output.data, expected.data)
+    assert output.metadata.indicator_metadata == expected.metadata.indicator_metadata
+    assert output.transformed == expected.transformed
+
+
+def test_lazy_matches_eager():
+    dataset = create_dummy_dataset("cpi", periods=120)
+    original = dataset.metadata.to_dict()["indicator_metadata"]
+    lazy = (
+        dataset.lazy()
+        .resample("QE-DEC", operation="sum")
+        .rolling(window=4, operation="sum")
+        .chg_diff(operation="chg", period="inter")
+        .filter(start_date="2003-01-01")
+    )
+    assert len(lazy.plan) == 4 and len(dataset.lazy().plan) == 0
+    output = lazy.collect()
+    expected = (
+        dataset.resample("QE-DEC", operation="sum")
+        .rolling(window=4, operation="sum")
+        .chg_diff(operation="chg", period="inter")
+        .filter(start_date="2003-01-01")
+    )
+    assert_same_dataset(output, expected)
+    assert output.metadata.indicator_metadata["cpi_0"]["frequency"] == "QE-DEC"
+    assert dataset.metadata.to_dict()["indicator_metadata"] == original
+    assert dataset.lazy().collect() is dataset
+
+
+def test_lazy_split_metadata():
+    dataset = create_dummy_dataset("cpi", periods=120)
+    for i, indicator in enumerate(dataset.indicators):
+        metadata = dataset.metadata.indicator_metadata[indicator].copy()
+        metadata["transformations"] = []
+        metadata["unit"] = f"Test {i}"
+        dataset.metadata.indicator_metadata[indicator] = metadata
+    dataset.metadata.update_indicator_metadata_value("cpi_1", "cumulative_periods", 3)
+    dataset.data.iloc[:7, 2] = float("nan")
+
+    def chain(x):
+        # The units converge after chg_diff, and the cumulative periods after
+        # rolling
+        return (
+            x.resample("QE-DEC", operation="sum")
+            .chg_diff(operation="diff", period="last")
+            .rolling(window=2, operation="mean")
+            .rebase(start_date="2005-03-31", end_date="2005-12-31")
+        )
+
+    output = chain(dataset.lazy()).collect()
+    assert_same_dataset(output, chain(dataset))
+    assert output.metadata.has_common_metadata
+
+
+def test_lazy_shares_converters(monkeypatch):
+    converters = {
+        "cpi": create_dummy_dataset("cpi", periods=120, n_cols=1),
+        "nxr_monthly": create_dummy_dataset("nxr_monthly", periods=120, n_cols=2),
+    }
+    loads = []
+
+    def fake_load_dataset(name, *args, **kwargs):
+        loads.append(name)
+        return converters[name]
+
+    monkeypatch.setattr(load, "load_dataset", fake_load_dataset)
+    datasets = [create_dummy_dataset("ppi", periods=120) for _ in range(2)]
+    outputs = collect_all(
+        [
+            dataset.lazy()
+            .convert("real", start_date="2005-01-31")
+            .resample("QE-DEC", operation="sum")
+            .convert("usd", error_handling="coerce")
+            for dataset in datasets
+        ]
+    )
+    assert sorted(loads) == ["cpi", "nxr_monthly"]
+    for dataset, output in zip(datasets, outputs):
+        expected = (
+            dataset.convert("real", start_date="2005-01-31")
+            .resample("QE-DEC", operation="sum")
+            .convert("usd", error_handling="coerce")
+        )
+        assert_same_dataset(output, expected)
+
+
+def test_lazy_validates_steps():
+    lazy = create_dummy_dataset("cpi").lazy()
+    with pytest.raises(ValueError):
+        lazy.resample("QE-DEC", operation="median")
+    with pytest.raises(ValueError):
+        lazy.chg_diff(period="monthly")
+    with pytest.raises(AssertionError):
+        lazy.convert("eur")
@@ -0,0 +1,881 @@
+import asyncio
+import datetime as dt
+import graphlib
+import hashlib
+import io
+import threading
+import time
+
+import httpx
+import pandas as pd
+import pytest
+
+from econuy import aload_dataset, aload_datasets, load_dataset, load_datasets_parallel
+from econuy import load, refresh
+from econuy.load import is_outdated, get_dependency_graph
+from econuy.retrieval import prices
+from econuy.utils.operations import (
+    REGISTRY,
+    discover_dependencies,
+    get_download_sources,
+    get_prefetchable_sources,
+    read_checked_at,
+    read_created_at,
+)
+from econuy.utils import retrieval, throttling
+from econuy.utils.frozen import clear_frozen, get_parser_digest, read_frozen_source
+from econuy.utils.raw_cache import (
+    get_object_path,
+    get_url_key,
+    offline_mode,
+    prune_raw_cache,
+    read_entry,
+    recording_downloads,
+    write_entry,
+)
+from econuy.utils.throttling import HostLimiter, get_host_providers, get_limits
+from econuy.utils.retrieval import (
+    download,
+    download_to_file,
+    get_client,
+    get_provider,
+    http_get,
+    open_workbook,
+    sharing_workbooks,
+    WorkbookCache,
+)
+from tests.helpers import create_dummy_dataset
+
+
+def test_is_outdated_ttl():
+    now = dt.datetime(2024, 5, 10, 12)
+    assert is_outdated("call_rate", now - dt.timedelta(days=2), now)
+    assert not is_outdated("call_rate", now - dt.timedelta(hours=2), now)
+    assert REGISTRY["cpi"]["refresh"]["ttl"] == "3D"
+    assert not is_outdated("cpi", now - dt.timedelta(days=2), now)
+    assert is_outdated("cpi", now - dt.timedelta(days=4), now)
+
+
+@pytest.mark.parametrize(
+    "policy,created_at,now,expected",
+    [
+        ({"cadence": "monthly", "day": 15}, (2024, 5, 1), (2024, 5, 14), False),
+        ({"cadence": "monthly", "day": 15}, (2024, 5, 1), (2024, 5, 15), True),
+        ({"cadence": "monthly", "day": 31}, (2024, 2, 1), (2024, 2, 29), True),
+        ({"cadence": "quarterly", "day": 20}, (2024, 3, 21), (2024, 6, 19), False),
+        ({"cadence": "quarterly", "day": 20}, (2024, 3, 21), (2024, 6, 20), True),
+        ({"cadence": "annual", "months": [4]}, (2023, 4, 2), (2024, 3, 31), False),
+        ({"cadence": "annual", "months": [4]}, (2023, 4, 2), (2024, 4, 1), True),
+    ],
+)
+def test_is_outdated_cadence(policy, created_at, now, expected, monkeypatch):
+    monkeypatch.setitem(REGISTRY.registry, "cpi", REGISTRY["cpi"] | {"refresh": policy})
+    created_at, now = dt.datetime(*created_at), dt.datetime(*now)
+    assert is_outdated("cpi", created_at, now) == expected
+
+
+def test_registry_cadence():
+    name = "national_accounts_supply_constant_nsa"
+    assert REGISTRY[name]["refresh"] == {"cadence": "quarterly", "day": 15}
+    created_at = dt.datetime(2024, 3, 16)
+    assert not is_outdated(name, created_at, dt.datetime(2024, 6, 14))
+    assert is_outdated(name, created_at, dt.datetime(2024, 6, 15))
+    assert load.get_next_refresh("income_household", created_at) == dt.datetime(
+        2024, 5, 15
+    )
+    for name in REGISTRY.list_available():
+        assert load.get_next_refresh(name, created_at) > created_at
+
+
+def test_cadence_late_publication(tmp_path, monkeypatch):
+    policy = {"cadence": "monthly", "day": 15}
+    monkeypatch.setitem(REGISTRY.registry, "cpi", REGISTRY["cpi"] | {"refresh": policy})
+    created_at = dt.datetime(2024, 1, 20)
+    # Checked on the publication day but not published yet: checked again daily
+    checked_at = dt.datetime(2024, 2, 15, 9)
+    assert load.get_next_refresh("cpi", created_at, checked_at) == dt.datetime(
+        2024, 2, 16, 9
+    )
+    assert is_outdated("cpi", created_at, dt.datetime(2024, 2, 16, 9), checked_at)
+    # Past the grace window, wait for the next publication
+    checked_at = dt.datetime(2024, 3, 1)
+    assert load.get_next_refresh("cpi", created_at, checked_at) == dt.datetime(
+        2024, 3, 15
+    )
+
+    monkeypatch.setitem(
+        REGISTRY.registry,
+        "dummy_late",
+        {"function": "prices.dummy_late", "refresh": policy},
+    )
+    old = create_dummy_dataset("dummy_late")
+    old.metadata.created_at = created_at
+    old.save(tmp_path)
+    data = {"current": old.data}
+
+    def retriever():
+        dataset = create_dummy_dataset("dummy_late")
+        dataset.data = data["current"].copy()
+        return dataset
+
+    monkeypatch.setattr(prices, "dummy_late", retriever, raising=False)
+    # The source has not published: the data is not fresh, only checked
+    load_dataset("dummy_late", tmp_path)
+    assert read_created_at("dummy_late", tmp_path) == created_at
+    assert read_checked_at("dummy_late", tmp_path) > created_at
+    # The source publishes late: the data is fresh
+    data["current"] = old.data.copy()
+    data["current"].iloc[-1] += 1
+    load_dataset("dummy_late", tmp_path, skip_cache=True)
+    assert read_created_at("dummy_late", tmp_path) > created_at
+    assert read_checked_at("dummy_late", tmp_path) == read_created_at(
+        "dummy_late", tmp_path
+    )
+
+
+def test_declared_dependencies(tmp_path):
+    for name, entry in REGISTRY.registry.items():
+        discovered = discover_dependencies(entry["function"], REGISTRY.registry)
+        assert REGISTRY.get_dependencies(name) == discovered
+    graph = get_dependency_graph(["gdp_denominator", "cpi"], tmp_path)
+    assert graph == {
+        "cpi": [],
+        "gdp_denominator": ["nxr_monthly", "gdp_current_nsa_extended"],
+        "nxr_monthly": ["nxr_daily"],
+        "nxr_daily": [],
+        "gdp_current_nsa_extended": ["national_accounts_supply_current_nsa"],
+        "national_accounts_supply_current_nsa": [],
+    }
+    create_dummy_dataset("gdp_current_nsa_extended").save(tmp_path)
+    create_dummy_dataset("nxr_monthly").save(tmp_path)
+    graph = get_dependency_graph(["gdp_denominator"], tmp_path)
+    assert graph == {
+        "gdp_denominator": ["nxr_monthly", "gdp_current_nsa_extended"],
+        "nxr_monthly": [],
+        "gdp_current_nsa_extended": [],
+    }
+    # Conversions load the datasets of their flavor
+    assert discover_dependencies("labor.real_wages", REGISTRY.registry) == [
+        "nominal_wages",
+        "cpi",
+    ]
+
+
+def test_scheduled_parallel_load(tmp_path, monkeypatch):
+    calls = []
+
+    def make_retriever(name, dependencies):
+        def retriever(*args, **kwargs):
+            for dependency in dependencies:
+                load_dataset(dependency, *args, **kwargs)
+            calls.append(name)
+            time.sleep(0.05)
+            return create_dummy_dataset(name)
+
+        return retriever
+
+    graph = {"dummy_base": [], "dummy_a": ["dummy_base"], "dummy_b": ["dummy_base"]}
+    for name, dependencies in graph.items():
+        monkeypatch.setattr(
+            prices, name, make_retriever(name, dependencies), raising=False
+        )
+        monkeypatch.setitem(
+            REGISTRY.registry,
+            name,
+            {"function": f"prices.{name}", "dependencies": dependencies},
+        )
+
+    datasets = load_datasets_parallel(
+        ["dummy_a", "dummy_b"], data_dir=tmp_path, skip_cache=True
+    )
+    assert set(datasets) == {"dummy_a", "dummy_b"}
+    assert calls[0] == "dummy_base"
+    assert sorted(calls) == ["dummy_a", "dummy_b", "dummy_base"]
+
+    monkeypatch.setitem(REGISTRY.registry["dummy_base"], "dependencies", ["dummy_a"])
+    with pytest.raises(graphlib.CycleError):
+        load_datasets_parallel(["dummy_a"], data_dir=tmp_path, skip_cache=True)
+
+
+def test_prefetchable_sources():
+    assert get_prefetchable_sources(REGISTRY["cpi"]["function"]) == ["main"]
+    function_string = REGISTRY["diesel_sales"]["function"]
+    assert get_prefetchable_sources(function_string) == []
+
+
+def test_aload_datasets(tmp_path, monkeypatch):
+    url = "https://example.com/dummy.csv"
+    requests = []
+
+    def handler(request):
+        requests.append(str(request.url))
+        body = create_dummy_dataset("dummy_async").data.to_csv()
+        return httpx.Response(200, content=body.encode())
+
+    def retriever():
+        sources = get_download_sources("dummy_async")
+        data = pd.read_csv(download(sources["main"]), index_col=0, parse_dates=True)
+        dataset = create_dummy_dataset("dummy_async")
+        dataset.data = data
+        return dataset
+
+    monkeypatch.setattr(prices, "dummy_async", retriever, raising=False)
+    monkeypatch.setitem(
+        REGISTRY.registry,
+        "dummy_async",
+        {"function": "prices.dummy_async", "sources": {"downloads": {"main": url}}},
+    )
+    monkeypatch.setattr(load, "get_prefetchable_sources", lambda x: ["main"])
+
+    async def run():
+        transport = httpx.MockTransport(handler)
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await aload_dataset("dummy_async", tmp_path, client=client)
+
+    dataset = asyncio.run(run())
+    assert requests == [url]
+    assert dataset.data.shape == (100, 3)
+
+    create_dummy_dataset("cpi").save(tmp_path)
+    datasets = asyncio.run(aload_datasets(["cpi", "dummy_async"], tmp_path))
+    assert set(datasets) == {"cpi", "dummy_async"}
+    assert len(requests) == 1
+
+
+def test_shared_clients(monkeypatch):
+    assert get_provider("https://www.bcu.gub.uy/file.xlsx") == "bcu"
+    assert get_provider("https://www.ine.gub.uy/file.xlsx") == "ine"
+    assert get_provider("https://example.com/file.csv") == "default"
+
+    requests = []
+
+    def handler(request):
+        requests.append(str(request.url))
+        return httpx.Response(200, content=b"a,b\n1,2\n")
+
+    monkeypatch.setattr(retrieval, "CLIENT_CONFIG", dict(retrieval.CLIENT_CONFIG))
+    retrieval.configure_clients(transport=httpx.MockTransport(handler))
+    try:
+        assert get_client("bcu") is get_client("bcu")
+        assert get_client("bcu") is not get_client("ine")
+        data = pd.read_csv(download("https://www.bcu.gub.uy/file.csv"))
+        assert data.shape == (1, 2)
+        assert requests == ["https://www.bcu.gub.uy/file.csv"]
+    finally:
+        retrieval.close_clients()
+
+
+def test_conditional_get_reuses_dataset(tmp_path, monkeypatch):
+    url = "https://example.com/dummy.csv"
+    server = {"etag": '"v1"'}
+    requests = []
+    calls = []
+
+    def handler(request):
+        requests.append(request.headers.get("If-None-Match"))
+        if request.headers.get("If-None-Match") == server["etag"]:
+            return httpx.Response(304)
+        return httpx.Response(200, content=body, headers={"ETag": server["etag"]})
+
+    def retriever():
+        calls.append(1)
+        sources = get_download_sources("dummy_etag")
+        dataset = create_dummy_dataset("dummy_etag")
+        dataset.data = pd.read_csv(
+            download(sources["main"]), index_col=0, parse_dates=True
+        )
+        return dataset
+
+    monkeypatch.setattr(prices, "dummy_etag", retriever, raising=False)
+    monkeypatch.setitem(
+        REGISTRY.registry,
+        "dummy_etag",
+        {"function": "prices.dummy_etag", "sources": {"downloads": {"main": url}}},
+    )
+    monkeypatch.setattr(load, "get_prefetchable_sources", lambda x: ["main"])
+    monkeypatch.setattr(load, "is_outdated", lambda *args, **kwargs: True)
+    body = create_dummy_dataset("dummy_etag").data.to_csv().encode()
+    monkeypatch.setattr(retrieval, "CLIENT_CONFIG", dict(retrieval.CLIENT_CONFIG))
+    retrieval.configure_clients(transport=httpx.MockTransport(handler))
+    try:
+        first = load_dataset("dummy_etag", tmp_path)
+        assert requests == [None] and len(calls) == 1
+
+        # Unchanged sources are revalidated and the parsed dataset is reused
+        second = load_dataset("dummy_etag", tmp_path)
+        assert requests == [None, '"v1"'] and len(calls) == 1
+        pd.testing.assert_frame_equal(first.data, second.data, check_freq=False)
+        assert second.metadata.created_at == first.metadata.created_at
+        assert read_checked_at("dummy_etag", tmp_path) > first.metadata.created_at
+
+        # Changed sources are downloaded once and parsed again
+        server["etag"] = '"v2"'
+        load_dataset("dummy_etag", tmp_path)
+        assert requests == [None, '"v1"', '"v1"', '"v2"'] and len(calls) == 2
+    finally:
+        retrieval.close_clients()
+
+
+def test_offline_replay(tmp_path, monkeypatch):
+    urls = ["https://example.com/a.csv", "https://example.com/b.csv"]
+    requests = []
+
+    def handler(request):
+        requests.append(str(request.url))
+        return httpx.Response(200, content=body)
+
+    def retriever():
+        sources = get_download_sources("dummy_offline")
+        dataset = create_dummy_dataset("dummy_offline")
+        dataset.data = pd.read_csv(
+            download(sources["a"]), index_col=0, parse_dates=True
+        )
+        assert http_get(sources["b"]).content == body
+        return dataset
+
+    monkeypatch.setattr(prices, "dummy_offline", retriever, raising=False)
+    monkeypatch.setitem(
+        REGISTRY.registry,
+        "dummy_offline",
+        {
+            "function": "prices.dummy_offline",
+            "sources": {"downloads": dict(zip(["a", "b"], urls))},
+        },
+    )
+    body = create_dummy_dataset("dummy_offline").data.to_csv().encode()
+    monkeypatch.setattr(retrieval, "CLIENT_CONFIG", dict(retrieval.CLIENT_CONFIG))
+    retrieval.configure_clients(transport=httpx.MockTransport(handler))
+    try:
+        online = load_dataset("dummy_offline", tmp_path)
+        assert requests == urls
+        # Both URLs serve the same body, which is stored once
+        objects = [x for x in (tmp_path / "raw" / "objects").rglob("*") if x.is_file()]
+        assert len(objects) == 1
+
+        offline = load_dataset("dummy_offline", tmp_path, skip_cache=True, offline=True)
+        assert requests == urls
+        pd.testing.assert_frame_equal(online.data, offline.data, check_freq=False)
+
+        (tmp_path / "raw" / "urls" / f"{get_url_key(urls[1])}.json").unlink()
+        with pytest.raises(FileNotFoundError):
+            load_dataset("dummy_offline", tmp_path, skip_cache=True, offline=True)
+    finally:
+        retrieval.close_clients()
+
+
+def test_aload_raw_cache(tmp_path, monkeypatch):
+    url = "https://example.com/dummy.csv"
+    requests = []
+
+    def handler(request):
+        requests.append(request.headers.get("If-None-Match"))
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, content=body, headers={"ETag": '"v1"'})
+
+    def retriever():
+        sources = get_download_sources("dummy_aload_raw")
+        dataset = create_dummy_dataset("dummy_aload_raw")
+        dataset.data = pd.read_csv(
+            download(sources["main"]), index_col=0, parse_dates=True
+        )
+        return dataset
+
+    monkeypatch.setattr(prices, "dummy_aload_raw", retriever, raising=False)
+    monkeypatch.setitem(
+        REGISTRY.registry,
+        "dummy_aload_raw",
+        {"function": "prices.dummy_aload_raw", "sources": {"downloads": {"main": url}}},
+    )
+    monkeypatch.setattr(load, "get_prefetchable_sources", lambda x: ["main"])
+    monkeypatch.setattr(load, "is_outdated", lambda *args, **kwargs: True)
+    body = create_dummy_dataset("dummy_aload_raw").data.to_csv().encode()
+    monkeypatch.setattr(retrieval, "CLIENT_CONFIG", dict(retrieval.CLIENT_CONFIG))
+    retrieval.configure_clients(transport=httpx.MockTransport(handler))
+
+    async def run():
+        transport = httpx.MockTransport(handler)
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await aload_dataset("dummy_aload_raw", tmp_path, client=client)
+
+    try:
+        online = asyncio.run(run())
+        assert requests == [None]
+        # Prefetched bodies are stored and their sources revalidated next time
+        assert (tmp_path / "raw" / "urls" / f"{get_url_key(url)}.json").exists()
+        asyncio.run(run())
+        assert requests == [None, '"v1"']
+
+        offline = load_dataset(
+            "dummy_aload_raw", tmp_path, skip_cache=True, offline=True
+        )
+        assert requests == [None, '"v1"']
+        pd.testing.assert_frame_equal(online.data, offline.data, check_freq=False)
+    finally:
+        retrieval.close_clients()
+
+
+def test_raw_cache_keys_params(tmp_path, monkeypatch):
+    url = "https://example.com/rates"
+
+    def handler(request):
+        return httpx.Response(200, content=request.url.params["c"].encode())
+
+    monkeypatch.setattr(retrieval, "CLIENT_CONFIG", dict(retrieval.CLIENT_CONFIG))
+    retrieval.configure_clients(transport=httpx.MockTransport(handler))
+    try:
+        with recording_downloads(tmp_path) as downloaded:
+            assert http_get(url, params={"c": "EUR"}).content == b"EUR"
+            assert http_get(url, params={"c": "USD"}).content == b"USD"
+        assert set(downloaded) == {f"{url}?c=EUR", f"{url}?c=USD"}
+
+        # Each query is replayed with its own body
+        with recording_downloads(tmp_path), offline_mode(True):
+            assert http_get(url, params={"c": "EUR"}).content == b"EUR"
+            download_to_file(url, tmp_path / "usd", params={"c": "USD"})
+            assert (tmp_path / "usd").read_bytes() == b"USD"
+    finally:
+        retrieval.close_clients()
+
+
+def test_host_limits(tmp_path, monkeypatch):
+    assert get_host_providers()["www.bcu.gub.uy"] == "BCU"
+    assert get_host_providers()["www5.ine.gub.uy"] == "INE"
+    assert get_limits("www.bcu.gub.uy") == throttling.PROVIDER_LIMITS["BCU"]
+    monkeypatch.setenv("ECONUY_HOST_LIMITS", '{"BCU": {"rate": 1}}')
+    assert get_limits("www.bcu.gub.uy")["rate"] == 1
+    assert get_limits("example.com") == throttling.DEFAULT_LIMITS
+    monkeypatch.delenv("ECONUY_HOST_LIMITS")
+
+    # Limiters of different processes share slots through lock files
+    try:
+        throttling.share_limits(tmp_path, 0.5)
+        limiter = throttling.get_limiter("https://www.bcu.gub.uy/x")
+        assert limiter.max_concurrency == 4 and limiter.rate == 2.0
+        assert limiter.slots_dir == tmp_path / "www.bcu.gub.uy"
+    finally:
+        throttling.share_limits(None)
+    first = HostLimiter(max_concurrency=1, slots_dir=tmp_path / "host")
+    second = HostLimiter(max_concurrency=1, slots_dir=tmp_path / "host")
+    assert first.try_acquire() == 0
+    assert second.try_acquire() > 0
+    first.release()
+    assert second.try_acquire() == 0
+    second.release()
+
+    limiter = HostLimiter(max_concurrency=2, rate=20)
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def request():
+        with limiter.limit():
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            time.sleep(0.02)
+            with lock:
+                active.pop()
+
+    start = time.monotonic()
+    threads = [threading.Thread(target=request) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert max(peak) == 2
+    # A burst of 2 requests, then one every 50 ms
+    assert time.monotonic() - start >= 0.25
+
+
+def test_request_retries_and_circuit_breaker(monkeypatch):
+    statuses = {"flaky.example.com": [503, 503, 200], "down.example.com": []}
+    requests = []
+
+    def handler(request):
+        requests.append(request.url.host)
+        remaining = statuses[request.url.host]
+        if not remaining:
+            raise httpx.ConnectError("down", request=request)
+        return httpx.Response(remaining.pop(0))
+
+    monkeypatch.setattr(throttling, "get_backoff", lambda *args: 0)
+    monkeypatch.setattr(throttling, "_BREAKERS", {})
+    monkeypatch.setattr(retrieval, "CLIENT_CONFIG", dict(retrieval.CLIENT_CONFIG))
+    retrieval.configure_clients(transport=httpx.MockTransport(handler))
+    try:
+        assert http_get("https://flaky.example.com/a").status_code == 200
+        assert requests == ["flaky.example.com"] * 3
+
+        with pytest.raises(httpx.ConnectError):
+            http_get("https://down.example.com/a")
+        assert requests.count("down.example.com") == throttling.MAX_ATTEMPTS
+        # The breaker opens after FAILURE_THRESHOLD consecutive failures
+        with pytest.raises(throttling.CircuitOpenError):
+            http_get("https://down.example.com/b")
+        assert requests.count("down.example.com") == throttling.FAILURE_THRESHOLD
+        # Other hosts are unaffected
+        statuses["flaky.example.com"].append(200)
+        assert http_get("https://flaky.example.com/b").status_code == 200
+    finally:
+        retrieval.close_clients()
+
+    # Fetches made without httpx are retried too
+    calls = []
+
+    def load_page():
+        calls.append(1)
+        if len(calls) < 3:
+            raise TimeoutError("page did not load")
+        return "page"
+
+    assert throttling.call_with_retries(load_page, (TimeoutError,)) == "page"
+    calls.clear()
+    with pytest.raises(TimeoutError):
+        throttling.call_with_retries(load_page, (ValueError,))
+    assert len(calls) == 1
+
+
+def test_cancelled_circuit_trial(monkeypatch):
+    url = "https://slow.example.com/a"
+    breaker = throttling.CircuitBreaker(failure_threshold=1, cooldown=0)
+    monkeypatch.setattr(throttling, "_BREAKERS", {"slow.example.com": breaker})
+    breaker.record_failure()
+    assert breaker.is_open
+
+    async def send():
+        await asyncio.sleep(10)
+
+    async def cancel_trial():
+        task = asyncio.ensure_future(throttling.asend_with_retries(url, send))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_trial())
+    # The cancelled trial does not block later trials, nor close the circuit
+    assert breaker.is_open
+
+    def fail():
+        raise ValueError("invalid request")
+
+    with pytest.raises(ValueError):
+        throttling.send_with_retries(url, fail)
+    response = throttling.send_with_retries(url, lambda: httpx.Response(200))
+    assert response.status_code == 200 and not breaker.is_open
+
+
+def test_download_to_file(tmp_path, monkeypatch):
+    url = "https://example.com/archive.rar"
+    body = bytes(range(256)) * 1000
+    requests = []
+
+    def handler(request):
+        requests.append(request.headers.get("If-None-Match"))
+        if request.headers.get("If-None-Match") == '"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, content=body, headers={"ETag": '"v1"'})
+
+    monkeypatch.setattr(retrieval, "CLIENT_CONFIG", dict(retrieval.CLIENT_CONFIG))
+    retrieval.configure_clients(transport=httpx.MockTransport(handler))
+    try:
+        progress = []
+        limiter = throttling.get_limiter(url)
+        # The host's request slot is held while the body is streamed
+        active = []
+
+        def record(done, total):
+            progress.append((done, total))
+            active.append(limiter._active)
+
+        digest = download_to_file(
+            url,
+            tmp_path / "a.rar",
+            hash_algorithm="md5",
+            progress=record,
+            chunk_size=65536,
+        )
+        assert (tmp_path / "a.rar").read_bytes() == body
+        assert digest == hashlib.md5(body).hexdigest()
+        assert progress[-1] == (len(body), len(body)) and len(progress) > 1
+        assert set(active) == {1} and limiter._active == 0
+
+        # Within a retrieval the file is stored, revalidated and replayed offline
+        with recording_downloads(tmp_path) as downloaded:
+            download_to_file(url, tmp_path / "b.rar")
+            download_to_file(url, tmp_path / "c.rar")
+            with offline_mode(True):
+                download_to_file(url, tmp_path / "d.rar")
+        assert requests == [None, None, '"v1"']
+        assert downloaded == {url: {"etag": '"v1"'}}
+        for name in ["b.rar", "c.rar", "d.rar"]:
+            assert (tmp_path / name).read_bytes() == body
+    finally:
+        retrieval.close_clients()
+
+
+def test_raw_cache_keeps_latest_bodies(tmp_path):
+    digests = [hashlib.sha256(x).hexdigest() for x in [b"v1", b"v2", b"v3"]]
+    write_entry("https://example.com/a", b"v1", tmp_path)
+    write_entry("https://example.com/b", b"v2", tmp_path)
+    write_entry("https://example.com/a", b"v2", tmp_path)
+    assert not get_object_path(digests[0], tmp_path).exists()
+    # Bodies still served by another URL are kept
+    write_entry("https://example.com/a", b"v3", tmp_path)
+    assert get_object_path(digests[1], tmp_path).exists()
+
+    stray = get_object_path(digests[0], tmp_path)
+    stray.write_bytes(b"v1")
+    assert prune_raw_cache(tmp_path) == 2
+    assert not stray.exists()
+    assert get_object_path(digests[2], tmp_path).exists()
+
+
+def test_raw_cache_size_bound(tmp_path, monkeypatch):
+    monkeypatch.setenv("ECONUY_RAW_CACHE_BYTES", "4")
+    for url, body in [("a", b"v1"), ("b", b"v2"), ("c", b"v3")]:
+        write_entry(f"https://example.com/{url}", body, tmp_path)
+    # The least recently downloaded URL is removed
+    assert read_entry("https://example.com/a", tmp_path) is None
+    assert read_entry("https://example.com/b", tmp_path) is not None
+    assert read_entry("https://example.com/c", tmp_path) is not None
+
+    assert prune_raw_cache(tmp_path, max_bytes=2) == 2
+    assert read_entry("https://example.com/b", tmp_path) is None
+    assert read_entry("https://example.com/c", tmp_path) is not None
+
+
+def test_shared_workbooks(tmp_path, monkeypatch):
+    url = "https://example.com/workbook.xlsx"
+    buffer = io.BytesIO()
+    with pd.ExcelWriter(buffer) as writer:
+        pd.DataFrame({"a": [1, 2]}).to_excel(writer, sheet_name="first")
+        pd.DataFrame({"a": [3, 4]}).to_excel(writer, sheet_name="second")
+    requests = []
+
+    def handler(request):
+        requests.append(request.url)
+        return httpx.Response(200, content=buffer.getvalue())
+
+    def make_retriever(name, sheet):
+        def retriever():
+            with open_workbook(url) as xls:
+                assert pd.read_excel(xls, sheet_name=sheet, index_col=0).shape == (2, 1)
+            return create_dummy_dataset(name)
+
+        return retriever
+
+    for name, sheet in [("dummy_first", "first"), ("dummy_second", "second")]:
+        monkeypatch.setattr(prices, name, make_retriever(name, sheet), raising=False)
+        monkeypatch.setitem(
+            REGISTRY.registry,
+            name,
+            {"function": f"prices.{name}", "sources": {"downloads": {"main": url}}},
+        )
+    monkeypatch.setattr(retrieval, "CLIENT_CONFIG", dict(retrieval.CLIENT_CONFIG))
+    retrieval.configure_clients(transport=httpx.MockTransport(handler))
+    try:
+        datasets = load_datasets_parallel(["dummy_first", "dummy_second"], tmp_path)
+        assert len(datasets) == 2 and len(requests) == 1
+        # Outside a run each retriever downloads its workbook
+        load_dataset("dummy_first", tmp_path, skip_cache=True)
+        assert len(requests) == 2
+        # Workbooks are closed once the cache exceeds its size, unless in use
+        workbooks = WorkbookCache(max_bytes=len(buffer.getvalue()))
+        other_url = "https://example.com/other.xlsx"
+        with sharing_workbooks(workbooks):
+            with open_workbook(url), open_workbook(other_url):
+                assert workbooks.current_bytes == 2 * len(buffer.getvalue())
+            # other_url was evicted on exit, while url was still being read
+            assert list(workbooks._workbooks) == [url]
+            with open_workbook(url):
+                pass
+        assert len(requests) == 4
+        assert workbooks.current_bytes == len(buffer.getvalue())
+    finally:
+        retrieval.close_clients()
+
+
+def test_frozen_sources(tmp_path, monkeypatch):
+    urls = {"old": "https://example.com/old.csv", "new": "https://example.com/new.csv"}
+    requests = []
+
+    def handler(request):
+        requests.append(str(request.url))
+        return httpx.Response(200, content=b"value\n1\n2\n")
+
+    def retriever():
+        old = read_frozen_source(
+            "dummy_frozen", "old", lambda url: pd.read_csv(download(url))
+        )
+        new = pd.read_csv(download(urls["new"]))
+        dataset = create_dummy_dataset("dummy_frozen")
+        dataset.data[:] = float(old["value"].sum() + new["value"].sum())
+        return dataset
+
+    monkeypatch.setattr(prices, "dummy_frozen", retriever, raising=False)
+    monkeypatch.setitem(
+        REGISTRY.registry,
+        "dummy_frozen",
+        {
+            "function": "prices.dummy_frozen",
+            "sources": {"downloads": urls, "frozen": ["old"]},
+        },
+    )
+    monkeypatch.setattr(retrieval, "CLIENT_CONFIG", dict(retrieval.CLIENT_CONFIG))
+    retrieval.configure_clients(transport=httpx.MockTransport(handler))
+    try:
+        first = load_dataset("dummy_frozen", tmp_path, skip_cache=True)
+        second = load_dataset("dummy_frozen", tmp_path, skip_cache=True)
+        pd.testing.assert_frame_equal(first.data, second.data)
+        assert requests.count(urls["old"]) == 1 and requests.count(urls["new"]) == 2
+        # Outside a retrieval, and after clearing, frozen sources are parsed again
+        retriever()
+        clear_frozen(tmp_path, "dummy_frozen")
+        load_dataset("dummy_frozen", tmp_path, skip_cache=True)
+        assert requests.count(urls["old"]) == 3
+    finally:
+        retrieval.close_clients()
+
+
+def test_parser_digest():
+    url = "https://example.com/old.csv"
+
+    def make_parser(skiprows, transform):
+        def parse(url):
+            def read():
+                return pd.read_csv(url, skiprows=skiprows)
+
+            return transform(read())
+
+        return parse
+
+    def first(x):
+        return x
+
+    def second(x):
+        return x.iloc[1:]
+
+    digest = get_parser_digest(url, make_parser(1, first))
+    assert digest == get_parser_digest(url, make_parser(1, first))
+    # Closed over values, closed over functions and nested code are hashed
+    assert digest != get_parser_digest(url, make_parser(2, first))
+    assert digest != get_parser_digest(url, make_parser(1, second))
+    assert digest != get_parser_digest(url, make_parser(1, lambda x: x.iloc[1:]))
+    assert digest == get_parser_digest(url, make_parser(1, lambda x: x))
+
+
+def test_stale_while_revalidate(tmp_path, monkeypatch):
+    release = threading.Event()
+    retrieved = []
+
+    def retriever():
+        release.wait(5)
+        dataset = create_dummy_dataset("dummy_swr")
+        dataset.data = old.data.copy()
+        dataset.data.iloc[-1] += 1
+        retrieved.append(dataset)
+        return dataset
+
+    monkeypatch.setattr(prices, "dummy_swr", retriever, raising=False)
+    monkeypatch.setitem(
+        REGISTRY.registry, "dummy_swr", {"function": "prices.dummy_swr"}
+    )
+    monkeypatch.setattr(load, "is_outdated", lambda *args, **kwargs: True)
+    old = create_dummy_dataset("dummy_swr")
+    old.save(tmp_path)
+
+    stale = load_dataset("dummy_swr", tmp_path, stale_while_revalidate=True)
+    assert stale.metadata.stale and not retrieved
+    pd.testing.assert_frame_equal(stale.data, old.data, check_freq=False)
+    datasets = load_datasets_parallel(
+        ["dummy_swr"], tmp_path, stale_while_revalidate=True
+    )
+    assert datasets["dummy_swr"].metadata.stale
+
+    # Both loads share the refresh that is already running
+    future = load.refresh_in_background("dummy_swr", tmp_path)
+    release.set()
+    fresh = future.result(timeout=5)
+    assert len(retrieved) == 1 and not fresh.metadata.stale
+    cached = load_dataset("dummy_swr", tmp_path, skip_update=True)
+    pd.testing.assert_frame_equal(cached.data, fresh.data, check_freq=False)
+    assert not cached.metadata.stale
+
+
+def test_cache_removed_after_check(tmp_path, monkeypatch):
+    retrieved = []
+
+    def retriever():
+        retrieved.append(True)
+        return create_dummy_dataset("dummy_removed")
+
+    monkeypatch.setattr(prices, "dummy_removed", retriever, raising=False)
+    monkeypatch.setitem(
+        REGISTRY.registry, "dummy_removed", {"function": "prices.dummy_removed"}
+    )
+    create_dummy_dataset("dummy_removed").save(tmp_path)
+    # The files are removed between the creation time check and the read
+    read_dataset = load.read_dataset
+    reads = []
+
+    def read_once_removed(*args):
+        reads.append(args)
+        return None if len(reads) == 1 else read_dataset(*args)
+
+    monkeypatch.setattr(load, "read_dataset", read_once_removed)
+
+    dataset = load_dataset("dummy_removed", tmp_path)
+    assert dataset is not None and retrieved == [True]
+
+
+def test_refresh_service(tmp_path, monkeypatch):
+    calls = []
+
+    def retriever():
+        calls.append(len(calls))
+        if len(calls) == 2:
+            raise ValueError("source unavailable")
+        return create_dummy_dataset("dummy_refresh")
+
+    monkeypatch.setattr(prices, "dummy_refresh", retriever, raising=False)
+    monkeypatch.setitem(
+        REGISTRY.registry,
+        "dummy_refresh",
+        {"function": "prices.dummy_refresh", "refresh": {"ttl": "1min"}},
+    )
+
+    entries = refresh.run_once(["dummy_refresh"], tmp_path)
+    assert [entry["status"] for entry in entries] == ["success"]
+    status = refresh.read_status(tmp_path)["dummy_refresh"]
+    assert status["last_success"] and status["failures"] == 0
+    # Fresh datasets are not refreshed again until their policy says so
+    assert refresh.run_once(["dummy_refresh"], tmp_path) == []
+
+    later = dt.datetime.now() + dt.timedelta(minutes=2)
+    monkeypatch.setattr(load, "is_outdated", lambda *args, **kwargs: True)
+    entries = refresh.run_once(["dummy_refresh"], tmp_path, now=later)
+    assert entries[0]["status"] == "error" and "unavailable" in entries[0]["error"]
+    status = refresh.read_status(tmp_path)["dummy_refresh"]
+    assert status["failures"] == 1 and status["last_success"]
+    # Failed datasets are retried with backoff
+    retry_at = dt.datetime.fromisoformat(status["last_attempt"]) + refresh.RETRY_DELAY
+    assert refresh.get_next_run("dummy_refresh", tmp_path) == retry_at
+    assert len(refresh.read_journal(tmp_path, "dummy_refresh")) == 2
+    assert refresh.main(["dummy_refresh", "--data-dir", str(tmp_path), "--once"]) == 0
+
+    # Retrievals that fail validation are not saved
+    monkeypatch.setattr(
+        prices,
+        "dummy_refresh",
+        lambda: create_dummy_dataset("dummy_refresh", n_cols=4),
+        raising=False,
+    )
+    assert refresh.refresh_dataset("dummy_refresh", tmp_path)["status"] == "rejected"
+    assert refresh.read_status(tmp_path)["dummy_refresh"]["failures"] == 2
+
+    # Datasets refreshed elsewhere first are fresh, not failures
+    monkeypatch.setattr(load, "is_outdated", lambda *args, **kwargs: False)
+    assert refresh.refresh_dataset("dummy_refresh", tmp_path)["status"] == "fresh"
+    assert refresh.read_status(tmp_path)["dummy_refresh"]["failures"] == 0
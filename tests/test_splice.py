@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+from pandas.tseries.offsets import MonthEnd
+
+from econuy.transform.splice import _splice
+from tests.helpers import create_dummy_dataset
+
+
+def splice_loop(data: pd.DataFrame, older: pd.DataFrame) -> pd.DataFrame:
+    """The period by period splice the retrievers used."""
+    index = list(dict.fromkeys(list(older.index) + list(data.index)))
+    output = data.reindex(index)
+    for month in reversed(index):
+        if output.loc[month, :].isna().all():
+            next_month = month + MonthEnd(1)
+            output.loc[month, :] = (
+                output.loc[next_month, :]
+                * older.loc[month, :]
+                / older.loc[next_month, :]
+            )
+    return output
+
+
+def test_splice_matches_loop():
+    older = pd.DataFrame(
+        np.random.uniform(1, 100, [120, 3]),
+        index=pd.date_range("2000-01-31", periods=120, freq="ME"),
+    )
+    data = pd.DataFrame(
+        np.random.uniform(1, 100, [80, 3]),
+        index=pd.date_range(older.index[60], periods=80, freq="ME"),
+        columns=["a", "b", "c"],
+    )
+    data.iloc[5] = np.nan
+    older.columns = data.columns
+    older.iloc[10, 1] = np.nan
+
+    output = _splice(data, older)
+    expected = splice_loop(data, older)
+    pd.testing.assert_frame_equal(output, expected, check_freq=False, rtol=1e-12)
+    assert output.index[0] == older.index[0]
+    assert output.iloc[:11, 1].isna().all() and output.iloc[11:, 1].notna().all()
+    # Nothing to splice
+    pd.testing.assert_frame_equal(_splice(data, data.iloc[:0]), data)
+
+
+def test_dataset_splice():
+    older = create_dummy_dataset("cpi", periods=100)
+    newer = create_dummy_dataset("ppi", periods=40)
+    newer.data.index = older.data.index[60:]
+    spliced = newer.splice(older)
+    assert spliced.transformed and spliced.name == "ppi"
+    assert list(spliced.data.columns) == list(newer.data.columns)
+    assert spliced.data.index.equals(older.data.index)
+    growth = spliced.data.iloc[:61].pct_change()
+    expected = older.data.iloc[:61].pct_change().set_axis(growth.columns, axis=1)
+    pd.testing.assert_frame_equal(growth, expected, check_freq=False)
+    assert spliced.metadata.indicator_metadata["ppi_0"]["transformations"][-1] == {
+        "splice": {"older": "cpi", "start_date": "2000-01-31"}
+    }